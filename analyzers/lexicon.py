@@ -0,0 +1,66 @@
+# analyzers/lexicon.py
+import glob
+import json
+import os
+from functools import lru_cache
+
+from analyzers.term_matcher import TermMatcher
+
+DEFAULT_VERTICAL = "meat_market"
+
+# Archivos <vertical>.<idioma>.json; se puede apuntar a otra carpeta con LEXICON_DIR
+LEXICON_DIR = os.getenv("LEXICON_DIR", os.path.join(os.path.dirname(__file__), "lexicons"))
+
+
+def _lexicon_files():
+    files = {}
+    for path in sorted(glob.glob(os.path.join(LEXICON_DIR, "*.json"))):
+        name = os.path.basename(path)[: -len(".json")]
+        vertical, _, language = name.partition(".")
+        files.setdefault(vertical, {})[language or "default"] = path
+    return files
+
+
+def available_verticals():
+    """
+    Verticales con al menos un lexicón (ej. meat_market, dentist, gym, restaurant).
+    """
+    return sorted(_lexicon_files())
+
+
+@lru_cache(maxsize=None)
+def load_lexicon(vertical: str = DEFAULT_VERTICAL, languages: tuple = None):
+    """
+    Carga el lexicón de un vertical como dict {variante: producto canónico}.
+
+    - `languages`: tupla de idiomas a incluir (ej. ("en", "es")); None = todos.
+    - Cada archivo trae {"terms": {"canónico": ["sinónimo", ...]}}; el canónico
+      siempre cuenta como variante de sí mismo.
+
+    Se cachea por proceso: un batch no vuelve a parsear archivos por lugar.
+    """
+    by_language = _lexicon_files().get(vertical)
+    if not by_language:
+        raise ValueError(f"No hay lexicón para el vertical: {vertical}")
+
+    selected = sorted(by_language) if languages is None else [l for l in languages if l in by_language]
+    if not selected:
+        raise ValueError(f"El vertical {vertical} no tiene lexicón en idiomas: {', '.join(languages)}")
+
+    variants = {}
+    for language in selected:
+        with open(by_language[language], encoding="utf-8") as f:
+            data = json.load(f)
+        for canonical, synonyms in (data.get("terms") or {}).items():
+            for variant in [canonical] + list(synonyms or []):
+                variants.setdefault(variant, canonical)
+
+    return variants
+
+
+@lru_cache(maxsize=None)
+def get_matcher(vertical: str = DEFAULT_VERTICAL, languages: tuple = None):
+    """
+    TermMatcher ya compilado para el vertical (uno por proceso y combinación de idiomas).
+    """
+    return TermMatcher(load_lexicon(vertical, languages))
@@ -0,0 +1,53 @@
+# analyzers/parallel.py
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+# Procesos para análisis de corpus grandes (1 = todo en el proceso actual)
+ANALYSIS_WORKERS = int(os.getenv("ANALYSIS_WORKERS", str(min(8, os.cpu_count() or 1))))
+# Con menos reseñas que esto el costo de mandar datos a otro proceso no compensa
+PROCESS_MIN_REVIEWS = int(os.getenv("ANALYSIS_PROCESS_MIN_REVIEWS", "20000"))
+# Reseñas por tarea enviada al pool
+CHUNK_SIZE = 2000
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def use_processes(n_items: int, workers: int = None):
+    workers = ANALYSIS_WORKERS if workers is None else workers
+    return workers > 1 and n_items >= PROCESS_MIN_REVIEWS
+
+
+def get_process_pool(workers: int = None):
+    """
+    Pool de procesos compartido (se crea la primera vez, con `workers` o
+    ANALYSIS_WORKERS procesos). Usa "spawn": el pipeline corre threads y
+    hacer fork con threads vivos no es seguro; como con todo
+    multiprocessing, el script principal necesita `if __name__ == "__main__"`.
+    """
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ProcessPoolExecutor(max_workers=max(1, workers or ANALYSIS_WORKERS),
+                                            mp_context=multiprocessing.get_context("spawn"))
+    return _pool
+
+
+def chunked(items: list, size: int = CHUNK_SIZE):
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+def map_chunks(fn, items: list, *args, workers: int = None):
+    """
+    `fn(*args, chunk)` sobre `items` partido en chunks. Devuelve los
+    resultados en orden. Con pocos items (o `workers` <= 1) corre en este
+    proceso; si no, en el pool (`fn` debe ser una función de módulo).
+    """
+    chunks = chunked(items)
+    if not use_processes(len(items), workers):
+        return [fn(*args, chunk) for chunk in chunks]
+    pool = get_process_pool(workers)
+    return list(pool.map(fn, *[[a] * len(chunks) for a in args], chunks))
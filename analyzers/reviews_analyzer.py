@@ -1,36 +1,59 @@
 # analyzers/reviews_analyzer.py
-import re
-from collections import Counter
+import hashlib
+import json
+import threading
+import time
+from collections import Counter, OrderedDict
 
-FOOD_TERMS = [
-    "fajitas","fajita","chorizo","tacos","al pastor","pastor","tamales",
-    "barbacoa","menudo","carnitas","ribeye","wagyu","tomahawk","picaña",
-    "bbq","sausage","brisket","seafood","shrimp","camarón",
-    "tuétano","bone marrow"
-]
+from analyzers.lexicon import DEFAULT_VERTICAL, get_matcher
+from analyzers.parallel import map_chunks
 
-def analyze_reviews(reviews: list):
+# Memo de análisis por lugar (place_id + huella de reseñas), LRU acotado
+ANALYSIS_CACHE_SIZE = 4096
+# Una reseña negativa (rating <= 2) es "urgente" si tiene hasta estos días
+URGENT_DAYS = 14
+_analysis_cache = OrderedDict()
+_analysis_lock = threading.Lock()
+
+def _count_chunk(vertical: str, languages: tuple, texts: list):
+    # función de módulo: corre en los procesos del pool (cada uno compila su matcher una vez)
+    return get_matcher(vertical, languages).count(texts)
+
+
+def _is_recent(review: dict, now: float):
+    if review.get("time"):
+        return now - review["time"] <= URGENT_DAYS * 86400
+    # sin fecha epoch (ej. fixtures viejos): lo que diga el texto relativo
+    time_desc = (review.get("relative_time_description") or "").lower()
+    return any(x in time_desc for x in ["day", "día", "días", "dias", "week", "semana"])
+
+
+def analyze_reviews(reviews: list, vertical: str = DEFAULT_VERTICAL, languages=None, workers: int = None,
+                    now: float = None):
     """
     Analiza una lista de reviews de Google Places y extrae:
-    - productos más mencionados
+    - productos más mencionados (según el lexicón del `vertical`)
     - testimonio destacado
-    - reseña negativa reciente (si existe)
+    - reseña negativa reciente (si existe): la más nueva con rating <= 2 y
+      fecha (`time`, epoch) de hasta URGENT_DAYS días antes de `now`
+
+    Con muchas reseñas (ej. del historial; ver analyzers/parallel.py) el
+    conteo se reparte en un pool de procesos; `workers=1` lo desactiva.
     """
+    languages = tuple(languages) if languages else None
+    matcher = get_matcher(vertical, languages)
 
     texts = []
     for r in reviews or []:
         text = (r.get("text") or "").strip()
         if text:
-            texts.append(text.lower())
-
-    blob = " ".join(texts)
+            texts.append(text)
 
-    # Productos más mencionados
+    # Productos más mencionados (una sola pasada sobre todas las reseñas)
     counts = Counter()
-    for term in FOOD_TERMS:
-        hits = len(re.findall(rf"\b{re.escape(term.lower())}\b", blob))
-        if hits:
-            counts[term] += hits
+    for chunk_counts in map_chunks(_count_chunk, texts, vertical, languages, workers=workers):
+        counts.update(chunk_counts)
+    counts = matcher.ordered(counts)
 
     top_products = [
         {"product": k, "mentions": v}
@@ -47,17 +70,64 @@ def analyze_reviews(reviews: list):
             featured_testimonial = t
 
     # Reseña negativa reciente
+    now = time.time() if now is None else now
     urgent_negative = None
     for r in reviews or []:
-        rating = r.get("rating") or 0
-        if rating <= 2:
-            time_desc = (r.get("relative_time_description") or "").lower()
-            if any(x in time_desc for x in ["day", "día", "días", "dias", "week", "semana"]):
+        if (r.get("rating") or 0) <= 2 and _is_recent(r, now):
+            if urgent_negative is None or (r.get("time") or 0) > (urgent_negative.get("time") or 0):
                 urgent_negative = r
-                break
 
     return {
         "top_products": top_products,
         "featured_testimonial": featured_testimonial,
         "urgent_negative": urgent_negative
     }
+
+
+def reviews_fingerprint(reviews: list):
+    """
+    Huella estable de un set de reseñas (autor, fecha, rating, texto).
+    Si Google no trajo reseñas nuevas, la huella no cambia.
+    """
+    items = [
+        [r.get("author_name"), r.get("time"), r.get("rating"), r.get("text")]
+        for r in reviews or []
+    ]
+    raw = json.dumps(items, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+def analyze_place(place: dict, vertical: str = DEFAULT_VERTICAL, languages=None):
+    """
+    `analyze_reviews` de un lugar, memoizado por (place_id, huella de reseñas,
+    vertical, idiomas, día): reconstruir un reporte con los mismos datos
+    (ej. en la UI) no vuelve a analizar; al cambiar el día se recalcula qué
+    reseña negativa sigue siendo reciente.
+
+    El resultado es compartido: no modificarlo.
+    """
+    reviews = place.get("reviews", [])
+    languages = tuple(languages) if languages else None
+    key = (place.get("place_id"), reviews_fingerprint(reviews), vertical, languages, int(time.time() // 86400))
+
+    with _analysis_lock:
+        if key in _analysis_cache:
+            _analysis_cache.move_to_end(key)
+            return _analysis_cache[key]
+
+    analysis = analyze_reviews(reviews, vertical, languages)
+
+    with _analysis_lock:
+        _analysis_cache[key] = analysis
+        while len(_analysis_cache) > ANALYSIS_CACHE_SIZE:
+            _analysis_cache.popitem(last=False)
+
+    return analysis
+
+
+def clear_analysis_cache():
+    """
+    Vacía el memo de `analyze_place` (ej. para medir análisis en frío).
+    """
+    with _analysis_lock:
+        _analysis_cache.clear()
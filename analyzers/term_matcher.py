@@ -0,0 +1,82 @@
+# analyzers/term_matcher.py
+import re
+import unicodedata
+from collections import Counter
+
+# Diacríticos combinables (U+034F no lo es: no se quita)
+_LATIN_MARKS = re.compile("[\u0300-\u034e\u0350-\u036f]")
+
+
+def normalize_text(text: str):
+    """
+    Minúsculas + sin acentos ("Camarón" -> "camaron", "Picaña" -> "picana"),
+    para que el match no dependa de cómo escribió el cliente.
+    """
+    text = (text or "").casefold()
+    if text.isascii():
+        # sin acentos que quitar (la mayoría de las reseñas en inglés)
+        return text
+    # los acentos latinos quedan en el bloque U+0300–U+036F; el resto uno por uno
+    text = _LATIN_MARKS.sub("", unicodedata.normalize("NFKD", text))
+    if text.isascii():
+        return text
+    return "".join(ch for ch in text if not unicodedata.combining(ch))
+
+
+class TermMatcher:
+    """
+    Cuenta menciones de muchos términos en una sola pasada.
+
+    Todos los términos se compilan una vez en una sola expresión regular
+    (alternación ordenada de más largo a más corto), así que:
+    - el texto se recorre una vez, no una vez por término;
+    - en términos que se traslapan gana el más largo en esa posición
+      ("al pastor" cuenta como "al pastor", no también como "pastor");
+    - el match ignora mayúsculas y acentos.
+
+    `terms` puede ser una lista de términos o un dict {variante: término canónico};
+    los conteos se reportan por término canónico.
+    """
+
+    def __init__(self, terms):
+        if not isinstance(terms, dict):
+            terms = {t: t for t in terms}
+
+        self._canonical = {}
+        self._order = {}
+        for variant, canonical in terms.items():
+            key = " ".join(normalize_text(variant).split())
+            if not key or key in self._canonical:
+                continue
+            self._canonical[key] = canonical
+            self._order.setdefault(canonical, len(self._order))
+
+        keys = sorted(self._canonical, key=lambda k: (-len(k), k))
+        alternation = "|".join(re.escape(k).replace(r"\ ", "[ \t]+") for k in keys)
+        self._pattern = re.compile(rf"\b(?:{alternation})\b") if keys else None
+
+    def count(self, texts):
+        """
+        Cuenta menciones por término canónico en `texts` (str o lista de str).
+        Los textos se unen con salto de línea para que un término de varias
+        palabras no se arme con el final de una reseña y el inicio de otra.
+        """
+        if isinstance(texts, str):
+            texts = [texts]
+        counts = Counter()
+        if self._pattern is None:
+            return counts
+
+        blob = normalize_text("\n".join(texts))
+        for m in self._pattern.finditer(blob):
+            key = " ".join(m.group(0).split())
+            counts[self._canonical[key]] += 1
+
+        return self.ordered(counts)
+
+    def ordered(self, counts: Counter):
+        """
+        `counts` con desempate estable (orden de definición del término), ej.
+        al sumar conteos de varios chunks.
+        """
+        return Counter(dict(sorted(counts.items(), key=lambda kv: self._order[kv[0]])))
@@ -0,0 +1,276 @@
+# analyzers/term_matrix.py
+import re
+from array import array
+from collections import Counter
+from functools import lru_cache
+
+try:
+    import numpy as np  # opcional: agregación vectorizada de la matriz
+except ImportError:
+    np = None
+
+from analyzers.lexicon import DEFAULT_VERTICAL, load_lexicon
+from analyzers.parallel import map_chunks
+from analyzers.term_matcher import normalize_text
+
+# n-gramas de 1 hasta NGRAM_MAX palabras
+NGRAM_MAX = 2
+MIN_TOKEN_LEN = 3
+# Reseñas con este rating o más cuentan como elogio
+POSITIVE_MIN_RATING = 4
+# Términos por lista en strategic_insight
+INSIGHT_TERMS = 5
+# Con menos entradas que esto, Python puro es más rápido que NumPy
+NUMPY_MIN_NNZ = 2000
+
+_TOKEN = re.compile(r"[a-z][a-z']*[a-z]")
+
+# Palabras vacías (en/es, ya sin acentos): cortan n-gramas y no cuentan como término
+STOPWORDS = frozenset("""
+    the and for are but not you all any can had her was one our out has his how its may new now
+    old see two way who did get got let put say she too use this that with have from they will
+    your what when them than then been were there their would could should about into just only
+    also very really much more most some such here where which while after before again every
+    because being over under came come went going back even still made make other each same
+    like well always never ever lot lots little many us we my me our it's don't didn't i'm
+    los las del que con una por para como mas pero sus les muy ese esa eso esta este esto estos
+    estas son fue era hay han ser sin sobre entre cuando donde todo toda todos todas nos mis tus
+    tambien porque desde hasta algo aqui alla ahi asi solo cada otro otra otros otras fueron
+    tiene tienen hace hacen estan estaba siempre nunca vez veces ya
+""".split())
+
+# Adjetivos, relleno de elogio genérico y de lugar: no dicen QUÉ valoran los clientes
+GENERIC_TERMS = frozenset("""
+    great good best better nice amazing awesome excellent love loved perfect wonderful fantastic
+    delicious definitely highly recommend recommended place time times experience thank thanks
+    bueno buena buenos buenas mejor excelente increible recomiendo recomendado lugar rico rica
+    muy bien
+    deliciosa delicioso gracias experiencia super
+    damn last city town area neighborhood ciudad zona barrio
+""".split())
+
+
+def tokenize(text: str):
+    return _TOKEN.findall(normalize_text(text))
+
+
+def review_terms(text: str, ngram_max: int = NGRAM_MAX):
+    """
+    Conteo de n-gramas (1..`ngram_max` palabras) de una reseña. Las
+    stopwords y palabras cortas no son términos y cortan los n-gramas
+    ("brisket and ribs" → brisket, ribs; no "brisket ribs").
+    """
+    tokens = tokenize(text)
+    keep = [len(t) >= MIN_TOKEN_LEN and t not in STOPWORDS for t in tokens]
+    terms = [t for t, k in zip(tokens, keep) if k]
+    if ngram_max >= 2:
+        terms += [a + " " + b for a, b, ka, kb in zip(tokens, tokens[1:], keep, keep[1:]) if ka and kb]
+    for n in range(3, ngram_max + 1):
+        terms += [" ".join(tokens[i:i + n]) for i in range(len(tokens) - n + 1) if all(keep[i:i + n])]
+    return Counter(terms)
+
+
+def _terms_chunk(ngram_max: int, texts: list):
+    # función de módulo: corre en los procesos del pool
+    return [dict(review_terms(t, ngram_max)) for t in texts]
+
+
+class TermMatrix:
+    """
+    Matriz término-documento dispersa (CSR): una fila por reseña, una
+    columna por n-grama del vocabulario, valor = veces que aparece.
+    `groups[fila]` es el lugar (0 = CLIENTE) al que pertenece la reseña.
+
+    La tokenización de corpus grandes (ej. reseñas del historial) se
+    reparte en un pool de procesos (ver analyzers/parallel.py).
+    """
+
+    def __init__(self, vocab: list, indptr, indices, data, groups: list):
+        self.vocab = vocab
+        self.indptr = indptr
+        self.indices = indices
+        self.data = data
+        self.groups = groups
+
+    @classmethod
+    def build(cls, texts: list, groups: list, ngram_max: int = NGRAM_MAX, workers: int = None):
+        vocab = {}
+        indptr = array("q", [0])
+        indices = array("q")
+        data = array("q")
+        for chunk in map_chunks(_terms_chunk, list(texts), ngram_max, workers=workers):
+            for terms in chunk:
+                indices.extend([vocab.setdefault(term, len(vocab)) for term in terms])
+                data.extend(terms.values())
+                indptr.append(len(indices))
+        return cls(list(vocab), indptr, indices, data, list(groups))
+
+    @property
+    def shape(self):
+        return len(self.indptr) - 1, len(self.vocab)
+
+    def row_terms(self, rows):
+        """
+        Columnas que aparecen en alguna de las filas `rows`.
+        """
+        cols = set()
+        for r in rows:
+            cols.update(self.indices[self.indptr[r]:self.indptr[r + 1]])
+        return cols
+
+    def term_spread(self, rows):
+        """
+        Por columna: (lugares que mencionan el término, suma sobre esos
+        lugares de la fracción de sus reseñas que lo mencionan), contando
+        solo las filas `rows`. Normalizar por reseñas del lugar evita que
+        el que tiene más reseñas domine.
+        """
+        rows = list(rows)
+        n_terms = len(self.vocab)
+        if not rows:
+            return [0] * n_terms, [0.0] * n_terms
+        if np is not None and len(self.indices) >= NUMPY_MIN_NNZ:
+            return self._term_spread_np(rows)
+
+        docs = Counter(self.groups[r] for r in rows)
+        hits = Counter()
+        for r in rows:
+            g = self.groups[r]
+            for j in range(self.indptr[r], self.indptr[r + 1]):
+                hits[(g, self.indices[j])] += 1
+
+        places = [0] * n_terms
+        weight = [0.0] * n_terms
+        for (g, t), n in hits.items():
+            places[t] += 1
+            weight[t] += n / docs[g]
+        return places, weight
+
+    def _term_spread_np(self, rows: list):
+        n_terms = len(self.vocab)
+        indptr = np.frombuffer(self.indptr, dtype=np.int64)
+        indices = np.frombuffer(self.indices, dtype=np.int64)
+        groups = np.asarray(self.groups, dtype=np.int64)
+
+        selected = np.zeros(len(indptr) - 1, dtype=bool)
+        selected[rows] = True
+        doc_of = np.repeat(np.arange(len(indptr) - 1), np.diff(indptr))
+        mask = selected[doc_of]
+
+        # cada (lugar, término) una vez, con cuántas reseñas del lugar lo mencionan
+        keys = groups[doc_of[mask]] * n_terms + indices[mask]
+        pairs, hits = np.unique(keys, return_counts=True)
+        place, term = pairs // n_terms, pairs % n_terms
+        docs = np.bincount(groups[selected], minlength=int(groups.max()) + 1)
+
+        places = np.bincount(term, minlength=n_terms)
+        weight = np.bincount(term, weights=hits / docs[place], minlength=n_terms)
+        return places.tolist(), weight.tolist()
+
+
+@lru_cache(maxsize=None)
+def _labels(vertical: str):
+    # variante normalizada del lexicón → nombre canónico ("picana" → "Picaña")
+    return {" ".join(normalize_text(v).split()): c for v, c in load_lexicon(vertical).items()}
+
+
+def _top_terms(vocab: list, places: list, weight: list, limit: int, min_places: int,
+               labels: dict, banned_words=frozenset(), banned_terms=frozenset(), known_words=None):
+    """
+    Los `limit` términos mencionados por más lugares (desempate: peso),
+    sin términos genéricos, sin palabras de `banned_words` ni términos de
+    `banned_terms`, sin los que tienen todas sus palabras en `known_words`
+    y sin repetir palabras entre elegidos. Los filtros se aplican solo a los candidatos que se
+    revisan, no a todo el vocabulario.
+    """
+    candidates = [t for t in range(len(vocab)) if places[t] >= min_places]
+    candidates.sort(key=lambda t: (-places[t], -weight[t], vocab[t]))
+
+    chosen, used_words, used_labels = [], set(), set()
+    for t in candidates:
+        words = set(vocab[t].split())
+        if words & GENERIC_TERMS or words & banned_words or vocab[t] in banned_terms \
+                or (known_words is not None and words <= known_words):
+            continue
+        label = labels.get(vocab[t], vocab[t])
+        if words & used_words or label in used_labels:
+            continue
+        chosen.append(label)
+        used_words |= words
+        used_labels.add(label)
+        if len(chosen) >= limit:
+            break
+    return chosen
+
+
+def market_insight(places_details: list, vertical: str = DEFAULT_VERTICAL, limit: int = INSIGHT_TERMS,
+                   review_history: dict = None, workers: int = None, exclude_words=()):
+    """
+    `strategic_insight` a partir de las reseñas (el primer lugar es el CLIENTE):
+
+    - what_they_value: lo que más lugares del mercado reciben como elogio
+      (reseñas con rating >= POSITIVE_MIN_RATING).
+    - what_they_dont_mention: elogios que reciben los competidores y que
+      no aparecen en ninguna reseña del cliente (vacío si el cliente no
+      tiene reseñas con texto: no hay con qué comparar).
+
+    `review_history` ({place_id: reseñas}, ej. del historial de corridas)
+    suma reseñas guardadas a la muestra de 5 que trae Google por lugar.
+
+    No son términos estratégicos la consulta ni los nombres de los lugares:
+    se descartan los n-gramas con palabras de `exclude_words` (textos, ej.
+    keyword y ubicación) y los n-gramas de varias palabras de cada nombre
+    ("wild fork"; o el nombre entero si es de una palabra). Las palabras
+    sueltas de un nombre siguen contando: "brisket" de "Houston Brisket
+    House" es un producto.
+    """
+    texts, groups, ratings = [], [], []
+    for g, p in enumerate(places_details):
+        reviews = list(p.get("reviews") or [])
+        if review_history:
+            seen = {(r.get("author_url") or r.get("author_name"), r.get("time")) for r in reviews}
+            for r in review_history.get(p.get("place_id")) or []:
+                if (r.get("author_url") or r.get("author_name"), r.get("time")) not in seen:
+                    reviews.append(r)
+        for r in reviews:
+            text = (r.get("text") or "").strip()
+            stars = r.get("rating") or 0
+            # de los competidores solo cuentan los elogios; del cliente, todo
+            if text and (g == 0 or stars >= POSITIVE_MIN_RATING):
+                texts.append(text)
+                groups.append(g)
+                ratings.append(stars)
+
+    insight = {"what_they_value": [], "what_they_dont_mention": []}
+    if not texts:
+        return insight
+
+    matrix = TermMatrix.build(texts, groups, workers=workers)
+    labels = _labels(vertical)
+    banned = {w for text in exclude_words for w in tokenize(text)}
+    name_terms = set()
+    for p in places_details:
+        name = p.get("name") or ""
+        terms = review_terms(name)
+        name_terms.update(t for t in terms if " " in t)
+        if len(terms) == 1:
+            name_terms.update(terms)
+    positive = [i for i, stars in enumerate(ratings) if stars >= POSITIVE_MIN_RATING]
+
+    # en el mercado: al menos 2 lugares, si hay suficientes con elogios
+    praised_places = len({groups[i] for i in positive})
+    places, weight = matrix.term_spread(positive)
+    insight["what_they_value"] = _top_terms(matrix.vocab, places, weight, limit,
+                                            2 if praised_places >= 3 else 1, labels, banned_words=banned,
+                                            banned_terms=name_terms)
+
+    client_rows = [i for i, g in enumerate(groups) if g == 0]
+    if client_rows:
+        # fuera todo n-grama cuyas palabras ya aparecen en reseñas del cliente
+        # (toda palabra de un n-grama es también un término de 1 palabra)
+        client_words = {matrix.vocab[t] for t in matrix.row_terms(client_rows) if " " not in matrix.vocab[t]}
+        places, weight = matrix.term_spread([i for i in positive if groups[i] != 0])
+        insight["what_they_dont_mention"] = _top_terms(matrix.vocab, places, weight, limit, 1, labels,
+                                                       banned_words=banned, banned_terms=name_terms,
+                                                       known_words=client_words)
+    return insight
@@ -0,0 +1,225 @@
+# batch_runner.py
+"""
+Corre muchos jobs (keyword × ubicación) desde un manifest JSONL o CSV.
+
+Cada línea/fila: keyword, location, radius_m (opcional), top_n (opcional),
+vertical (opcional, lexicón de productos), tier (opcional: all/full/light),
+sweep (opcional: true = barrido por cuadrícula) e id (opcional). Ejemplo:
+
+    python batch_runner.py jobs.jsonl --out-dir outputs/batch --jobs 16
+
+- Los jobs corren como corutinas en un solo proceso (`--jobs` a la vez),
+  con prioridad "batch" en el scheduler de cuota: la UI pasa primero y
+  el QPS/presupuesto por key se respeta (ver extractors/scheduler.py).
+- Geocodes y Place Details se comparten entre jobs: la misma ubicación
+  se geocodifica una vez y el mismo place_id se consulta una vez.
+- Cada job escribe `<out-dir>/<job_id>/raw.json` y `report.json`.
+- Si el proceso se cae, al volver a correrlo se saltan los jobs que ya
+  tienen report.json (usar `--force` para rehacerlos).
+"""
+import argparse
+import asyncio
+import csv
+import hashlib
+import json
+import os
+import re
+import time
+
+from analyzers.lexicon import DEFAULT_VERTICAL, available_verticals
+from composer.history import get_history, record_run
+from composer.ranking import DEFAULT_SCORING
+from composer.report_diff import load_previous_run
+from extractors.geocode import geocode_location_async
+from extractors.http_client import async_session
+from extractors.metrics import export_metrics
+from extractors.place_details import get_place_details_async
+from extractors.scheduler import request_priority
+from extractors.shared_calls import AsyncSharedCalls
+from pipeline import FETCH_TIERS, run_pipeline_with_timeout, save_outputs
+from runner import split_list
+
+DEFAULT_RADIUS_M = 30000
+DEFAULT_TOP_N = 6
+
+
+def load_manifest(path: str):
+    """
+    Lee el manifest (.jsonl o .csv) y devuelve la lista de jobs normalizados.
+    """
+    rows = []
+    if path.lower().endswith(".csv"):
+        with open(path, newline="", encoding="utf-8") as f:
+            rows = list(csv.DictReader(f))
+    else:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    rows.append(json.loads(line))
+
+    jobs = []
+    for n, row in enumerate(rows, start=1):
+        keyword = (row.get("keyword") or "").strip()
+        location = (row.get("location") or row.get("location_text") or "").strip()
+        if not keyword or not location:
+            raise ValueError(f"Manifest {path}: job #{n} sin keyword o location")
+
+        job = {
+            "keyword": keyword,
+            "location": location,
+            "radius_m": int(row.get("radius_m") or DEFAULT_RADIUS_M),
+            "top_n": int(row.get("top_n") or DEFAULT_TOP_N),
+            "vertical": (row.get("vertical") or "").strip() or DEFAULT_VERTICAL,
+            "tier": (row.get("tier") or "").strip() or "all",
+            "sweep": str(row.get("sweep") or "").strip().lower() in ("1", "true", "yes", "si", "sí"),
+        }
+        if job["tier"] not in FETCH_TIERS:
+            raise ValueError(f"Manifest {path}: job #{n} con tier inválido: {job['tier']}")
+        if job["vertical"] not in available_verticals():
+            raise ValueError(f"Manifest {path}: job #{n} sin lexicón para el vertical: {job['vertical']}")
+        job["id"] = str(row.get("id") or "").strip() or job_id(job)
+        jobs.append(job)
+
+    return jobs
+
+
+def job_id(job: dict):
+    """
+    Id estable y legible: slug de keyword + ubicación + hash corto de los parámetros.
+    """
+    slug = re.sub(r"[^a-z0-9]+", "-", f"{job['keyword']} {job['location']}".lower()).strip("-")
+    parts = [job["keyword"], job["location"], job["radius_m"], job["top_n"], job["vertical"], job["tier"]]
+    if job.get("sweep"):
+        parts.append("sweep")
+    raw = json.dumps(parts)
+    return f"{slug[:60]}-{hashlib.sha1(raw.encode('utf-8')).hexdigest()[:8]}"
+
+
+async def run_batch_async(jobs: list, out_dir: str, max_jobs: int = 16, refresh: bool = False,
+                          force: bool = False, timeout: float = None,
+                          review_sorts=("newest",), review_languages=(None,), incremental: bool = False,
+                          scoring: str = DEFAULT_SCORING, compact: bool = None,
+                          insight_history: bool = False):
+    """
+    Corre los jobs como corutinas en un solo event loop (máximo `max_jobs`
+    a la vez), compartiendo geocodes, Place Details y el cliente HTTP.
+    `review_sorts` / `review_languages` / `scoring` / `insight_history`
+    aplican a todo el batch.
+    Con `incremental` los jobs ya terminados se vuelven a correr contra su
+    raw.json anterior (solo piden detalles de lo que cambió, ver pipeline.py).
+    Devuelve un resumen con ok / skipped / failed.
+    """
+    async def fetch_details(place_id, refresh):
+        return await get_place_details_async(
+            place_id, refresh, review_sorts=review_sorts, languages=review_languages
+        )
+
+    shared_geocode = AsyncSharedCalls(geocode_location_async)
+    shared_details = AsyncSharedCalls(fetch_details)
+
+    def geocode(location_text, refresh):
+        return shared_geocode(" ".join(location_text.lower().split()), location_text, refresh)
+
+    def get_details(place_id, refresh):
+        # refresh en la llave: un lugar que cambió no puede recibir los detalles cacheados de otro job
+        return shared_details((place_id, refresh), place_id, refresh)
+
+    summary_path = os.path.join(out_dir, "batch_summary.jsonl")
+    os.makedirs(out_dir, exist_ok=True)
+
+    def log(entry):
+        with open(summary_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+    semaphore = asyncio.Semaphore(max(1, max_jobs))
+
+    async def run_job(job):
+        job_dir = os.path.join(out_dir, job["id"])
+        previous = None
+        if incremental:
+            previous = load_previous_run(os.path.join(job_dir, "raw.json"), job["keyword"], job["location"])
+            if previous is None and get_history():
+                previous = await asyncio.to_thread(get_history().latest_run, job["keyword"], job["location"])
+        elif not force and os.path.exists(os.path.join(job_dir, "report.json")):
+            return job, "skipped"
+
+        async with semaphore:
+            t0 = time.time()
+            try:
+                raw, report = await run_pipeline_with_timeout(
+                    job["keyword"], job["location"],
+                    radius_m=job["radius_m"], top_n=job["top_n"],
+                    refresh=refresh, geocode=geocode, get_details=get_details,
+                    vertical=job["vertical"], fetch_tier=job["tier"], timeout=timeout,
+                    previous=previous, scoring=scoring, sweep=job["sweep"],
+                    insight_history=insight_history
+                )
+                await asyncio.to_thread(save_outputs, raw, report, job_dir, compact)
+                await asyncio.to_thread(record_run, raw)
+                export_metrics(raw["metrics"], {"job_id": job["id"]})
+            except Exception as e:
+                log({"id": job["id"], "status": "error", "error": str(e), "elapsed": time.time() - t0})
+                return job, "failed"
+
+        metrics = raw["metrics"]
+        log({"id": job["id"], "status": "ok", "elapsed": time.time() - t0,
+             "quota_units": metrics["quota_units"], "est_cost_usd": metrics["est_cost_usd"]})
+        return job, "ok"
+
+    counts = {"ok": 0, "skipped": 0, "failed": 0}
+    with request_priority("batch"):
+        async with async_session():
+            tasks = [asyncio.create_task(run_job(job)) for job in jobs]
+            for done, next_done in enumerate(asyncio.as_completed(tasks), start=1):
+                job, status = await next_done
+                counts[status] += 1
+                print(f"[{done}/{len(jobs)}] {status:7} {job['id']}")
+
+    counts["geocode_calls"] = shared_geocode.calls
+    counts["details_calls"] = shared_details.calls
+    counts["details_shared"] = shared_details.shared
+    return counts
+
+
+def run_batch(jobs: list, out_dir: str, **kwargs):
+    """
+    Wrapper sincrónico de `run_batch_async`.
+    """
+    return asyncio.run(run_batch_async(jobs, out_dir, **kwargs))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Batch de jobs keyword × ubicación")
+    parser.add_argument("manifest", help="Archivo .jsonl o .csv con keyword, location, radius_m, top_n, vertical")
+    parser.add_argument("--out-dir", default=os.path.join("outputs", "batch"))
+    parser.add_argument("--jobs", type=int, default=16, help="Jobs en paralelo")
+    parser.add_argument("--refresh", action="store_true", help="Ignorar el cache de respuestas")
+    parser.add_argument("--force", action="store_true", help="Rehacer jobs ya completados")
+    parser.add_argument("--timeout", type=float, default=None, help="Segundos máximos por job")
+    parser.add_argument("--review-sorts", default="newest",
+                        help="Órdenes de reviews separados por coma (ej. newest,most_relevant)")
+    parser.add_argument("--review-languages", default="",
+                        help="Idiomas de reviews separados por coma (ej. en,es)")
+    parser.add_argument("--scoring", default=DEFAULT_SCORING,
+                        help="Fórmula de ranking (ej. bayesian,distance,recency)")
+    parser.add_argument("--compact", action="store_true", help="Escribir los JSON de cada job minificados")
+    parser.add_argument("--insight-history", action="store_true",
+                        help="Usar también las reseñas del historial para el insight estratégico")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Re-correr jobs terminados pidiendo detalles solo de lo que cambió")
+    args = parser.parse_args()
+
+    jobs = load_manifest(args.manifest)
+    counts = run_batch(jobs, args.out_dir, max_jobs=args.jobs, refresh=args.refresh,
+                       force=args.force, timeout=args.timeout,
+                       review_sorts=split_list(args.review_sorts) or ("newest",),
+                       review_languages=split_list(args.review_languages) or (None,),
+                       incremental=args.incremental, scoring=args.scoring,
+                       compact=args.compact or None, insight_history=args.insight_history)
+
+    print("✅ Batch terminado:", json.dumps(counts))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+# benchmarks/__main__.py
+import argparse
+import json
+import os
+import sys
+
+# Antes de importar los extractores: sin cache en disco ni fixtures (cada
+# corrida pega al mock), una API key falsa (el mock solo corre en localhost),
+# consumo de cuota solo en memoria y sin índice de reseñas en disco
+os.environ["GOOGLE_CACHE"] = "0"
+os.environ["GOOGLE_FIXTURES"] = ""
+os.environ["GOOGLE_API_KEY"] = "mock"
+os.environ.pop("GOOGLE_API_KEYS", None)
+os.environ["GOOGLE_QUOTA_DB"] = ""
+os.environ["REVIEW_INDEX"] = "0"
+
+from benchmarks.cases import E2E_TOKEN_DELAY, build_cases  # noqa: E402
+from benchmarks.harness import (  # noqa: E402
+    BASELINE_PATH, DEFAULT_TOLERANCE, compare, load_baseline, run_case, save_baseline
+)
+
+os.environ.setdefault("PAGE_TOKEN_DELAY", str(E2E_TOKEN_DELAY))
+
+
+def _delta(result: dict, before: dict):
+    if not before or not before.get("p50_ms"):
+        return ""
+    return f"{(result['p50_ms'] / before['p50_ms'] - 1) * 100:+.0f}%"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks del análisis, el reporte y el pipeline completo")
+    parser.add_argument("--quick", action="store_true", help="Tamaños chicos (CI)")
+    parser.add_argument("--filter", default="", help="Correr solo los casos cuyo nombre contenga este texto")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true", help="Guardar los resultados como baseline")
+    parser.add_argument("--check", action="store_true",
+                        help="Salir con error si algún caso empeora más que --tolerance vs el baseline")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    parser.add_argument("--json", metavar="PATH", help="Escribir los resultados en JSON")
+    args = parser.parse_args()
+
+    baseline = load_baseline(args.baseline)
+    results = {}
+
+    print(f"{'caso':48} {'p50 ms':>10} {'p95 ms':>10} {'items/s':>12} {'pico KB':>10} {'vs base':>8}")
+    for name, items, factory, repeat in build_cases(quick=args.quick):
+        if args.filter not in name:
+            continue
+        try:
+            fn = factory()
+        except ImportError as e:
+            print(f"{name:48} omitido: falta dependencia ({e.name})")
+            continue
+        result = run_case(fn, items, repeat=repeat)
+        results[name] = result
+        print(f"{name:48} {result['p50_ms']:>10.2f} {result['p95_ms']:>10.2f} "
+              f"{result['throughput_per_s'] or 0:>12.1f} {result['peak_kb']:>10.1f} "
+              f"{_delta(result, baseline.get(name)):>8}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+
+    if args.save_baseline:
+        save_baseline(results, args.baseline)
+        print(f"Baseline guardado en {args.baseline}")
+
+    if args.check:
+        regressions = compare(results, baseline, args.tolerance)
+        for name, metric, old, new in regressions:
+            print(f"❌ {name}: {metric} {old} → {new} (tolerancia {args.tolerance:.0%})")
+        if regressions:
+            sys.exit(1)
+        print(f"✅ Sin regresiones vs {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
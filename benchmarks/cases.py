@@ -0,0 +1,171 @@
+# benchmarks/cases.py
+import json
+import random
+
+from analyzers.lexicon import DEFAULT_VERTICAL, load_lexicon
+from analyzers.reviews_analyzer import analyze_reviews, clear_analysis_cache
+from analyzers.term_matcher import TermMatcher
+from analyzers.term_matrix import market_insight
+from composer.ranking import score_places, top_k
+from composer.report_builder import build_report
+
+SEED = 1234
+FILLER = (
+    "the staff was friendly and the place was clean we came back on saturday for the family "
+    "la atención fue rápida y los precios justos volveremos pronto con amigos great quality "
+    "long line but worth it parking is small muy buena calidad excelente servicio"
+).split()
+
+# Latencia simulada del API para el caso end-to-end (ms)
+E2E_LATENCY_MS = 50
+E2E_JITTER_MS = 20
+# El mock activa los next_page_token a los 0.2s (Google tarda ~2s)
+E2E_TOKEN_DELAY = 0.2
+
+
+def synthetic_reviews(n: int, vertical: str = DEFAULT_VERTICAL, seed: int = SEED):
+    """
+    `n` reviews sintéticas: relleno + 0 a 3 términos del lexicón por reseña.
+    """
+    rng = random.Random(seed)
+    variants = list(load_lexicon(vertical))
+    reviews = []
+    for i in range(n):
+        words = rng.choices(FILLER, k=rng.randint(8, 60))
+        for _ in range(rng.randint(0, 3)):
+            words.insert(rng.randrange(len(words) + 1), rng.choice(variants))
+        stars = rng.choice((1, 2, 3, 4, 5, 5, 5))
+        reviews.append({
+            "author_name": f"user{i}",
+            "rating": stars,
+            "time": 1700000000 + i * 3600,
+            "relative_time_description": rng.choice(("a week ago", "2 months ago", "hace 3 días")),
+            "text": " ".join(words).capitalize() + ".",
+        })
+    return reviews
+
+
+def synthetic_places(n: int, reviews_per_place: int = 5, seed: int = SEED):
+    """
+    `n` lugares con el formato de Place Details (5 reviews cada uno, como Google).
+    """
+    rng = random.Random(seed)
+    reviews = synthetic_reviews(n * reviews_per_place, seed=seed)
+    return [{
+        "place_id": f"bench-{i}",
+        "name": f"Meat Market {i}",
+        "rating": round(rng.uniform(3.0, 5.0), 1),
+        "reviews_count": rng.randint(0, 3000),
+        "address": f"{100 + i} Main St",
+        "maps_url": None,
+        "reviews": reviews[i * reviews_per_place:(i + 1) * reviews_per_place],
+    } for i in range(n)]
+
+
+def synthetic_lexicon(size: int, seed: int = SEED):
+    """
+    Lexicón real + términos inventados hasta llegar a `size` variantes.
+    """
+    rng = random.Random(seed)
+    terms = dict(load_lexicon(DEFAULT_VERTICAL))
+    while len(terms) < size:
+        word = "".join(rng.choices("abcdefghijklmnopqrstuvwxyz", k=rng.randint(4, 10)))
+        if rng.random() < 0.3:
+            word += " " + "".join(rng.choices("abcdefghijklmnopqrstuvwxyz", k=rng.randint(3, 8)))
+        terms.setdefault(word, word)
+    return terms
+
+
+def _analyze_case(n: int):
+    reviews = synthetic_reviews(n)
+    return lambda: analyze_reviews(reviews)
+
+
+def _matcher_case(lexicon_size: int, n: int):
+    # se compila una vez (como get_matcher); se mide solo el conteo
+    matcher = TermMatcher(synthetic_lexicon(lexicon_size))
+    texts = [r["text"] for r in synthetic_reviews(n)]
+    return lambda: matcher.count(texts)
+
+
+def _report_case(n: int):
+    places = synthetic_places(n)
+
+    def run():
+        # en frío: sin el memo de analyze_place
+        clear_analysis_cache()
+        build_report("meat market", "Houston, TX", "Houston, TX, USA", places)
+    return run
+
+
+def _insight_case(n: int, reviews_per_place: int):
+    # corpus tipo historial: muchas reseñas por lugar (matriz + pool si pasa el umbral)
+    places = synthetic_places(n, reviews_per_place)
+    return lambda: market_insight(places)
+
+
+def _ranking_case(n: int, scoring: str):
+    rng = random.Random(SEED)
+    places = synthetic_places(n)
+    for p in places:
+        p["location"] = {"lat": 29.76 + rng.uniform(-0.3, 0.3), "lng": -95.36 + rng.uniform(-0.3, 0.3)}
+    center = {"lat": 29.76, "lng": -95.36}
+    return lambda: top_k(score_places(places, scoring, center, now=1.8e9), 6)
+
+
+def _json_case(n: int):
+    places = synthetic_places(n)
+    report = build_report("meat market", "Houston, TX", "Houston, TX, USA", places)
+    raw = {"keyword": "meat market", "location_text": "Houston, TX", "places": places}
+
+    def run():
+        json.dumps(raw, ensure_ascii=False, indent=2)
+        json.dumps(report, ensure_ascii=False, indent=2)
+    return run
+
+
+def _pipeline_case(top_n: int):
+    # imports locales: el cliente HTTP requiere `requests` y solo este caso lo usa
+    import extractors.http_client as http_client
+    from mock_google import MockGoogle, serve_in_thread
+    from pipeline import run_pipeline
+
+    server, base_url = serve_in_thread(MockGoogle(
+        latency_ms=E2E_LATENCY_MS, jitter_ms=E2E_JITTER_MS, token_delay=E2E_TOKEN_DELAY, seed=SEED
+    ))
+    http_client.BASE_URL = base_url
+
+    def run():
+        clear_analysis_cache()
+        raw, _ = run_pipeline("meat market", "Houston, TX", top_n=top_n, timeout=0)
+        if len(raw["places"]) != top_n:
+            raise RuntimeError(f"pipeline_e2e: {len(raw['places'])} lugares, se esperaban {top_n}")
+    return run
+
+
+def build_cases(quick: bool = False):
+    """
+    Lista de casos (nombre, elementos procesados, fábrica de la función, repeticiones).
+    La fábrica arma los datos sintéticos solo si el caso se va a correr.
+    `quick` usa tamaños chicos (para CI).
+    """
+    cases = []
+    for n in ((10, 1000) if quick else (10, 1000, 100000)):
+        cases.append((f"analyze_reviews[reviews={n}]", n, lambda n=n: _analyze_case(n), 3 if n >= 100000 else 7))
+    for size in ((100, 1000) if quick else (100, 1000, 10000)):
+        cases.append((f"term_matcher[terms={size},reviews=1000]", 1000,
+                      lambda size=size: _matcher_case(size, 1000), 5))
+    for n in ((6, 60) if quick else (6, 60, 500)):
+        cases.append((f"build_report[places={n}]", n, lambda n=n: _report_case(n), 7))
+    for n, per_place in (((60, 5),) if quick else ((60, 5), (2000, 20))):
+        cases.append((f"market_insight[places={n},reviews={n * per_place}]", n * per_place,
+                      lambda n=n, per_place=per_place: _insight_case(n, per_place), 3 if n >= 2000 else 7))
+    for n in ((60,) if quick else (60, 5000)):
+        scoring = "bayesian,distance,recency"
+        cases.append((f"ranking[places={n},scoring={scoring}]", n, lambda n=n: _ranking_case(n, scoring), 7))
+    for n in ((6, 60) if quick else (6, 500)):
+        cases.append((f"json_outputs[places={n}]", n, lambda n=n: _json_case(n), 7))
+    top_n = 20 if quick else 60
+    cases.append((f"pipeline_e2e[places={top_n},latency={E2E_LATENCY_MS}ms]", top_n,
+                  lambda: _pipeline_case(top_n), 3))
+    return cases
@@ -0,0 +1,109 @@
+# benchmarks/harness.py
+import gc
+import json
+import os
+import time
+import tracemalloc
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baseline.json")
+# Qué tanto puede empeorar un caso respecto al baseline antes de fallar el --check
+DEFAULT_TOLERANCE = 0.30
+# Métricas comparadas en --check (más alto = peor)
+CHECKED_METRICS = ("p50_ms", "peak_kb")
+# Diferencia absoluta mínima para contar como regresión, además de la relativa:
+# en casos de menos de un milisegundo el 30% es ruido del scheduler del sistema
+ABSOLUTE_FLOORS = {"p50_ms": 0.5, "peak_kb": 64}
+# Duración mínima de cada muestra: los casos más rápidos se cronometran en
+# tandas de varias llamadas (y se divide), así un solo corte del scheduler no
+# duplica el p50
+MIN_SAMPLE_SECONDS = 0.02
+
+
+def percentile(values: list, pct: float):
+    """
+    Percentil por rango más cercano (mismo criterio que extractors/metrics.py).
+    """
+    if not values:
+        return None
+    ordered = sorted(values)
+    k = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[k]
+
+
+def run_case(fn, items: int, repeat: int = 5, warmup: int = 1):
+    """
+    Mide `fn()` (procesa `items` elementos): `repeat` muestras cronometradas
+    después de `warmup`, y una corrida aparte con tracemalloc para el pico de
+    memoria (así el tracing no infla los tiempos). Cada muestra dura al menos
+    MIN_SAMPLE_SECONDS (varias llamadas si `fn` es más rápida) y cuenta el
+    tiempo promedio por llamada.
+    """
+    calls = 1
+    for _ in range(warmup):
+        t0 = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - t0
+        calls = max(calls, min(1000, int(MIN_SAMPLE_SECONDS / max(elapsed, 1e-6)) + 1))
+
+    durations = []
+    for _ in range(repeat):
+        gc.collect()
+        t0 = time.perf_counter()
+        for _ in range(calls):
+            fn()
+        durations.append((time.perf_counter() - t0) / calls)
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    p50 = percentile(durations, 50)
+    return {
+        "items": items,
+        "repeat": repeat,
+        "p50_ms": round(p50 * 1000, 3),
+        "p95_ms": round(percentile(durations, 95) * 1000, 3),
+        "throughput_per_s": round(items / p50, 1) if p50 else None,
+        "peak_kb": round(peak / 1024, 1),
+    }
+
+
+def load_baseline(path: str = BASELINE_PATH):
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_baseline(results: dict, path: str = BASELINE_PATH):
+    """
+    Guarda los resultados como baseline (se mezclan con los casos que no se corrieron).
+    """
+    baseline = load_baseline(path)
+    baseline.update(results)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(dict(sorted(baseline.items())), f, ensure_ascii=False, indent=2)
+        f.write("\n")
+
+
+def compare(results: dict, baseline: dict, tolerance: float = DEFAULT_TOLERANCE):
+    """
+    Regresiones contra el baseline: lista de (caso, métrica, baseline, actual)
+    donde el valor actual supera al del baseline en más de `tolerance` y
+    en más de ABSOLUTE_FLOORS[métrica]. Los casos sin baseline no se comparan.
+    """
+    regressions = []
+    for name, result in results.items():
+        before = baseline.get(name)
+        if not before:
+            continue
+        for metric in CHECKED_METRICS:
+            old, new = before.get(metric), result.get(metric)
+            if old and new is not None and new > old * (1 + tolerance) \
+                    and new - old > ABSOLUTE_FLOORS.get(metric, 0):
+                regressions.append((name, metric, old, new))
+    return regressions
@@ -0,0 +1,273 @@
+# composer/history.py
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+
+from composer.ranking import score_places
+
+HISTORY_ENABLED = os.getenv("RUN_HISTORY", "1") != "0"
+HISTORY_PATH = os.getenv("RUN_HISTORY_PATH", os.path.join("outputs", "history.sqlite3"))
+
+_SCHEMA = [
+    "CREATE TABLE IF NOT EXISTS runs ("
+    " run_id INTEGER PRIMARY KEY,"
+    " run_at TEXT NOT NULL,"
+    " keyword TEXT NOT NULL,"
+    " location_text TEXT NOT NULL,"
+    " formatted_location TEXT,"
+    " center_lat REAL, center_lng REAL,"
+    " radius_m INTEGER, top_n INTEGER,"
+    " vertical TEXT, fetch_tier TEXT, scoring TEXT,"
+    " meta TEXT)",
+    "CREATE INDEX IF NOT EXISTS idx_runs_query ON runs(keyword, location_text, run_at)",
+    "CREATE INDEX IF NOT EXISTS idx_runs_time ON runs(run_at)",
+    # Datos estables de cada lugar (el último visto gana)
+    "CREATE TABLE IF NOT EXISTS places ("
+    " place_id TEXT PRIMARY KEY,"
+    " name TEXT, address TEXT, maps_url TEXT,"
+    " lat REAL, lng REAL,"
+    " first_run INTEGER, last_run INTEGER)",
+    # Una fila por lugar y corrida: lo que cambia con el tiempo
+    "CREATE TABLE IF NOT EXISTS run_places ("
+    " run_id INTEGER NOT NULL,"
+    " position INTEGER NOT NULL,"
+    " place_id TEXT NOT NULL,"
+    " rating REAL, reviews_count INTEGER, score REAL,"
+    " source TEXT, error TEXT,"
+    " PRIMARY KEY (run_id, position))",
+    "CREATE INDEX IF NOT EXISTS idx_run_places_place ON run_places(place_id, run_id)",
+    # Cada review se guarda una sola vez, aunque aparezca en muchas corridas
+    "CREATE TABLE IF NOT EXISTS reviews ("
+    " review_key TEXT PRIMARY KEY,"
+    " place_id TEXT NOT NULL,"
+    " author_name TEXT, author_url TEXT,"
+    " rating INTEGER, time INTEGER, language TEXT,"
+    " relative_time_description TEXT, text TEXT,"
+    " first_run INTEGER)",
+    "CREATE INDEX IF NOT EXISTS idx_reviews_place ON reviews(place_id, time)",
+    "CREATE TABLE IF NOT EXISTS run_reviews ("
+    " run_id INTEGER NOT NULL,"
+    " review_key TEXT NOT NULL,"
+    " position INTEGER NOT NULL,"
+    " PRIMARY KEY (run_id, review_key))",
+]
+
+# Columnas de raw que tienen su propia columna en `runs`; el resto va a `meta`
+_RUN_COLUMNS = ("run_at", "keyword", "location_text", "formatted_location", "radius_m", "top_n",
+                "vertical", "fetch_tier", "scoring")
+
+
+def review_key(place_id: str, review: dict):
+    """
+    Identidad de una review: lugar + autor + fecha (igual que merge_reviews).
+    """
+    author = review.get("author_url") or review.get("author_name") or ""
+    raw = json.dumps([place_id, author, review.get("time")], ensure_ascii=False)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+class HistoryStore:
+    """
+    Historial de corridas en SQLite, solo de agregado (append-only):
+
+    - `runs`: una fila por corrida (consulta, parámetros, métricas en `meta`).
+    - `places` + `run_places`: datos estables del lugar una vez; rating,
+      total de reseñas y score por corrida.
+    - `reviews` + `run_reviews`: cada review una sola vez aunque se repita
+      entre corridas; `run_reviews` dice qué reviews vio cada corrida.
+
+    Índices por place_id, keyword + ubicación y fecha de corrida, para
+    analítica con SQL sin cargar JSONs.
+    """
+
+    def __init__(self, path: str = HISTORY_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        for statement in _SCHEMA:
+            self._conn.execute(statement)
+        self._conn.commit()
+
+    def append_run(self, raw: dict):
+        """
+        Agrega una corrida (el `raw` del pipeline). Devuelve su run_id.
+        """
+        places = raw.get("places") or []
+        center = raw.get("center") or {}
+        scores = score_places(places, raw.get("scoring"), center or None) if places else []
+        meta = {k: v for k, v in raw.items() if k not in _RUN_COLUMNS + ("places", "center")}
+
+        with self._lock, self._conn:
+            cur = self._conn.execute(
+                "INSERT INTO runs (run_at, keyword, location_text, formatted_location, center_lat, center_lng,"
+                " radius_m, top_n, vertical, fetch_tier, scoring, meta)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (raw.get("run_at") or "", raw.get("keyword") or "", raw.get("location_text") or "",
+                 raw.get("formatted_location"), center.get("lat"), center.get("lng"),
+                 raw.get("radius_m"), raw.get("top_n"), raw.get("vertical"), raw.get("fetch_tier"),
+                 raw.get("scoring"), json.dumps(meta, ensure_ascii=False, separators=(",", ":")))
+            )
+            run_id = cur.lastrowid
+
+            for position, (p, score) in enumerate(zip(places, scores)):
+                place_id = p.get("place_id")
+                loc = p.get("location") or {}
+                self._conn.execute(
+                    "INSERT INTO places (place_id, name, address, maps_url, lat, lng, first_run, last_run)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?, ?)"
+                    " ON CONFLICT(place_id) DO UPDATE SET"
+                    " name = COALESCE(excluded.name, name), address = COALESCE(excluded.address, address),"
+                    " maps_url = COALESCE(excluded.maps_url, maps_url), lat = COALESCE(excluded.lat, lat),"
+                    " lng = COALESCE(excluded.lng, lng), last_run = excluded.last_run",
+                    (place_id, p.get("name"), p.get("address"), p.get("maps_url"),
+                     loc.get("lat"), loc.get("lng"), run_id, run_id)
+                )
+                self._conn.execute(
+                    "INSERT INTO run_places (run_id, position, place_id, rating, reviews_count, score, source, error)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (run_id, position, place_id, p.get("rating"), p.get("reviews_count"), score,
+                     p.get("source"), p.get("error"))
+                )
+                for n, r in enumerate(p.get("reviews") or []):
+                    key = review_key(place_id, r)
+                    self._conn.execute(
+                        "INSERT OR IGNORE INTO reviews (review_key, place_id, author_name, author_url, rating,"
+                        " time, language, relative_time_description, text, first_run)"
+                        " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                        (key, place_id, r.get("author_name"), r.get("author_url"), r.get("rating"),
+                         r.get("time"), r.get("language"), r.get("relative_time_description"),
+                         r.get("text"), run_id)
+                    )
+                    self._conn.execute(
+                        "INSERT OR IGNORE INTO run_reviews (run_id, review_key, position) VALUES (?, ?, ?)",
+                        (run_id, key, n)
+                    )
+        return run_id
+
+    def runs(self, keyword: str = None, location_text: str = None, limit: int = 50):
+        """
+        Corridas más recientes (opcionalmente de una consulta), como dicts.
+        """
+        sql = "SELECT run_id, run_at, keyword, location_text, vertical, fetch_tier, scoring FROM runs"
+        where, args = [], []
+        if keyword is not None:
+            where.append("keyword = ?")
+            args.append(keyword)
+        if location_text is not None:
+            where.append("location_text = ?")
+            args.append(location_text)
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY run_at DESC, run_id DESC LIMIT ?"
+        with self._lock:
+            rows = self._conn.execute(sql, args + [limit]).fetchall()
+        return [dict(r) for r in rows]
+
+    def load_run(self, run_id: int):
+        """
+        Reconstruye el `raw` de una corrida (lugares con sus reviews; sin métricas
+        si no se guardaron en `meta`). None si no existe.
+        """
+        with self._lock:
+            run = self._conn.execute("SELECT * FROM runs WHERE run_id = ?", (run_id,)).fetchone()
+            if run is None:
+                return None
+            places = self._conn.execute(
+                "SELECT rp.position, rp.place_id, rp.rating, rp.reviews_count, rp.source, rp.error,"
+                " p.name, p.address, p.maps_url, p.lat, p.lng"
+                " FROM run_places rp JOIN places p ON p.place_id = rp.place_id"
+                " WHERE rp.run_id = ? ORDER BY rp.position", (run_id,)
+            ).fetchall()
+            reviews = self._conn.execute(
+                "SELECT r.* FROM run_reviews rr JOIN reviews r ON r.review_key = rr.review_key"
+                " WHERE rr.run_id = ? ORDER BY r.place_id, rr.position", (run_id,)
+            ).fetchall()
+
+        by_place = {}
+        for r in reviews:
+            review = {k: r[k] for k in ("author_name", "author_url", "rating", "time", "language",
+                                        "relative_time_description", "text") if r[k] is not None}
+            by_place.setdefault(r["place_id"], []).append(review)
+
+        raw = {k: run[k] for k in _RUN_COLUMNS}
+        if run["center_lat"] is not None:
+            raw["center"] = {"lat": run["center_lat"], "lng": run["center_lng"]}
+        raw.update(json.loads(run["meta"] or "{}"))
+        raw["places"] = []
+        for p in places:
+            details = {
+                "place_id": p["place_id"],
+                "name": p["name"],
+                "rating": p["rating"],
+                "reviews_count": p["reviews_count"],
+                "address": p["address"],
+                "maps_url": p["maps_url"],
+                "location": {"lat": p["lat"], "lng": p["lng"]} if p["lat"] is not None else None,
+                "reviews": by_place.get(p["place_id"], []),
+            }
+            if p["source"]:
+                details["source"] = p["source"]
+            if p["error"]:
+                details["error"] = p["error"]
+            raw["places"].append(details)
+        return raw
+
+    def place_reviews(self, place_ids: list):
+        """
+        Todas las reviews guardadas de esos lugares (de cualquier corrida),
+        como {place_id: [review, ...]} de la más reciente a la más antigua.
+        """
+        ids = [p for p in dict.fromkeys(place_ids) if p]
+        out = {}
+        # de a 500 ids: límite de variables por consulta de SQLite
+        for i in range(0, len(ids), 500):
+            chunk = ids[i:i + 500]
+            with self._lock:
+                rows = self._conn.execute(
+                    "SELECT * FROM reviews WHERE place_id IN (%s) ORDER BY place_id, time DESC"
+                    % ",".join("?" * len(chunk)), chunk
+                ).fetchall()
+            for r in rows:
+                review = {k: r[k] for k in ("author_name", "author_url", "rating", "time", "language",
+                                            "relative_time_description", "text") if r[k] is not None}
+                out.setdefault(r["place_id"], []).append(review)
+        return out
+
+    def latest_run(self, keyword: str, location_text: str):
+        """
+        `raw` de la última corrida de la consulta (para el modo incremental), o None.
+        """
+        runs = self.runs(keyword, location_text, limit=1)
+        return self.load_run(runs[0]["run_id"]) if runs else None
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_history():
+    """
+    Historial compartido del proceso, o None si está deshabilitado (RUN_HISTORY=0).
+    """
+    global _store
+    if not HISTORY_ENABLED:
+        return None
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = HistoryStore(HISTORY_PATH)
+    return _store
+
+
+def record_run(raw: dict):
+    """
+    Agrega la corrida al historial si está habilitado; devuelve el run_id o None.
+    """
+    store = get_history()
+    return store.append_run(raw) if store else None
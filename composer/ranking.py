@@ -0,0 +1,187 @@
+# composer/ranking.py
+import heapq
+import math
+import os
+import time
+
+try:
+    import numpy as np  # opcional: scoring vectorizado para listas grandes
+except ImportError:
+    np = None
+
+# Fórmula por defecto: "<base>[,<modificador>...]" (ver SCORERS / MODIFIERS)
+DEFAULT_SCORING = os.getenv("RANKING_SCORING", "premium")
+# Peso del prior (en reseñas) del promedio bayesiano
+BAYES_PRIOR_REVIEWS = float(os.getenv("RANKING_BAYES_PRIOR", "50"))
+# Decaimiento por distancia al centro geocodificado: score * e^(-km / escala)
+DISTANCE_SCALE_KM = float(os.getenv("RANKING_DISTANCE_SCALE_KM", "10"))
+# Recencia: el score se reduce a la mitad cada N días sin reseñas nuevas
+RECENCY_HALF_LIFE_DAYS = float(os.getenv("RANKING_RECENCY_HALF_LIFE_DAYS", "180"))
+# Con menos lugares que esto, Python puro es más rápido que NumPy
+NUMPY_MIN_PLACES = 64
+
+EARTH_RADIUS_KM = 6371.0
+
+
+def _features(places: list, center: dict, now: float):
+    """
+    Columnas de entrada de los scorers (None = dato faltante).
+    Acepta detalles (reviews_count) o resultados de Text Search (user_ratings_total).
+    """
+    rating, total, distance, age = [], [], [], []
+    for p in places:
+        rating.append(p.get("rating"))
+        total.append(p.get("reviews_count", p.get("user_ratings_total")))
+
+        loc = p.get("location") or {}
+        if center and loc.get("lat") is not None and loc.get("lng") is not None:
+            distance.append(haversine_km(center["lat"], center["lng"], loc["lat"], loc["lng"]))
+        else:
+            distance.append(None)
+
+        times = [r.get("time") for r in p.get("reviews") or [] if r.get("time")]
+        age.append(max(0.0, (now - max(times)) / 86400) if times else None)
+
+    return {"rating": rating, "total": total, "distance_km": distance, "age_days": age}
+
+
+def haversine_km(lat1: float, lng1: float, lat2: float, lng2: float):
+    p1, p2 = math.radians(lat1), math.radians(lat2)
+    dp, dl = p2 - p1, math.radians(lng2 - lng1)
+    a = math.sin(dp / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(dl / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+def _column(values: list):
+    # None → NaN para operar en bloque
+    return np.array([math.nan if v is None else v for v in values], dtype=float)
+
+
+# ---- Scores base: rating + volumen de reseñas
+
+def _premium(f: dict, vectorized: bool):
+    """
+    rating * 10 + hasta 20 puntos por volumen (raíz del total de reseñas), redondeado.
+    """
+    if vectorized:
+        rating = np.nan_to_num(_column(f["rating"]))
+        total = np.nan_to_num(_column(f["total"]))
+        return np.rint(rating * 10 + np.minimum(20, np.sqrt(total)))
+    return [round((r or 0) * 10 + min(20, (n or 0) ** 0.5)) for r, n in zip(f["rating"], f["total"])]
+
+
+def _bayesian(f: dict, vectorized: bool):
+    """
+    Como `premium` pero con el rating encogido hacia el promedio del mercado:
+    (C * promedio + n * rating) / (C + n), con C = BAYES_PRIOR_REVIEWS.
+    Un 5.0 con 3 reseñas ya no le gana a un 4.8 con 2,000.
+    """
+    prior = BAYES_PRIOR_REVIEWS
+    if vectorized:
+        rating = _column(f["rating"])
+        total = np.where(np.isnan(rating), 0, np.nan_to_num(_column(f["total"])))
+        rating = np.nan_to_num(rating)
+        mean = (rating * total).sum() / total.sum() if total.sum() else 0.0
+        shrunk = (prior * mean + total * rating) / (prior + total)
+        return shrunk * 10 + np.minimum(20, np.sqrt(total))
+
+    pairs = [(r or 0, (n or 0) if r is not None else 0) for r, n in zip(f["rating"], f["total"])]
+    weight = sum(n for _, n in pairs)
+    mean = sum(r * n for r, n in pairs) / weight if weight else 0.0
+    return [(prior * mean + n * r) / (prior + n) * 10 + min(20, n ** 0.5) for r, n in pairs]
+
+
+# ---- Modificadores: multiplican el score base (1.0 si falta el dato)
+
+def _distance(f: dict, vectorized: bool):
+    if vectorized:
+        return np.nan_to_num(np.exp(-_column(f["distance_km"]) / DISTANCE_SCALE_KM), nan=1.0)
+    return [1.0 if d is None else math.exp(-d / DISTANCE_SCALE_KM) for d in f["distance_km"]]
+
+
+def _recency(f: dict, vectorized: bool):
+    if vectorized:
+        return np.nan_to_num(0.5 ** (_column(f["age_days"]) / RECENCY_HALF_LIFE_DAYS), nan=1.0)
+    return [1.0 if a is None else 0.5 ** (a / RECENCY_HALF_LIFE_DAYS) for a in f["age_days"]]
+
+
+SCORERS = {
+    "premium": _premium,
+    "bayesian": _bayesian,
+}
+
+MODIFIERS = {
+    "distance": _distance,
+    "recency": _recency,
+}
+
+
+def parse_scoring(scoring: str):
+    """
+    "bayesian,distance" → ("bayesian", ["distance"]). Levanta ValueError si
+    la fórmula o algún modificador no existe.
+    """
+    names = [s.strip() for s in (scoring or DEFAULT_SCORING).split(",") if s.strip()]
+    base, modifiers = names[0], names[1:]
+    if base not in SCORERS:
+        raise ValueError(f"Scoring inválido: {base} (usar {', '.join(SCORERS)})")
+    for name in modifiers:
+        if name not in MODIFIERS:
+            raise ValueError(f"Modificador de scoring inválido: {name} (usar {', '.join(MODIFIERS)})")
+    return base, modifiers
+
+
+def score_places(places: list, scoring: str = None, center: dict = None, now: float = None):
+    """
+    Scores de todos los lugares en una pasada. `scoring` es la fórmula base
+    más modificadores opcionales (ej. "bayesian,distance,recency"); `center`
+    ({"lat", "lng"}) habilita el decaimiento por distancia.
+
+    Con NumPy y suficientes lugares se calcula en bloque; si no, en Python.
+    "premium" solo devuelve enteros (el score histórico del reporte); con otra
+    fórmula o modificadores, floats redondeados a 1 decimal.
+    """
+    base, modifiers = parse_scoring(scoring)
+    f = _features(places, center, time.time() if now is None else now)
+    vectorized = np is not None and len(places) >= NUMPY_MIN_PLACES
+
+    scores = SCORERS[base](f, vectorized)
+    for name in modifiers:
+        factors = MODIFIERS[name](f, vectorized)
+        scores = scores * factors if vectorized else [s * m for s, m in zip(scores, factors)]
+
+    if vectorized:
+        scores = scores.tolist()
+    if base == "premium" and not modifiers:
+        return [int(s) for s in scores]
+    return [round(s, 1) for s in scores]
+
+
+def top_k(scores: list, k: int):
+    """
+    Índices de los `k` mejores scores, de mayor a menor (empates: el que
+    viene primero), sin ordenar la lista completa.
+    """
+    n = len(scores)
+    k = max(0, min(k, n))
+    if not k:
+        return []
+    if np is None or n < NUMPY_MIN_PLACES:
+        return heapq.nlargest(k, range(n), key=lambda i: (scores[i], -i))
+
+    values = np.asarray(scores, dtype=float)
+    kth = np.partition(values, n - k)[n - k]
+    above = np.flatnonzero(values > kth)
+    ties = np.flatnonzero(values == kth)[: k - len(above)]
+    selected = np.concatenate([above, ties])
+    return selected[np.lexsort((selected, -values[selected]))].tolist()
+
+
+def rank_of(scores: list, index: int):
+    """
+    Posición (1 = mejor) del lugar `index`; los empates comparten posición.
+    """
+    if not scores:
+        return None
+    target = scores[index]
+    return 1 + sum(1 for s in scores if s > target)
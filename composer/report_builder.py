@@ -1,11 +1,53 @@
 # composer/report_builder.py
 import urllib.parse
-from analyzers.reviews_analyzer import analyze_reviews
+from analyzers.lexicon import DEFAULT_VERTICAL
+from analyzers.reviews_analyzer import analyze_place
+from analyzers.term_matrix import market_insight
+from composer.ranking import rank_of, score_places, top_k
 
-def build_report(keyword: str, location_text: str, formatted_location: str, places_details: list):
+def build_place_entries(place: dict, analysis: dict, index: int):
+    """
+    Entradas de un lugar para `places_detail` y `comparison_table`.
+    El lugar en la posición 0 es el CLIENTE.
+    """
+    role = "CLIENTE" if index == 0 else "Competencia"
+    name = place.get("name","")
+    top_products = analysis.get("top_products", [])
+
+    detail = {
+        "name": name,
+        "role": role,
+        "rating": place.get("rating"),
+        "reviews_count": place.get("reviews_count"),
+        "strengths": [],
+        "weaknesses": [],
+        "top_products": top_products
+    }
+
+    row = {
+        "name": name,
+        "role": role,
+        "stars": [x["product"] for x in top_products[:4]],
+        "summary": "",
+        "best_comment": analysis.get("featured_testimonial",""),
+        "worst_finding": ""
+    }
+
+    return detail, row
+
+
+def build_report(keyword: str, location_text: str, formatted_location: str, places_details: list,
+                 vertical: str = DEFAULT_VERTICAL, scoring: str = None, center: dict = None,
+                 review_history: dict = None, review_index=None):
     """
     Construye el reporte con secciones fijas (template estable),
     usando keyword + ubicación y la lista de lugares con detalles.
+    `vertical` elige el lexicón de productos (ver analyzers/lexicons/).
+    `scoring` / `center` controlan la comparativa premium (ver composer/ranking.py).
+    `review_history` ({place_id: reseñas guardadas}) amplía la muestra del
+    insight estratégico (ver analyzers/term_matrix.py).
+    `review_index` (composer/review_index.py) llena las quejas relacionadas
+    con la reseña negativa urgente del cliente.
     """
 
     google_search_url = "https://www.google.com/search?q=" + urllib.parse.quote_plus(f"{keyword} {location_text}")
@@ -32,8 +74,8 @@ def build_report(keyword: str, location_text: str, formatted_location: str, plac
             "comparison_table": [],
             "strategic_insight": {
                 "headline": "Ultra Premium vs Premium Prime: oportunidad real",
-                "what_they_value": ["Calidad Prime","Frescura garantizada","Servicio personalizado","Precios justos"],
-                "what_they_dont_mention": ["Wagyu","Tomahawk","Picaña"]
+                "what_they_value": [],
+                "what_they_dont_mention": []
             },
             "gmb_plan": {
                 "actions": [],
@@ -45,20 +87,30 @@ def build_report(keyword: str, location_text: str, formatted_location: str, plac
 
     # Treat first result as CLIENTE por ahora (simple y estable)
     client = places_details[0]
-    client_reviews = client.get("reviews", [])
-    client_a = analyze_reviews(client_reviews)
 
-    # total reviews analizadas (muestra)
-    total_reviews_used = sum(len(p.get("reviews", [])) for p in places_details)
+    # Un solo análisis por lugar (memoizado); todas las secciones leen de aquí
+    analyses = [analyze_place(p, vertical) for p in places_details]
+    client_a = analyses[0]
+
+    # Scores de todos los lugares en bloque; posición real del cliente
+    scores = score_places(places_details, scoring, center)
 
-    # comparativa simple "calidad premium"
+    total_reviews_used = 0
     comp = []
-    for p in places_details:
-        rating = p.get("rating") or 0
-        total = p.get("reviews_count") or 0
-        score = int(round(rating * 10 + min(20, (total ** 0.5))))
-        comp.append({"name": p.get("name",""), "score": score})
-    comp.sort(key=lambda x: x["score"], reverse=True)
+    places_detail = []
+    comparison_table = []
+    for i, (p, a) in enumerate(zip(places_details, analyses)):
+        # total reviews analizadas (muestra)
+        total_reviews_used += len(p.get("reviews", []))
+
+        # comparativa "calidad premium"
+        comp.append({"name": p.get("name",""), "score": scores[i]})
+
+        detail, row = build_place_entries(p, a, i)
+        places_detail.append(detail)
+        comparison_table.append(row)
+
+    comp = [comp[i] for i in top_k(scores, 6)]
 
     # acciones GMB base (estáticas por ahora)
     actions = [
@@ -69,12 +121,19 @@ def build_report(keyword: str, location_text: str, formatted_location: str, plac
     ]
 
     urgent = client_a.get("urgent_negative")
+    related_complaints = []
+    if urgent and review_index is not None:
+        related_complaints = review_index.related_complaints(client.get("place_id"), urgent)
+
+    # Lo que el mercado elogia y lo que los competidores tienen y el cliente no
+    insight = market_insight(places_details, vertical, review_history=review_history,
+                             exclude_words=(keyword, location_text, formatted_location))
 
     report = {
         "seo_optimization": {
             "query": f"{keyword} | {formatted_location}",
             "google_search_url": google_search_url,
-            "current_position": 1,  # en este MVP: cliente = #1 de la lista
+            "current_position": rank_of(scores, 0),  # posición del cliente por score
             "target_top": 10,
             "objective_6_months": "Top 10",
             "potential_clients_per_month": 0,
@@ -82,19 +141,19 @@ def build_report(keyword: str, location_text: str, formatted_location: str, plac
         },
         "competitive_reviews": {
             "reviews_analyzed_total": total_reviews_used,
-            "premium_quality_comparison": comp[:6],
+            "premium_quality_comparison": comp,
             "client_top_products": client_a.get("top_products", []),
             "featured_testimonial": {
                 "text": client_a.get("featured_testimonial",""),
                 "source_place": client.get("name","")
             }
         },
-        "places_detail": [],
-        "comparison_table": [],
+        "places_detail": places_detail,
+        "comparison_table": comparison_table,
         "strategic_insight": {
             "headline": "Ultra Premium vs Premium Prime: oportunidad real",
-            "what_they_value": ["Calidad Prime","Frescura garantizada","Servicio personalizado","Precios justos"],
-            "what_they_dont_mention": ["Wagyu","Tomahawk","Picaña"]
+            "what_they_value": insight["what_they_value"],
+            "what_they_dont_mention": insight["what_they_dont_mention"]
         },
         "gmb_plan": {
             "actions": actions,
@@ -103,34 +162,10 @@ def build_report(keyword: str, location_text: str, formatted_location: str, plac
                 "reviewer": (urgent.get("author_name") if urgent else ""),
                 "problem": (urgent.get("text") if urgent else ""),
                 "plan": "Contacto personal + compensación + seguimiento para intentar edición/actualización de reseña",
-                "related_complaints": []
+                "related_complaints": related_complaints
             },
             "goal": "Convertir review negativo en positivo"
         }
     }
 
-    # llenar places_detail + comparison_table
-    for i, p in enumerate(places_details):
-        a = analyze_reviews(p.get("reviews", []))
-        role = "CLIENTE" if i == 0 else "Competencia"
-
-        report["places_detail"].append({
-            "name": p.get("name",""),
-            "role": role,
-            "rating": p.get("rating"),
-            "reviews_count": p.get("reviews_count"),
-            "strengths": [],
-            "weaknesses": [],
-            "top_products": a.get("top_products", [])
-        })
-
-        report["comparison_table"].append({
-            "name": p.get("name",""),
-            "role": role,
-            "stars": [x["product"] for x in a.get("top_products", [])[:4]],
-            "summary": "",
-            "best_comment": a.get("featured_testimonial",""),
-            "worst_finding": ""
-        })
-
     return report
@@ -0,0 +1,120 @@
+# composer/report_diff.py
+import json
+import os
+
+# Reviews con rating <= a esto cuentan como negativas en el diff
+NEGATIVE_MAX_RATING = 2
+
+
+def _norm(text: str):
+    return " ".join((text or "").lower().split())
+
+
+def compatible_previous(previous: dict, keyword: str, location_text: str):
+    """
+    Devuelve `previous` si es una corrida de la misma keyword + ubicación, si no None.
+    """
+    if not previous:
+        return None
+    if _norm(previous.get("keyword")) != _norm(keyword):
+        return None
+    if _norm(previous.get("location_text")) != _norm(location_text):
+        return None
+    return previous
+
+
+def load_previous_run(path: str, keyword: str, location_text: str):
+    """
+    Lee un raw.json anterior (o snapshot guardado) para el modo incremental.
+    Devuelve None si no existe o es de otra consulta.
+    """
+    if not path or not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as f:
+        previous = json.load(f)
+    return compatible_previous(previous, keyword, location_text)
+
+
+def reusable_details(previous: dict):
+    """
+    place_id → detalles de la corrida anterior que se pueden reutilizar:
+    solo los que vinieron de Place Details (no de Text Search ni de un error).
+    """
+    reusable = {}
+    for details in (previous or {}).get("places", []):
+        if details.get("place_id") and not details.get("source") and not details.get("error"):
+            reusable[details["place_id"]] = details
+    return reusable
+
+
+def unchanged(place: dict, previous_details: dict):
+    """
+    True si el resultado de Text Search tiene el mismo rating y total de
+    reseñas que los detalles anteriores (no hace falta volver a pedirlos).
+    """
+    return (place.get("rating") == previous_details.get("rating")
+            and place.get("user_ratings_total") == previous_details.get("reviews_count"))
+
+
+def _summary(details: dict):
+    return {
+        "place_id": details.get("place_id"),
+        "name": details.get("name"),
+        "rating": details.get("rating"),
+        "reviews_count": details.get("reviews_count"),
+    }
+
+
+def _review_key(review: dict):
+    return (review.get("author_url") or review.get("author_name"), review.get("time"))
+
+
+def build_diff(previous: dict, places_details: list):
+    """
+    Sección "diff" del modo incremental contra la corrida anterior:
+    competidores nuevos / que salieron, cambios de rating y total de
+    reseñas, y reviews negativas que no estaban antes.
+    """
+    prev_places = {p.get("place_id"): p for p in (previous or {}).get("places", []) if p.get("place_id")}
+    current_ids = {p.get("place_id") for p in places_details}
+
+    new_competitors = []
+    rating_changes = []
+    new_negative_reviews = []
+
+    for details in places_details:
+        before = prev_places.get(details.get("place_id"))
+        if before is None:
+            new_competitors.append(_summary(details))
+            continue
+
+        rating, prev_rating = details.get("rating"), before.get("rating")
+        count, prev_count = details.get("reviews_count"), before.get("reviews_count")
+        if rating is not None and (rating != prev_rating or count != prev_count):
+            rating_changes.append({
+                **_summary(details),
+                "rating_delta": round(rating - prev_rating, 2) if prev_rating is not None else None,
+                "reviews_count_delta": count - prev_count if None not in (count, prev_count) else None,
+            })
+
+        seen = {_review_key(r) for r in before.get("reviews", [])}
+        for r in details.get("reviews", []):
+            stars = r.get("rating")
+            if stars is not None and stars <= NEGATIVE_MAX_RATING and _review_key(r) not in seen:
+                new_negative_reviews.append({
+                    "place_id": details.get("place_id"),
+                    "name": details.get("name"),
+                    "rating": stars,
+                    "time": r.get("time"),
+                    "text": r.get("text", ""),
+                })
+
+    dropped = [_summary(p) for pid, p in prev_places.items() if pid not in current_ids]
+
+    return {
+        "previous_run": (previous or {}).get("run_at"),
+        "new_competitors": new_competitors,
+        "dropped_competitors": dropped,
+        "rating_changes": rating_changes,
+        "new_negative_reviews": new_negative_reviews,
+    }
@@ -0,0 +1,87 @@
+# composer/report_stream.py
+import json
+import sys
+import threading
+
+from analyzers.lexicon import DEFAULT_VERTICAL
+from analyzers.reviews_analyzer import analyze_place
+from composer.report_builder import build_place_entries, build_report
+
+# Secciones que dependen de todos los lugares: se emiten al final
+AGGREGATE_SECTIONS = ("seo_optimization", "competitive_reviews", "strategic_insight", "gmb_plan")
+
+
+class ReportStream:
+    """
+    Compone el reporte de forma incremental.
+
+    - `start()` emite los datos de la consulta.
+    - `add_place(index, details)` analiza un lugar en cuanto llegan sus
+      detalles y emite su entrada de `places_detail` / `comparison_table`
+      (los lugares pueden llegar en cualquier orden; `index` es su posición).
+    - `finish(places_details)` arma el reporte completo y emite las
+      secciones agregadas (comparativa premium, totales, plan GMB).
+
+    Cada evento es un dict con "event" que se pasa a `emit`.
+    """
+
+    def __init__(self, keyword: str, location_text: str, formatted_location: str,
+                 emit, vertical: str = DEFAULT_VERTICAL, scoring: str = None, center: dict = None):
+        self.keyword = keyword
+        self.location_text = location_text
+        self.formatted_location = formatted_location
+        self.vertical = vertical
+        self.scoring = scoring
+        self.center = center
+        self.emit = emit
+
+    def start(self, **extra):
+        self.emit({
+            "event": "start",
+            "keyword": self.keyword,
+            "location_text": self.location_text,
+            "formatted_location": self.formatted_location,
+            "vertical": self.vertical,
+            **extra
+        })
+
+    def add_place(self, index: int, details: dict):
+        analysis = analyze_place(details, self.vertical)
+        detail, row = build_place_entries(details, analysis, index)
+        self.emit({
+            "event": "place",
+            "index": index,
+            "place_id": details.get("place_id"),
+            "places_detail": detail,
+            "comparison_table": row
+        })
+        return detail, row
+
+    def finish(self, places_details: list, review_history: dict = None, review_index=None):
+        report = build_report(
+            self.keyword, self.location_text, self.formatted_location,
+            places_details, vertical=self.vertical, scoring=self.scoring, center=self.center,
+            review_history=review_history, review_index=review_index
+        )
+        self.emit({
+            "event": "report",
+            **{section: report[section] for section in AGGREGATE_SECTIONS}
+        })
+        return report
+
+
+def ndjson_writer(fp=None):
+    """
+    `emit` que escribe cada evento como una línea JSON (NDJSON) y hace flush,
+    para que otro proceso pueda leerlo mientras se genera. Por defecto stdout.
+    """
+    fp = fp or sys.stdout
+    lock = threading.Lock()
+
+    def emit(event: dict):
+        line = json.dumps(event, ensure_ascii=False)
+        with lock:
+            fp.write(line + "\n")
+            fp.flush()
+
+    return emit
@@ -0,0 +1,284 @@
+# composer/review_index.py
+"""
+Índice invertido de reseñas (término → reseñas que lo mencionan), en SQLite
+junto a los outputs de las corridas. Se llena a medida que llegan los
+Place Details (ver pipeline.py) y acumula reseñas de todas las corridas,
+así que consultas como "reseñas de 2 estrellas o menos de los últimos 14
+días que mencionan 'brisket', de cualquier competidor" no releen texto:
+
+    python -m composer.review_index brisket --max-rating 2 --days 14 --exclude-place <place_id del cliente>
+"""
+import argparse
+import json
+import math
+import os
+import sqlite3
+import threading
+import time
+
+from analyzers.term_matrix import GENERIC_TERMS, MIN_TOKEN_LEN, STOPWORDS, tokenize
+from composer.history import review_key
+
+REVIEW_INDEX_ENABLED = os.getenv("REVIEW_INDEX", "1") != "0"
+REVIEW_INDEX_PATH = os.getenv("REVIEW_INDEX_PATH", os.path.join("outputs", "review_index.sqlite3"))
+
+# Reseñas con este rating o menos cuentan como queja
+COMPLAINT_MAX_RATING = 2
+# Quejas relacionadas: ventana hacia atrás desde la reseña urgente, y cuántas
+RELATED_DAYS = int(os.getenv("RELATED_COMPLAINTS_DAYS", "90"))
+RELATED_LIMIT = 5
+
+_SCHEMA = [
+    "CREATE TABLE IF NOT EXISTS docs ("
+    " doc_id INTEGER PRIMARY KEY,"
+    " review_key TEXT NOT NULL UNIQUE,"
+    " place_id TEXT NOT NULL, place_name TEXT,"
+    " author_name TEXT, rating INTEGER, time INTEGER, text TEXT)",
+    "CREATE INDEX IF NOT EXISTS idx_docs_place ON docs(place_id, time)",
+    "CREATE INDEX IF NOT EXISTS idx_docs_rating_time ON docs(rating, time)",
+    # rating y fecha repetidos en cada posting: los filtros se resuelven en el índice
+    "CREATE TABLE IF NOT EXISTS postings ("
+    " term TEXT NOT NULL, rating INTEGER NOT NULL, time INTEGER NOT NULL, doc_id INTEGER NOT NULL,"
+    " PRIMARY KEY (term, rating, time, doc_id)) WITHOUT ROWID",
+]
+
+_DOC_FIELDS = ("place_id", "place_name", "author_name", "rating", "time", "text")
+
+
+def index_terms(text: str):
+    """
+    Términos de una reseña: palabras normalizadas (sin acentos, minúsculas),
+    sin stopwords ni palabras cortas, cada una una vez.
+    """
+    return {t for t in tokenize(text) if len(t) >= MIN_TOKEN_LEN and t not in STOPWORDS}
+
+
+def query_terms(terms):
+    """
+    Términos de búsqueda: un texto ("dry brisket") o una lista de textos,
+    normalizados igual que el índice.
+    """
+    if isinstance(terms, str):
+        terms = [terms]
+    out = []
+    for text in terms or ():
+        for t in index_terms(text):
+            if t not in out:
+                out.append(t)
+    return out
+
+
+class ReviewIndex:
+    """
+    Índice en SQLite (`path` = ":memory:" para uno temporal):
+
+    - `docs`: cada reseña una sola vez (misma identidad que el historial:
+      lugar + autor + fecha), con lugar, rating y fecha epoch.
+    - `postings`: (término, rating, fecha, doc) por cada término distinto
+      de la reseña.
+
+    Thread-safe (un lock alrededor de la conexión, como HistoryStore).
+    """
+
+    def __init__(self, path: str = REVIEW_INDEX_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        for statement in _SCHEMA:
+            self._conn.execute(statement)
+        self._conn.commit()
+
+    def add_place(self, details: dict):
+        """
+        Indexa las reseñas de un lugar (Place Details normalizado) que aún
+        no están en el índice. Devuelve cuántas se agregaron.
+        """
+        place_id = details.get("place_id")
+        reviews = [r for r in details.get("reviews") or [] if (r.get("text") or "").strip()]
+        if not place_id or not reviews:
+            return 0
+        keyed = {review_key(place_id, r): r for r in reviews}
+
+        with self._lock, self._conn:
+            known = {row[0] for row in self._conn.execute(
+                "SELECT review_key FROM docs WHERE review_key IN (%s)" % ",".join("?" * len(keyed)), list(keyed)
+            )}
+            added = 0
+            for key, r in keyed.items():
+                if key in known:
+                    continue
+                rating, when = r.get("rating") or 0, r.get("time")
+                cur = self._conn.execute(
+                    "INSERT INTO docs (review_key, place_id, place_name, author_name, rating, time, text)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (key, place_id, details.get("name"), r.get("author_name"), rating, when, r.get("text"))
+                )
+                self._conn.executemany(
+                    "INSERT OR IGNORE INTO postings (term, rating, time, doc_id) VALUES (?, ?, ?, ?)",
+                    [(t, rating, when or 0, cur.lastrowid) for t in index_terms(r["text"])]
+                )
+                added += 1
+        return added
+
+    def search(self, terms=(), match_all: bool = True, min_rating: int = None, max_rating: int = None,
+               since: float = None, until: float = None, place_ids=None, exclude_place_ids=None,
+               limit: int = 50):
+        """
+        Reseñas que mencionan `terms` (todos, o alguno con `match_all=False`),
+        con rating entre `min_rating` y `max_rating` y fecha epoch entre
+        `since` y `until`; opcionalmente solo de `place_ids` o sin
+        `exclude_place_ids`. De la más reciente a la más antigua; con
+        `match_all=False` primero las que comparten más términos
+        ("matched" = cuántos).
+        """
+        terms = query_terms(terms)
+        bounds = [(column, op, value) for column, op, value in (
+            ("rating", ">=", min_rating), ("rating", "<=", max_rating),
+            ("time", ">=", since), ("time", "<=", until),
+        ) if value is not None]
+        args = [int(value) for _, _, value in bounds]
+
+        def filters(prefix: str = ""):
+            return [f"{prefix}{column} {op} ?" for column, op, _ in bounds]
+
+        place_filters, place_args = [], []
+        if place_ids is not None:
+            place_ids = list(place_ids)
+            place_filters.append("d.place_id IN (%s)" % ",".join("?" * len(place_ids)))
+            place_args += place_ids
+        if exclude_place_ids:
+            exclude_place_ids = list(exclude_place_ids)
+            place_filters.append("d.place_id NOT IN (%s)" % ",".join("?" * len(exclude_place_ids)))
+            place_args += exclude_place_ids
+
+        if not terms:
+            where = filters("d.")
+            sql = "SELECT d.*, 0 AS matched FROM docs d"
+            order = "d.time DESC"
+            sql_args = args
+        else:
+            # cada término es un rango del PRIMARY KEY de postings
+            posting = "SELECT doc_id FROM postings WHERE term = ?" + "".join(f" AND {f}" for f in filters())
+            if match_all:
+                hits = " INTERSECT ".join([posting] * len(terms))
+                sql = f"SELECT d.*, {len(terms)} AS matched FROM docs d JOIN ({hits}) h ON h.doc_id = d.doc_id"
+            else:
+                hits = " UNION ALL ".join([posting] * len(terms))
+                sql = ("SELECT d.*, h.matched FROM docs d JOIN"
+                       f" (SELECT doc_id, COUNT(*) AS matched FROM ({hits}) GROUP BY doc_id) h"
+                       " ON h.doc_id = d.doc_id")
+            where = []
+            order = "h.matched DESC, d.time DESC" if not match_all else "d.time DESC"
+            sql_args = [a for t in terms for a in [t] + args]
+
+        where += place_filters
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += f" ORDER BY {order}, d.doc_id DESC LIMIT ?"
+        with self._lock:
+            rows = self._conn.execute(sql, sql_args + place_args + [limit]).fetchall()
+        return [{**{k: r[k] for k in _DOC_FIELDS}, "review_key": r["review_key"], "matched": r["matched"]}
+                for r in rows]
+
+    def document_frequency(self, terms):
+        """
+        {término: reseñas indexadas que lo mencionan}.
+        """
+        terms = list(terms)
+        if not terms:
+            return {}
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT term, COUNT(*) FROM postings WHERE term IN (%s) GROUP BY term"
+                % ",".join("?" * len(terms)), terms
+            ).fetchall()
+        return {t: n for t, n in rows}
+
+    def count(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM docs").fetchone()[0]
+
+    def related_complaints(self, place_id: str, review: dict, days: int = RELATED_DAYS,
+                           limit: int = RELATED_LIMIT):
+        """
+        Otras quejas (rating <= COMPLAINT_MAX_RATING, hasta `days` días antes
+        de `review`, de cualquier lugar) que mencionan lo mismo que `review`.
+        Ordenadas por relevancia: términos compartidos pesados por qué tan
+        raros son en el índice (un término que está en todas las reseñas no
+        relaciona nada).
+        """
+        terms = [t for t in index_terms(review.get("text") or "") if t not in GENERIC_TERMS]
+        if not terms:
+            return []
+        since = (review.get("time") or time.time()) - days * 86400
+        own = review_key(place_id, review)
+        hits = self.search(terms, match_all=False, max_rating=COMPLAINT_MAX_RATING, since=since,
+                           limit=max(50, limit * 10))
+        hits = [h for h in hits if h["review_key"] != own]
+        if not hits:
+            return []
+
+        total = self.count()
+        df = self.document_frequency(terms)
+        idf = {t: math.log((1 + total) / (1 + df.get(t, 0))) + 1 for t in terms}
+
+        related = []
+        for h in hits:
+            shared = sorted(index_terms(h["text"] or "") & set(terms), key=lambda t: -idf[t])
+            related.append((sum(idf[t] for t in shared), h, shared))
+        related.sort(key=lambda x: (-x[0], -(x[1]["time"] or 0)))
+        return [
+            {"place": h["place_name"] or "", "place_id": h["place_id"], "reviewer": h["author_name"] or "",
+             "rating": h["rating"], "time": h["time"], "text": h["text"], "shared_terms": shared}
+            for _, h, shared in related[:limit]
+        ]
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_review_index():
+    """
+    Índice compartido del proceso, o None si está deshabilitado (REVIEW_INDEX=0).
+    """
+    global _index
+    if not REVIEW_INDEX_ENABLED:
+        return None
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = ReviewIndex(REVIEW_INDEX_PATH)
+    return _index
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Busca reseñas en el índice invertido")
+    parser.add_argument("terms", nargs="*", help="Términos (ej. brisket); vacío = todas")
+    parser.add_argument("--any", action="store_true", help="Alguno de los términos (default: todos)")
+    parser.add_argument("--min-rating", type=int)
+    parser.add_argument("--max-rating", type=int)
+    parser.add_argument("--days", type=float, help="Solo reseñas de los últimos N días")
+    parser.add_argument("--place", action="append", help="Solo este place_id (repetible)")
+    parser.add_argument("--exclude-place", action="append", help="Sin este place_id (repetible, ej. el cliente)")
+    parser.add_argument("--limit", type=int, default=50)
+    parser.add_argument("--path", default=REVIEW_INDEX_PATH)
+    args = parser.parse_args()
+
+    index = ReviewIndex(args.path)
+    hits = index.search(
+        args.terms, match_all=not args.any, min_rating=args.min_rating, max_rating=args.max_rating,
+        since=time.time() - args.days * 86400 if args.days else None,
+        place_ids=args.place, exclude_place_ids=args.exclude_place, limit=args.limit
+    )
+    for h in hits:
+        print(json.dumps(h, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
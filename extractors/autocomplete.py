@@ -0,0 +1,119 @@
+# extractors/autocomplete.py
+import os
+import unicodedata
+import uuid
+
+from extractors.http_client import GoogleAPIError, get_json
+from extractors.scheduler import QuotaExceeded, has_api_key, request_priority
+from extractors.ttl_cache import TTLCache
+
+AUTOCOMPLETE_TTL = int(os.getenv("AUTOCOMPLETE_TTL", "3600"))
+AUTOCOMPLETE_CACHE_SIZE = int(os.getenv("AUTOCOMPLETE_CACHE_SIZE", "2048"))
+# Places Autocomplete devuelve como máximo 5 predicciones por request
+MAX_PREDICTIONS = 5
+MIN_CHARS = 2
+# Respuestas que se memorizan (las demás se devuelven sin cachear)
+CACHEABLE_STATUSES = {"OK", "ZERO_RESULTS"}
+
+_cache = TTLCache(max_entries=AUTOCOMPLETE_CACHE_SIZE, ttl=AUTOCOMPLETE_TTL)
+
+
+def new_session_token():
+    """
+    Token de sesión de Autocomplete: agrupa todos los requests de una
+    misma búsqueda (mientras el usuario escribe) para facturación.
+    """
+    return uuid.uuid4().hex
+
+
+def _norm(text: str):
+    text = unicodedata.normalize("NFKD", (text or "").casefold())
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    return " ".join(text.replace(",", " ").split())
+
+
+def _matches(description: str, query: str):
+    words = _norm(description).split()
+    return all(any(w.startswith(token) for w in words) for token in query.split())
+
+
+def _from_shorter_prefix(query: str, country):
+    """
+    Si un prefijo más corto ya trajo la lista completa (menos de
+    MAX_PREDICTIONS), el texto extendido solo puede filtrar esa lista:
+    se responde sin llamar a Google.
+    """
+    for end in range(len(query) - 1, MIN_CHARS - 1, -1):
+        cached = _cache.get((query[:end], country))
+        if cached is None:
+            continue
+        if not cached["complete"]:
+            return None
+        return {
+            "items": [d for d in cached["items"] if _matches(d, query)],
+            "complete": True
+        }
+    return None
+
+
+def location_suggestions(text: str, country: str = None, session_token: str = None, limit: int = 15):
+    """
+    Sugerencias de ubicación (ciudad/estado/región/país) con Places Autocomplete.
+
+    - Memo por (texto normalizado, país) con LRU + TTL, compartido en el proceso.
+    - Reutiliza resultados de un prefijo más corto cuando ya estaban completos.
+    - `session_token` (ver `new_session_token`) agrupa la facturación de la búsqueda.
+    - Sin presupuesto del día o con Google caído devuelve [] (no se cachea):
+      la UI la llama en cada rerun y no puede romper la página.
+    """
+    query = _norm(text)
+    if len(query) < MIN_CHARS:
+        return []
+
+    if not has_api_key():
+        return []
+
+    country = country.lower() if country and country != "ALL" else None
+    cache_key = (query, country)
+
+    cached = _cache.get(cache_key)
+    if cached is None:
+        cached = _from_shorter_prefix(query, country)
+        if cached is not None:
+            _cache.set(cache_key, cached)
+
+    if cached is None:
+        # Autocomplete general: sirve para ciudad/estado/región/país
+        params = {
+            "input": text.strip(),
+            "types": "(regions)"   # clave: incluye estados/regiones/países y muchas ciudades también
+        }
+        if session_token:
+            params["sessiontoken"] = session_token
+
+        # filtro opcional por país (ej: "us" o "mx")
+        if country:
+            params["components"] = f"country:{country}"
+
+        # el usuario está escribiendo: pasa antes que cualquier batch en curso
+        try:
+            with request_priority("interactive"):
+                r = get_json("autocomplete", params)
+        except (QuotaExceeded, GoogleAPIError):
+            return []
+        preds = r.get("predictions") or []
+
+        # quitar duplicados conservando orden
+        items = []
+        for p in preds:
+            desc = p.get("description")
+            if desc and desc not in items:
+                items.append(desc)
+
+        cached = {"items": items, "complete": len(preds) < MAX_PREDICTIONS}
+        # REQUEST_DENIED / INVALID_REQUEST no dicen nada de las sugerencias: cacheadas
+        # como lista completa vaciarían también todos los prefijos más largos
+        if r.get("status") in CACHEABLE_STATUSES:
+            _cache.set(cache_key, cached)
+
+    return cached["items"][:limit]
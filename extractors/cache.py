@@ -0,0 +1,148 @@
+# extractors/cache.py
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import Counter
+
+CACHE_ENABLED = os.getenv("GOOGLE_CACHE", "1") != "0"
+CACHE_DIR = os.getenv("GOOGLE_CACHE_DIR", os.path.join("outputs", "cache"))
+CACHE_MAX_ENTRIES = int(os.getenv("GOOGLE_CACHE_MAX_ENTRIES", "50000"))
+
+# TTL (segundos) por endpoint: geocoding casi no cambia, ratings/reviews sí
+CACHE_TTLS = {
+    "geocode": 90 * 24 * 3600,
+    "textsearch": 24 * 3600,
+    "details": 3 * 24 * 3600,
+}
+
+# Parámetros de texto libre que normalizamos ("Houston, TX" == "houston,  tx")
+_TEXT_PARAMS = {"address", "query", "input"}
+# Parámetros que no forman parte de la llave (la API key no cambia la respuesta)
+_IGNORED_PARAMS = {"key", "sessiontoken"}
+
+
+def cache_key(endpoint: str, params: dict):
+    """
+    Llave estable para (endpoint, params): ignora la API key, normaliza
+    texto libre y ordena los parámetros.
+    """
+    norm = {}
+    for k, v in (params or {}).items():
+        if k in _IGNORED_PARAMS or v is None:
+            continue
+        v = str(v)
+        if k in _TEXT_PARAMS:
+            v = " ".join(v.lower().split())
+        norm[k] = v
+    raw = json.dumps([endpoint, norm], sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """
+    Cache persistente (SQLite) de respuestas JSON de Google Maps.
+
+    - TTL por endpoint (`ttls`); lo vencido cuenta como miss.
+    - Tamaño acotado: al pasar `max_entries` se borran las entradas
+      menos usadas recientemente (LRU por `last_access`).
+    - Contadores de hits/misses por endpoint en `stats()`.
+    """
+
+    def __init__(self, path: str, max_entries: int = CACHE_MAX_ENTRIES, ttls: dict = None):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttls = dict(CACHE_TTLS if ttls is None else ttls)
+        self.hits = Counter()
+        self.misses = Counter()
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT PRIMARY KEY,"
+            " endpoint TEXT NOT NULL,"
+            " body TEXT NOT NULL,"
+            " created_at REAL NOT NULL,"
+            " last_access REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_access ON responses(last_access)")
+        self._conn.commit()
+
+    def get(self, endpoint: str, params: dict):
+        key = cache_key(endpoint, params)
+        ttl = self.ttls.get(endpoint)
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT body, created_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or (ttl is not None and now - row[1] > ttl):
+                self.misses[endpoint] += 1
+                return None
+            self._conn.execute("UPDATE responses SET last_access = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            self.hits[endpoint] += 1
+        return json.loads(row[0])
+
+    def set(self, endpoint: str, params: dict, data: dict):
+        key = cache_key(endpoint, params)
+        now = time.time()
+        body = json.dumps(data, ensure_ascii=False, separators=(",", ":"))
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, endpoint, body, created_at, last_access)"
+                " VALUES (?, ?, ?, ?, ?)",
+                (key, endpoint, body, now, now)
+            )
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        (count,) = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()
+        extra = count - self.max_entries
+        if extra > 0:
+            self._conn.execute(
+                "DELETE FROM responses WHERE key IN"
+                " (SELECT key FROM responses ORDER BY last_access ASC LIMIT ?)",
+                (extra,)
+            )
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+            self._conn.commit()
+
+    def stats(self):
+        endpoints = sorted(set(self.hits) | set(self.misses))
+        return {
+            ep: {"hits": self.hits[ep], "misses": self.misses[ep]}
+            for ep in endpoints
+        }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache():
+    """
+    Cache compartido del proceso, o None si está deshabilitado (GOOGLE_CACHE=0).
+    """
+    global _cache
+    if not CACHE_ENABLED:
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ResponseCache(os.path.join(CACHE_DIR, "google_responses.sqlite3"))
+    return _cache
+
+
+def cache_stats():
+    cache = get_cache()
+    return cache.stats() if cache else {}
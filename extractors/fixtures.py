@@ -0,0 +1,96 @@
+# extractors/fixtures.py
+import json
+import os
+import threading
+
+from extractors.cache import cache_key
+
+# "record" = guardar cada respuesta de Google; "replay" = responder solo desde
+# los fixtures (sin red ni API key real); vacío = desactivado
+FIXTURES_MODE = os.getenv("GOOGLE_FIXTURES", "").strip().lower()
+FIXTURES_DIR = os.getenv("GOOGLE_FIXTURES_DIR", os.path.join("fixtures", "google"))
+
+FIXTURE_MODES = ("record", "replay")
+# Parámetros que no se guardan en el fixture (no cambian la respuesta)
+_SECRET_PARAMS = {"key", "sessiontoken"}
+
+
+class FixtureStore:
+    """
+    Respuestas de Google Maps grabadas en disco, un JSON por request:
+    `<root>/<endpoint>/<llave>.json` con los params (sin API key) y la respuesta.
+    La llave es la misma del cache de respuestas (ver extractors/cache.py).
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+        self._lock = threading.Lock()
+
+    def path(self, endpoint: str, params: dict):
+        return os.path.join(self.root, endpoint, cache_key(endpoint, params)[:24] + ".json")
+
+    def load(self, endpoint: str, params: dict):
+        path = self.path(endpoint, params)
+        if not os.path.exists(path):
+            return None
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)["response"]
+
+    def save(self, endpoint: str, params: dict, data: dict):
+        path = self.path(endpoint, params)
+        entry = {
+            "endpoint": endpoint,
+            "params": {k: v for k, v in params.items() if k not in _SECRET_PARAMS},
+            "response": data
+        }
+        with self._lock:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(entry, f, ensure_ascii=False, indent=1)
+            os.replace(tmp, path)
+
+    def __iter__(self):
+        """
+        Recorre todos los fixtures: (endpoint, params, respuesta).
+        """
+        if not os.path.isdir(self.root):
+            return
+        for endpoint in sorted(os.listdir(self.root)):
+            folder = os.path.join(self.root, endpoint)
+            if not os.path.isdir(folder):
+                continue
+            for name in sorted(os.listdir(folder)):
+                if name.endswith(".json"):
+                    with open(os.path.join(folder, name), encoding="utf-8") as f:
+                        entry = json.load(f)
+                    yield entry["endpoint"], entry["params"], entry["response"]
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def fixtures_mode():
+    """
+    Modo activo (GOOGLE_FIXTURES): "record", "replay" o None.
+    """
+    if not FIXTURES_MODE:
+        return None
+    if FIXTURES_MODE not in FIXTURE_MODES:
+        raise ValueError(f"GOOGLE_FIXTURES inválido: {FIXTURES_MODE} (usar {', '.join(FIXTURE_MODES)})")
+    return FIXTURES_MODE
+
+
+def get_fixtures():
+    """
+    Store de fixtures del proceso, o None si GOOGLE_FIXTURES no está activo.
+    """
+    global _store
+    if fixtures_mode() is None:
+        return None
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = FixtureStore(FIXTURES_DIR)
+    return _store
@@ -1,33 +1,52 @@
 # extractors/geocode.py
-import requests
-import os
+import asyncio
 
-def geocode_location(location_text: str):
-    """
-    Convierte una ubicación en texto (ej. 'Houston, TX')
-    en coordenadas latitud / longitud usando Google Geocoding API
-    """
-    google_api_key = os.getenv("GOOGLE_API_KEY")
-    if not google_api_key:
+from extractors.http_client import async_session, get_json_async
+from extractors.scheduler import has_api_key
+
+
+def _geocode_params(location_text: str):
+    if not has_api_key():
         raise ValueError("GOOGLE_API_KEY no está configurada")
 
-    url = "https://maps.googleapis.com/maps/api/geocode/json"
-    params = {
-        "address": location_text,
-        "key": google_api_key
+    return {
+        "address": location_text
     }
 
-    response = requests.get(url, params=params, timeout=30)
-    data = response.json()
 
+def _parse_geocode(data: dict, location_text: str):
     if not data.get("results"):
         raise ValueError(f"No se pudo geocodificar la ubicación: {location_text}")
 
-    location = data["results"][0]["geometry"]["location"]
+    geometry = data["results"][0]["geometry"]
+    location = geometry["location"]
     formatted_address = data["results"][0].get("formatted_address")
 
     return {
         "lat": location["lat"],
         "lng": location["lng"],
-        "formatted_address": formatted_address
+        "formatted_address": formatted_address,
+        # caja {"northeast": {lat, lng}, "southwest": {lat, lng}} que cubre la ubicación
+        "viewport": geometry.get("viewport")
     }
+
+
+async def geocode_location_async(location_text: str, refresh: bool = False):
+    """
+    Convierte una ubicación en texto (ej. 'Houston, TX')
+    en coordenadas latitud / longitud usando Google Geocoding API.
+    `refresh=True` ignora el cache en disco.
+    """
+    data = await get_json_async("geocode", _geocode_params(location_text), refresh=refresh)
+    return _parse_geocode(data, location_text)
+
+
+def geocode_location(location_text: str, refresh: bool = False):
+    """
+    Versión sincrónica de `geocode_location_async`.
+    No usar desde dentro de un event loop.
+    """
+    async def run():
+        async with async_session():
+            return await geocode_location_async(location_text, refresh)
+    return asyncio.run(run())
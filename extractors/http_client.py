@@ -0,0 +1,341 @@
+# extractors/http_client.py
+import asyncio
+import contextvars
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+
+import requests
+from requests.adapters import HTTPAdapter
+
+try:
+    import httpx  # opcional: cliente async nativo para el pipeline async
+except ImportError:
+    httpx = None
+
+from extractors.cache import CACHE_TTLS, get_cache
+from extractors.fixtures import fixtures_mode, get_fixtures
+from extractors.metrics import record_cache, record_call, record_http, run_in_context
+from extractors.scheduler import QuotaExceeded, get_scheduler
+
+# Se puede apuntar a un servidor local (ver mock_google.py), ej. http://127.0.0.1:8765/maps/api
+BASE_URL = os.getenv("GOOGLE_MAPS_BASE_URL", "https://maps.googleapis.com/maps/api").rstrip("/")
+
+ENDPOINT_PATHS = {
+    "geocode": "/geocode/json",
+    "textsearch": "/place/textsearch/json",
+    "details": "/place/details/json",
+    "autocomplete": "/place/autocomplete/json",
+}
+
+# Timeout (segundos) por endpoint: autocomplete es interactivo, details trae reviews
+TIMEOUTS = {
+    "geocode": 10,
+    "textsearch": 15,
+    "details": 20,
+    "autocomplete": 5,
+}
+
+HTTP_POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", "16"))
+HTTP_MAX_RETRIES = int(os.getenv("HTTP_MAX_RETRIES", "4"))
+BACKOFF_BASE = float(os.getenv("HTTP_BACKOFF_BASE", "0.5"))
+BACKOFF_MAX = float(os.getenv("HTTP_BACKOFF_MAX", "8"))
+
+# `status` de Google que vale la pena reintentar (los demás son definitivos)
+RETRY_STATUSES = {"OVER_QUERY_LIMIT", "UNKNOWN_ERROR"}
+RETRY_HTTP_CODES = {429, 500, 502, 503, 504}
+
+_session = None
+_session_lock = threading.Lock()
+_fallback_pool = None
+
+
+class GoogleAPIError(ValueError):
+    """
+    Error de Google Maps después de agotar reintentos.
+    Hereda de ValueError para que los `except` existentes lo sigan atrapando.
+    """
+
+    def __init__(self, message: str, status: str = None):
+        super().__init__(message)
+        self.status = status
+
+
+def get_session():
+    """
+    Devuelve la sesión HTTP compartida (keep-alive + pool de conexiones).
+    Es segura para usar desde varios threads.
+    """
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                s = requests.Session()
+                adapter = HTTPAdapter(pool_connections=HTTP_POOL_SIZE, pool_maxsize=HTTP_POOL_SIZE)
+                s.mount("https://", adapter)
+                s.mount("http://", adapter)
+                _session = s
+    return _session
+
+
+def get_fallback_pool():
+    """
+    Threads para `get_json_async` sin httpx: tantos como conexiones de la
+    sesión compartida. El executor default de asyncio (min(32, cpus + 4))
+    limitaría las requests en vuelo por debajo de DETAILS_MAX_WORKERS.
+    """
+    global _fallback_pool
+    if _fallback_pool is None:
+        with _session_lock:
+            if _fallback_pool is None:
+                _fallback_pool = ThreadPoolExecutor(max_workers=HTTP_POOL_SIZE, thread_name_prefix="google-http")
+    return _fallback_pool
+
+
+def backoff_delay(attempt: int):
+    """
+    Backoff exponencial con "full jitter": random entre 0 y base * 2^attempt.
+    """
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * (2 ** attempt)))
+
+
+def _cache_lookup(endpoint: str, params: dict, refresh: bool):
+    cache = get_cache() if endpoint in CACHE_TTLS else None
+    if cache is None or refresh:
+        return cache, None
+    cached = cache.get(endpoint, params)
+    record_cache(endpoint, cached is not None)
+    if cached is not None and fixtures_mode() == "record":
+        # grabando: lo servido desde el cache también tiene que quedar en los fixtures
+        get_fixtures().save(endpoint, params, cached)
+    return cache, cached
+
+
+def _replay(endpoint: str, params: dict):
+    """
+    En modo replay (GOOGLE_FIXTURES=replay) responde desde los fixtures
+    grabados, sin red; un request sin fixture es un error.
+    """
+    if fixtures_mode() != "replay":
+        return None
+    data = get_fixtures().load(endpoint, params)
+    if data is None:
+        raise GoogleAPIError(f"{endpoint}: no hay fixture grabado para este request", status="NO_FIXTURE")
+    return data
+
+
+def _check_response(endpoint: str, status_code: int, headers, read_json):
+    """
+    Clasifica una respuesta HTTP: devuelve (data, error, espera_extra).
+    `data` es None cuando hay que reintentar (`error` explica por qué).
+    """
+    if status_code in RETRY_HTTP_CODES:
+        retry_after = headers.get("Retry-After")
+        wait = min(BACKOFF_MAX, int(retry_after)) if retry_after and retry_after.isdigit() else 0
+        return None, GoogleAPIError(f"{endpoint}: HTTP {status_code}", status=f"HTTP_{status_code}"), wait
+
+    data = read_json()
+    status = data.get("status")
+    if status in RETRY_STATUSES:
+        error = GoogleAPIError(
+            f"{endpoint}: {status} {data.get('error_message') or ''}".strip(),
+            status=status
+        )
+        return None, error, 0
+    return data, None, 0
+
+
+def _acquire(scheduler, endpoint: str, attempt: int):
+    try:
+        return scheduler.acquire(endpoint)
+    except QuotaExceeded:
+        record_call(endpoint, retries=attempt, ok=False)
+        raise
+
+
+async def _acquire_async(scheduler, endpoint: str, attempt: int):
+    try:
+        return await scheduler.acquire_async(endpoint)
+    except QuotaExceeded:
+        record_call(endpoint, retries=attempt, ok=False)
+        raise
+
+
+def _cacheable(endpoint: str, params: dict, data: dict):
+    """
+    Respuestas que se guardan en el cache en disco: solo status OK, y nada
+    de Text Search que dependa de un next_page_token (el token vence en
+    minutos; una página 1 cacheada 24h con su token lleva a INVALID_REQUEST
+    al paginar en una corrida posterior con más resultados).
+    """
+    if data.get("status") != "OK":
+        return False
+    if endpoint == "textsearch" and ("pagetoken" in params or data.get("next_page_token")):
+        return False
+    return True
+
+
+def _finish(endpoint: str, params: dict, cache, data: dict, attempt: int):
+    record_call(endpoint, retries=attempt, ok=True)
+    if cache is not None and _cacheable(endpoint, params, data):
+        cache.set(endpoint, params, data)
+    if fixtures_mode() == "record":
+        get_fixtures().save(endpoint, params, data)
+    return data
+
+
+def get_json(endpoint: str, params: dict, timeout: float = None, refresh: bool = False):
+    """
+    GET a un endpoint de Google Maps (geocode, textsearch, details, autocomplete)
+    usando la sesión compartida.
+
+    Reintenta con backoff + jitter en errores de red, HTTP 429/5xx y
+    `status` OVER_QUERY_LIMIT / UNKNOWN_ERROR. Cualquier otro `status`
+    (OK, ZERO_RESULTS, INVALID_REQUEST, ...) se devuelve tal cual para
+    que cada extractor decida.
+
+    Si el endpoint es cacheable (ver extractors/cache.py) se sirve desde el
+    cache en disco; `refresh=True` ignora lo guardado y lo reemplaza.
+    Cada intento pide turno y API key al scheduler de cuota (prioridad,
+    QPS y presupuesto diario por key; ver extractors/scheduler.py): la key
+    se agrega a `params` ahí, no la ponen los extractores. Todo intento
+    termina en `scheduler.report`, aunque se interrumpa, para no dejar
+    cuota reservada.
+    Con GOOGLE_FIXTURES=record|replay graba o reproduce las respuestas
+    (ver extractors/fixtures.py).
+    """
+    cache, cached = _cache_lookup(endpoint, params, refresh)
+    if cached is not None:
+        return cached
+    replayed = _replay(endpoint, params)
+    if replayed is not None:
+        return _finish(endpoint, params, cache, replayed, 0)
+
+    url = BASE_URL + ENDPOINT_PATHS[endpoint]
+    timeout = timeout or TIMEOUTS.get(endpoint, 30)
+    session = get_session()
+    scheduler = get_scheduler()
+
+    last_error = None
+    for attempt in range(HTTP_MAX_RETRIES + 1):
+        if attempt:
+            time.sleep(backoff_delay(attempt - 1))
+        key = _acquire(scheduler, endpoint, attempt)
+        request_params = {**params, "key": key}
+
+        reported = False
+        t0 = time.perf_counter()
+        try:
+            try:
+                response = session.get(url, params=request_params, timeout=timeout)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                record_http(endpoint, time.perf_counter() - t0, billable=False)
+                scheduler.report(key, endpoint, billable=False)
+                reported = True
+                last_error = GoogleAPIError(f"{endpoint}: error de red ({e})")
+                continue
+
+            data, last_error, wait = _check_response(endpoint, response.status_code, response.headers, response.json)
+            record_http(endpoint, time.perf_counter() - t0, billable=data is not None)
+            scheduler.report(key, endpoint, billable=data is not None, status=last_error and last_error.status)
+            reported = True
+        finally:
+            if not reported:
+                # interrumpido o error inesperado (ej. JSON inválido): libera la reserva de cuota
+                scheduler.report(key, endpoint, billable=False)
+        if data is None:
+            if wait:
+                time.sleep(wait)
+            continue
+        return _finish(endpoint, params, cache, data, attempt)
+
+    record_call(endpoint, retries=HTTP_MAX_RETRIES, ok=False)
+    raise last_error
+
+
+_async_client = contextvars.ContextVar("async_http_client", default=None)
+
+
+@asynccontextmanager
+async def async_session():
+    """
+    Abre un cliente HTTP async (httpx, keep-alive) para el bloque; lo usan
+    todas las `get_json_async` del mismo contexto (ej. un batch completo).
+    Sin httpx instalado no hace nada y `get_json_async` usa la sesión
+    sincrónica en threads (ver `get_fallback_pool`).
+    """
+    if httpx is None or _async_client.get() is not None:
+        yield
+        return
+
+    limits = httpx.Limits(max_connections=HTTP_POOL_SIZE * 4, max_keepalive_connections=HTTP_POOL_SIZE)
+    async with httpx.AsyncClient(limits=limits) as client:
+        token = _async_client.set(client)
+        try:
+            yield
+        finally:
+            _async_client.reset(token)
+
+
+async def get_json_async(endpoint: str, params: dict, timeout: float = None, refresh: bool = False):
+    """
+    Versión async de `get_json` (mismo cache, reintentos, métricas y scheduler).
+    Usa httpx dentro de `async_session()`; si no hay cliente async disponible
+    corre `get_json` en un thread.
+    """
+    client = _async_client.get()
+    if client is None:
+        return await asyncio.get_running_loop().run_in_executor(
+            get_fallback_pool(), run_in_context(get_json), endpoint, params, timeout, refresh
+        )
+
+    cache, cached = _cache_lookup(endpoint, params, refresh)
+    if cached is not None:
+        return cached
+    replayed = _replay(endpoint, params)
+    if replayed is not None:
+        return _finish(endpoint, params, cache, replayed, 0)
+
+    url = BASE_URL + ENDPOINT_PATHS[endpoint]
+    timeout = timeout or TIMEOUTS.get(endpoint, 30)
+    scheduler = get_scheduler()
+
+    last_error = None
+    for attempt in range(HTTP_MAX_RETRIES + 1):
+        if attempt:
+            await asyncio.sleep(backoff_delay(attempt - 1))
+        key = await _acquire_async(scheduler, endpoint, attempt)
+        request_params = {**params, "key": key}
+
+        reported = False
+        t0 = time.perf_counter()
+        try:
+            try:
+                response = await client.get(url, params=request_params, timeout=timeout)
+            except httpx.TransportError as e:
+                record_http(endpoint, time.perf_counter() - t0, billable=False)
+                scheduler.report(key, endpoint, billable=False)
+                reported = True
+                last_error = GoogleAPIError(f"{endpoint}: error de red ({e})")
+                continue
+
+            data, last_error, wait = _check_response(endpoint, response.status_code, response.headers, response.json)
+            record_http(endpoint, time.perf_counter() - t0, billable=data is not None)
+            scheduler.report(key, endpoint, billable=data is not None, status=last_error and last_error.status)
+            reported = True
+        finally:
+            if not reported:
+                # cancelado (timeout del pipeline, cancel de la UI/servicio) o error
+                # inesperado: libera la reserva de cuota
+                scheduler.report(key, endpoint, billable=False)
+        if data is None:
+            if wait:
+                await asyncio.sleep(wait)
+            continue
+        return _finish(endpoint, params, cache, data, attempt)
+
+    record_call(endpoint, retries=HTTP_MAX_RETRIES, ok=False)
+    raise last_error
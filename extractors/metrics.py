@@ -0,0 +1,215 @@
+# extractors/metrics.py
+import contextvars
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# Costo de lista aproximado (USD por 1000 requests) por SKU de Google Maps.
+# Place Details con reviews/rating entra como Basic + Atmosphere.
+SKU_COST_PER_1000 = {
+    "geocode": 5.0,
+    "textsearch": 32.0,
+    "details": 22.0,
+    "autocomplete": 2.83,
+}
+
+# Sinks opcionales: se activan con variables de entorno
+METRICS_JSONL = os.getenv("METRICS_JSONL")
+METRICS_PROM_FILE = os.getenv("METRICS_PROM_FILE")
+
+_current = contextvars.ContextVar("run_metrics", default=None)
+
+
+def _percentile(values: list, pct: float):
+    if not values:
+        return None
+    ordered = sorted(values)
+    k = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[k]
+
+
+def _summary(durations: list):
+    return {
+        "calls": len(durations),
+        "total_ms": round(sum(durations) * 1000, 1),
+        "p50_ms": round(_percentile(durations, 50) * 1000, 1) if durations else None,
+        "p95_ms": round(_percentile(durations, 95) * 1000, 1) if durations else None,
+        "max_ms": round(max(durations) * 1000, 1) if durations else None,
+    }
+
+
+class RunMetrics:
+    """
+    Métricas de una corrida: tiempo por etapa, latencia HTTP por endpoint,
+    reintentos, hits de cache y unidades de cuota (requests facturables).
+    Es thread-safe; se activa con `collect_metrics()`.
+    """
+
+    def __init__(self):
+        self.started = time.time()
+        self._t0 = time.perf_counter()
+        self._lock = threading.Lock()
+        self._stages = {}
+        self._http = {}
+
+    def _endpoint(self, endpoint: str):
+        return self._http.setdefault(endpoint, {
+            "latencies": [], "retries": 0, "errors": 0,
+            "cache_hits": 0, "cache_misses": 0, "quota_units": 0
+        })
+
+    def add_stage(self, name: str, seconds: float):
+        with self._lock:
+            self._stages.setdefault(name, []).append(seconds)
+
+    def record_http(self, endpoint: str, seconds: float, billable: bool):
+        with self._lock:
+            ep = self._endpoint(endpoint)
+            ep["latencies"].append(seconds)
+            if billable:
+                ep["quota_units"] += 1
+
+    def record_call(self, endpoint: str, retries: int, ok: bool):
+        with self._lock:
+            ep = self._endpoint(endpoint)
+            ep["retries"] += retries
+            if not ok:
+                ep["errors"] += 1
+
+    def record_cache(self, endpoint: str, hit: bool):
+        with self._lock:
+            self._endpoint(endpoint)["cache_hits" if hit else "cache_misses"] += 1
+
+    def to_dict(self):
+        with self._lock:
+            stages = {name: _summary(d) for name, d in self._stages.items()}
+            http = {}
+            for endpoint, ep in self._http.items():
+                units = ep["quota_units"]
+                http[endpoint] = {
+                    **_summary(ep["latencies"]),
+                    "retries": ep["retries"],
+                    "errors": ep["errors"],
+                    "cache_hits": ep["cache_hits"],
+                    "cache_misses": ep["cache_misses"],
+                    "quota_units": units,
+                    "est_cost_usd": round(units * SKU_COST_PER_1000.get(endpoint, 0) / 1000, 4),
+                }
+
+        return {
+            "started_at": self.started,
+            "wall_ms": round((time.perf_counter() - self._t0) * 1000, 1),
+            "stages": stages,
+            "http": http,
+            "quota_units": sum(ep["quota_units"] for ep in http.values()),
+            "est_cost_usd": round(sum(ep["est_cost_usd"] for ep in http.values()), 4),
+        }
+
+
+def current_metrics():
+    return _current.get()
+
+
+@contextmanager
+def collect_metrics(metrics: RunMetrics = None):
+    """
+    Activa un RunMetrics para el bloque (y los threads que se lancen con
+    `run_in_context`). Las llamadas instrumentadas fuera de un bloque no hacen nada.
+    """
+    metrics = metrics or RunMetrics()
+    token = _current.set(metrics)
+    try:
+        yield metrics
+    finally:
+        _current.reset(token)
+
+
+@contextmanager
+def stage(name: str):
+    """
+    Mide el tiempo de pared de una etapa (geocode, search, details, analysis, report...).
+    """
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics = _current.get()
+        if metrics is not None:
+            metrics.add_stage(name, time.perf_counter() - t0)
+
+
+def run_in_context(fn):
+    """
+    Copia el contexto actual (métricas activas) para correr `fn` en otro thread:
+    pool.submit(run_in_context(fn), ...).
+    """
+    ctx = contextvars.copy_context()
+    return lambda *args, **kwargs: ctx.run(fn, *args, **kwargs)
+
+
+def record_http(endpoint: str, seconds: float, billable: bool):
+    metrics = _current.get()
+    if metrics is not None:
+        metrics.record_http(endpoint, seconds, billable)
+
+
+def record_call(endpoint: str, retries: int, ok: bool):
+    metrics = _current.get()
+    if metrics is not None:
+        metrics.record_call(endpoint, retries, ok)
+
+
+def record_cache(endpoint: str, hit: bool):
+    metrics = _current.get()
+    if metrics is not None:
+        metrics.record_cache(endpoint, hit)
+
+
+def to_prometheus(metrics: dict, labels: dict = None):
+    """
+    Formato de texto de Prometheus (para node_exporter textfile o un push gateway).
+    """
+    base = dict(labels or {})
+
+    def fmt(name, value, extra=None):
+        all_labels = {**base, **(extra or {})}
+        label_txt = ",".join(
+            '{}="{}"'.format(k, str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+            for k, v in sorted(all_labels.items())
+        )
+        return f"agent_{name}{{{label_txt}}} {value}" if label_txt else f"agent_{name} {value}"
+
+    lines = [fmt("run_wall_ms", metrics["wall_ms"]),
+             fmt("run_quota_units", metrics["quota_units"]),
+             fmt("run_est_cost_usd", metrics["est_cost_usd"])]
+    for name, s in metrics["stages"].items():
+        lines.append(fmt("stage_total_ms", s["total_ms"], {"stage": name}))
+        lines.append(fmt("stage_calls", s["calls"], {"stage": name}))
+    for endpoint, s in metrics["http"].items():
+        for field in ("calls", "retries", "errors", "cache_hits", "cache_misses", "quota_units"):
+            lines.append(fmt(f"http_{field}", s[field], {"endpoint": endpoint}))
+        for field in ("p50_ms", "p95_ms"):
+            if s[field] is not None:
+                lines.append(fmt(f"http_latency_{field}", s[field], {"endpoint": endpoint}))
+    return "\n".join(lines) + "\n"
+
+
+def export_metrics(metrics: dict, labels: dict = None):
+    """
+    Escribe las métricas a los sinks configurados:
+    - METRICS_JSONL: agrega una línea JSON por corrida
+    - METRICS_PROM_FILE: reemplaza el archivo con texto de Prometheus
+    """
+    if METRICS_JSONL:
+        os.makedirs(os.path.dirname(METRICS_JSONL) or ".", exist_ok=True)
+        with open(METRICS_JSONL, "a", encoding="utf-8") as f:
+            f.write(json.dumps({**(labels or {}), "metrics": metrics}, ensure_ascii=False) + "\n")
+
+    if METRICS_PROM_FILE:
+        os.makedirs(os.path.dirname(METRICS_PROM_FILE) or ".", exist_ok=True)
+        tmp = METRICS_PROM_FILE + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(to_prometheus(metrics, labels))
+        os.replace(tmp, METRICS_PROM_FILE)
@@ -1,28 +1,33 @@
 # extractors/place_details.py
-import requests
+import asyncio
 import os
 
-GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
+from extractors.http_client import async_session, get_json_async
+from extractors.scheduler import has_api_key
 
-def get_place_details(place_id: str):
-    """
-    Obtiene detalles de un lugar usando Google Places Details API.
-    Devuelve rating, total de reseñas y una muestra de reviews.
-    """
-    if not GOOGLE_API_KEY:
+# Field mask de Place Details: incluye reviews (SKU Atmosphere, el más caro);
+# los lugares sin reviews (tiers "full"/"light") usan los datos de Text Search sin
+# llamar a Place Details, así que no hace falta una máscara más barata
+DETAILS_FIELDS = "name,rating,user_ratings_total,types,formatted_address,geometry/location,url,reviews"
+
+# Máximo de requests de Place Details en vuelo al mismo tiempo
+DETAILS_MAX_WORKERS = int(os.getenv("DETAILS_MAX_WORKERS", "8"))
+
+def _details_params(place_id: str, fields: str = DETAILS_FIELDS, reviews_sort: str = "newest", language: str = None):
+    if not has_api_key():
         raise ValueError("GOOGLE_API_KEY no está configurada")
 
-    url = "https://maps.googleapis.com/maps/api/place/details/json"
     params = {
         "place_id": place_id,
-        "fields": "name,rating,user_ratings_total,types,formatted_address,url,reviews",
-        "reviews_sort": "newest",
-        "key": GOOGLE_API_KEY
+        "fields": fields,
+        "reviews_sort": reviews_sort
     }
+    if language:
+        params["language"] = language
+    return params
 
-    response = requests.get(url, params=params, timeout=30)
-    data = response.json()
 
+def _parse_details(data: dict, place_id: str):
     result = data.get("result")
     if not result:
         raise ValueError(f"No se pudieron obtener detalles para place_id: {place_id}")
@@ -34,5 +39,111 @@ def get_place_details(place_id: str):
         "reviews_count": result.get("user_ratings_total"),
         "address": result.get("formatted_address"),
         "maps_url": result.get("url"),
+        "location": (result.get("geometry") or {}).get("location"),
         "reviews": result.get("reviews", [])
     }
+
+
+def _review_variants(place_id: str, review_sorts, languages):
+    """
+    Params de cada combinación (orden de reviews × idioma). La primera trae
+    el field mask completo; las demás solo piden `reviews`.
+    """
+    variants = []
+    for sort in review_sorts or ("newest",):
+        for language in languages or (None,):
+            variant_fields = DETAILS_FIELDS if not variants else "reviews"
+            variants.append(_details_params(place_id, variant_fields, sort, language))
+    return variants
+
+
+def merge_reviews(*review_lists):
+    """
+    Une listas de reviews sin duplicados (mismo autor + misma fecha),
+    de la más reciente a la más antigua.
+    """
+    merged = {}
+    for reviews in review_lists:
+        for r in reviews or []:
+            key = (r.get("author_url") or r.get("author_name"), r.get("time"))
+            merged.setdefault(key, r)
+    return sorted(merged.values(), key=lambda r: r.get("time") or 0, reverse=True)
+
+
+def _combine(place_id: str, base: dict, extra: list):
+    details = _parse_details(base, place_id)
+    if extra:
+        extra_reviews = [((d or {}).get("result") or {}).get("reviews") for d in extra]
+        details["reviews"] = merge_reviews(details["reviews"], *extra_reviews)
+    return details
+
+
+async def get_place_details_async(place_id: str, refresh: bool = False, review_sorts=("newest",),
+                                  languages=(None,)):
+    """
+    Obtiene detalles de un lugar usando Google Places Details API.
+    Devuelve rating, total de reseñas y una muestra de reviews.
+    `refresh=True` ignora el cache en disco.
+
+    Google devuelve máximo 5 reviews por request: con varios `review_sorts`
+    (ej. ("newest", "most_relevant")) y/o `languages` se hacen las requests
+    en paralelo y se unen las reviews sin duplicados.
+    """
+    variants = _review_variants(place_id, review_sorts, languages)
+    responses = await asyncio.gather(
+        *[get_json_async("details", params, refresh=refresh) for params in variants],
+        return_exceptions=True
+    )
+    base = responses[0]
+    if isinstance(base, BaseException):
+        raise base
+    # una variante extra que falla no invalida el lugar
+    extra = [r for r in responses[1:] if not isinstance(r, BaseException)]
+    return _combine(place_id, base, extra)
+
+
+def get_place_details(place_id: str, refresh: bool = False, review_sorts=("newest",), languages=(None,)):
+    """
+    Versión sincrónica de `get_place_details_async`.
+    No usar desde dentro de un event loop.
+    """
+    async def run():
+        async with async_session():
+            return await get_place_details_async(place_id, refresh, review_sorts, languages)
+    return asyncio.run(run())
+
+
+def details_from_search(place: dict):
+    """
+    Detalles armados solo con el resultado de Text Search (sin llamar a
+    Place Details): rating y total de reseñas, sin muestra de reviews.
+    """
+    return {
+        "place_id": place.get("place_id"),
+        "name": place.get("name"),
+        "rating": place.get("rating"),
+        "reviews_count": place.get("user_ratings_total"),
+        "address": place.get("formatted_address"),
+        "maps_url": None,
+        "location": place.get("location"),
+        "reviews": [],
+        "source": "search"
+    }
+
+
+def details_fallback(place: dict, error: Exception):
+    """
+    Dict de respaldo cuando falla Place Details: conserva lo que ya
+    sabemos por Text Search y guarda el error.
+    """
+    return {
+        "place_id": place.get("place_id"),
+        "name": place.get("name"),
+        "rating": None,
+        "reviews_count": None,
+        "address": place.get("formatted_address"),
+        "maps_url": None,
+        "location": place.get("location"),
+        "reviews": [],
+        "error": str(error)
+    }
@@ -1,39 +1,125 @@
 # extractors/places_search.py
-import requests
+import asyncio
+import logging
 import os
+import time
 
-GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
+from extractors.http_client import async_session, get_json_async
+from extractors.scheduler import has_api_key
 
-def search_places(keyword: str, lat: float, lng: float, radius_m: int = 30000):
+# Text Search devuelve 20 resultados por página y máximo 3 páginas (60)
+PAGE_SIZE = 20
+MAX_PAGES = 3
+# Google tarda ~2s en activar un next_page_token; antes responde INVALID_REQUEST
+PAGE_TOKEN_DELAY = float(os.getenv("PAGE_TOKEN_DELAY", "2.0"))
+PAGE_TOKEN_RETRIES = 4
+
+log = logging.getLogger(__name__)
+
+
+def _token_expired(attempts: int):
+    log.warning("Text Search: next_page_token sin activar tras %d intentos; la búsqueda queda truncada", attempts)
+
+
+def _parse_results(data: dict):
+    places = []
+    for r in data.get("results") or []:
+        places.append({
+            "place_id": r.get("place_id"),
+            "name": r.get("name"),
+            "formatted_address": r.get("formatted_address"),
+            "rating": r.get("rating"),
+            "user_ratings_total": r.get("user_ratings_total"),
+            "location": (r.get("geometry") or {}).get("location")
+        })
+    return places
+
+
+async def _fetch_next_page_async(token: str, not_before: float, refresh: bool):
     """
-    Busca lugares en Google Places (Text Search) usando:
-    - keyword (ej. 'meat market')
-    - centro (lat, lng)
-    - radio en metros
-    Devuelve una lista de resultados con place_id y nombre.
+    Pide la siguiente página cuando el token ya debería estar activo.
+    Si Google todavía responde INVALID_REQUEST reintenta con pausas cortas;
+    si nunca se activa lo registra y devuelve None (se termina la paginación).
     """
-    if not GOOGLE_API_KEY:
+    params = {"pagetoken": token}
+    wait = not_before - time.monotonic()
+    if wait > 0:
+        await asyncio.sleep(wait)
+
+    for attempt in range(PAGE_TOKEN_RETRIES):
+        data = await get_json_async("textsearch", params, refresh=refresh)
+        if data.get("status") != "INVALID_REQUEST":
+            return data
+        await asyncio.sleep(PAGE_TOKEN_DELAY / 2)
+    _token_expired(PAGE_TOKEN_RETRIES)
+    return None
+
+
+def _search_params(keyword: str, lat: float, lng: float, radius_m: int):
+    if not has_api_key():
         raise ValueError("GOOGLE_API_KEY no está configurada")
 
-    url = "https://maps.googleapis.com/maps/api/place/textsearch/json"
-    params = {
+    return {
         "query": keyword,
         "location": f"{lat},{lng}",
-        "radius": radius_m,
-        "key": GOOGLE_API_KEY
+        "radius": radius_m
     }
 
-    response = requests.get(url, params=params, timeout=30)
-    data = response.json()
 
-    results = data.get("results") or []
+async def iter_places_async(keyword: str, lat: float, lng: float, radius_m: int = 30000,
+                            max_results: int = PAGE_SIZE, refresh: bool = False):
+    """
+    Generador async de resultados de Text Search que sigue `next_page_token`
+    hasta juntar `max_results` lugares (máx. 60).
 
-    places = []
-    for r in results:
-        places.append({
-            "place_id": r.get("place_id"),
-            "name": r.get("name"),
-            "formatted_address": r.get("formatted_address")
-        })
+    Cada página se entrega en cuanto llega. La siguiente página se pide en
+    una tarea de fondo mientras el consumidor procesa la actual, así la
+    espera de activación del token no frena el resto del pipeline.
+    """
+    data = await get_json_async("textsearch", _search_params(keyword, lat, lng, radius_m), refresh=refresh)
+    yielded = 0
+    pages = 1
+    next_page = None
+    try:
+        while data is not None:
+            page = _parse_results(data)
+            token = data.get("next_page_token")
 
-    return places
+            next_page = None
+            if token and yielded + len(page) < max_results and pages < MAX_PAGES:
+                next_page = asyncio.create_task(
+                    _fetch_next_page_async(token, time.monotonic() + PAGE_TOKEN_DELAY, refresh)
+                )
+
+            for place in page:
+                if yielded >= max_results:
+                    return
+                yielded += 1
+                yield place
+
+            if next_page is None:
+                return
+            data = await next_page
+            pages += 1
+    finally:
+        if next_page is not None and not next_page.done():
+            next_page.cancel()
+
+
+def search_places(keyword: str, lat: float, lng: float, radius_m: int = 30000,
+                  refresh: bool = False, max_results: int = PAGE_SIZE):
+    """
+    Busca lugares en Google Places (Text Search) usando:
+    - keyword (ej. 'meat market')
+    - centro (lat, lng)
+    - radio en metros
+    Devuelve una lista de resultados con place_id y nombre
+    (hasta `max_results`, paginando si hace falta).
+    `refresh=True` ignora el cache en disco.
+    No usar desde dentro de un event loop (ahí, `iter_places_async`).
+    """
+    async def collect():
+        async with async_session():
+            return [p async for p in iter_places_async(keyword, lat, lng, radius_m=radius_m,
+                                                       max_results=max_results, refresh=refresh)]
+    return asyncio.run(collect())
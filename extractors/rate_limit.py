@@ -0,0 +1,109 @@
+# extractors/rate_limit.py
+import asyncio
+import itertools
+import os
+import threading
+import time
+
+# QPS por endpoint y por API key; ajustar a la cuota del proyecto
+GOOGLE_QPS = float(os.getenv("GOOGLE_QPS", "50"))
+GOOGLE_BURST = int(os.getenv("GOOGLE_BURST", "10"))
+
+# Clases de prioridad: número más bajo pasa primero
+PRIORITIES = {"interactive": 0, "normal": 1, "batch": 2}
+
+
+class RateLimiter:
+    """
+    Token bucket de `rate` requests por segundo con ráfaga `burst`, con
+    fila de espera por prioridad.
+
+    Si hay tokens y nadie esperando se pasa de inmediato; si no, la llamada
+    entra a la fila ordenada por (prioridad, llegada) y toma un token
+    cuando es la primera. El estado vive bajo un lock de threading y la
+    espera ocurre fuera del lock, así sirve igual para threads (`acquire`)
+    que para corutinas en cualquier event loop (`acquire_async`).
+    """
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._lock = threading.Lock()
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._waiters = []
+        self._seq = itertools.count()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def _enter(self, priority: int):
+        """
+        Toma un token si se puede sin esperar (devuelve None); si no, el
+        turno en la fila.
+        """
+        if self.rate <= 0:
+            return None
+        with self._lock:
+            self._refill()
+            if not self._waiters and self._tokens >= 1:
+                self._tokens -= 1
+                return None
+            ticket = (priority, next(self._seq))
+            self._waiters.append(ticket)
+            return ticket
+
+    def _poll(self, ticket):
+        """
+        0 si `ticket` ya tomó su token; si no, segundos hasta volver a intentar.
+        """
+        with self._lock:
+            self._refill()
+            ahead = sum(1 for w in self._waiters if w < ticket)
+            if not ahead and self._tokens >= 1:
+                self._tokens -= 1
+                self._waiters.remove(ticket)
+                return 0.0
+            return max(0.001, (ahead + 1 - self._tokens) / self.rate)
+
+    def _leave(self, ticket):
+        # si se canceló mientras esperaba, libera su lugar en la fila
+        with self._lock:
+            if ticket in self._waiters:
+                self._waiters.remove(ticket)
+
+    def available(self):
+        """
+        Tokens libres menos los que ya esperan (puede ser negativo).
+        """
+        with self._lock:
+            self._refill()
+            return self._tokens - len(self._waiters)
+
+    def acquire(self, priority: int = PRIORITIES["normal"]):
+        ticket = self._enter(priority)
+        if ticket is None:
+            return
+        try:
+            while True:
+                delay = self._poll(ticket)
+                if not delay:
+                    return
+                time.sleep(delay)
+        finally:
+            self._leave(ticket)
+
+    async def acquire_async(self, priority: int = PRIORITIES["normal"]):
+        ticket = self._enter(priority)
+        if ticket is None:
+            return
+        try:
+            while True:
+                delay = self._poll(ticket)
+                if not delay:
+                    return
+                await asyncio.sleep(delay)
+        finally:
+            self._leave(ticket)
@@ -0,0 +1,340 @@
+# extractors/scheduler.py
+import asyncio
+import contextvars
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+from extractors.cache import CACHE_DIR
+from extractors.metrics import SKU_COST_PER_1000
+from extractors.rate_limit import GOOGLE_BURST, GOOGLE_QPS, PRIORITIES, RateLimiter
+
+
+def _env_float(name: str, default: float = None):
+    value = os.getenv(name)
+    return float(value) if value else default
+
+
+# QPS por endpoint (y por key); sin override usa GOOGLE_QPS
+ENDPOINT_QPS = {ep: _env_float(f"GOOGLE_QPS_{ep.upper()}", GOOGLE_QPS) for ep in SKU_COST_PER_1000}
+
+# Presupuesto diario en USD por key: total y por endpoint (None = sin tope)
+DAILY_BUDGET_USD = _env_float("GOOGLE_DAILY_BUDGET_USD")
+DAILY_BUDGETS_USD = {ep: _env_float(f"GOOGLE_DAILY_BUDGET_{ep.upper()}_USD") for ep in SKU_COST_PER_1000}
+
+# Consumo del día persistido entre procesos; "" = solo en memoria
+QUOTA_DB = os.getenv("GOOGLE_QUOTA_DB", os.path.join(CACHE_DIR, "quota.sqlite3"))
+
+# Una key que recibe OVER_QUERY_LIMIT / HTTP 429 en un endpoint descansa
+# KEY_COOLDOWN segundos (duplicando en cada strike, hasta KEY_COOLDOWN_MAX)
+KEY_COOLDOWN = _env_float("GOOGLE_KEY_COOLDOWN", 2.0)
+KEY_COOLDOWN_MAX = 60.0
+COOLDOWN_STATUSES = {"OVER_QUERY_LIMIT", "HTTP_429"}
+
+_priority = contextvars.ContextVar("request_priority", default="normal")
+
+
+class QuotaExceeded(ValueError):
+    """
+    Ninguna key tiene presupuesto del día para el endpoint: no se llama a Google.
+    """
+
+    status = "BUDGET_EXCEEDED"
+
+
+def api_keys():
+    """
+    Pool de API keys: GOOGLE_API_KEYS (separadas por coma) o GOOGLE_API_KEY.
+    """
+    raw = os.getenv("GOOGLE_API_KEYS") or os.getenv("GOOGLE_API_KEY") or ""
+    keys = []
+    for k in raw.split(","):
+        k = k.strip()
+        if k and k not in keys:
+            keys.append(k)
+    return keys
+
+
+def has_api_key():
+    return bool(api_keys())
+
+
+def key_id(key: str):
+    """
+    Identificador de una key para logs y la tabla de consumo (nunca la key en claro).
+    """
+    return hashlib.sha1(key.encode("utf-8")).hexdigest()[:12]
+
+
+def request_cost(endpoint: str):
+    return SKU_COST_PER_1000.get(endpoint, 0.0) / 1000
+
+
+def _today():
+    # Día en UTC (Google reinicia cuotas a medianoche del Pacífico; para
+    # presupuestos propios basta con un corte fijo)
+    return datetime.now(timezone.utc).strftime("%Y-%m-%d")
+
+
+@contextmanager
+def request_priority(name: str):
+    """
+    Prioridad de los requests a Google dentro del bloque (y de los threads
+    y tareas que se lancen desde él): "interactive" (UI) pasa antes que
+    "normal" (CLI) y que "batch".
+    """
+    if name not in PRIORITIES:
+        raise ValueError(f"Prioridad inválida: {name} (usar {', '.join(PRIORITIES)})")
+    token = _priority.set(name)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def current_priority():
+    return _priority.get()
+
+
+class QuotaUsage:
+    """
+    Requests facturables y costo por (día, key, endpoint). Con `path` se
+    guarda en SQLite y cada registro relee el total, así varios procesos
+    (UI + batch) comparten el mismo presupuesto.
+    """
+
+    def __init__(self, path: str = None):
+        self.path = path
+        self._lock = threading.Lock()
+        self._rows = {}
+        self._conn = None
+        if path:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS usage ("
+                " day TEXT NOT NULL, key_id TEXT NOT NULL, endpoint TEXT NOT NULL,"
+                " calls INTEGER NOT NULL DEFAULT 0, cost REAL NOT NULL DEFAULT 0,"
+                " PRIMARY KEY (day, key_id, endpoint))"
+            )
+            self._conn.commit()
+            self._load(_today())
+
+    def _load(self, day: str):
+        rows = self._conn.execute(
+            "SELECT key_id, endpoint, calls, cost FROM usage WHERE day = ?", (day,)
+        ).fetchall()
+        for kid, endpoint, calls, cost in rows:
+            self._rows[(day, kid, endpoint)] = [calls, cost]
+
+    def add(self, day: str, kid: str, endpoint: str, cost: float):
+        with self._lock:
+            if self._conn is None:
+                row = self._rows.setdefault((day, kid, endpoint), [0, 0.0])
+                row[0] += 1
+                row[1] += cost
+                return
+            with self._conn:
+                self._conn.execute(
+                    "INSERT INTO usage (day, key_id, endpoint, calls, cost) VALUES (?, ?, ?, 1, ?)"
+                    " ON CONFLICT(day, key_id, endpoint) DO UPDATE SET"
+                    " calls = calls + 1, cost = cost + excluded.cost",
+                    (day, kid, endpoint, cost)
+                )
+            self._load(day)
+
+    def spent(self, day: str, kid: str, endpoint: str = None):
+        with self._lock:
+            return sum(cost for (d, k, ep), (_, cost) in self._rows.items()
+                       if d == day and k == kid and (endpoint is None or ep == endpoint))
+
+    def day(self, day: str):
+        """
+        {key_id: {endpoint: {"calls", "cost_usd"}}} del día.
+        """
+        out = {}
+        with self._lock:
+            for (d, kid, endpoint), (calls, cost) in sorted(self._rows.items()):
+                if d == day:
+                    out.setdefault(kid, {})[endpoint] = {"calls": calls, "cost_usd": round(cost, 4)}
+        return out
+
+
+class _KeyState:
+    def __init__(self, key: str, qps: dict, burst: int):
+        self.key = key
+        self.id = key_id(key)
+        self.limiters = {ep: RateLimiter(rate, burst) for ep, rate in qps.items()}
+        self.cooldown_until = {}
+        self.strikes = {}
+        self.reserved = {}   # costo de requests en vuelo, por endpoint
+
+    def limiter(self, endpoint: str):
+        return self.limiters.setdefault(endpoint, RateLimiter(GOOGLE_QPS, GOOGLE_BURST))
+
+
+class QuotaScheduler:
+    """
+    Puerta única hacia Google Maps: todo request (geocode, textsearch,
+    details, autocomplete) pide turno con `acquire` y avisa el resultado
+    con `report`.
+
+    - Token bucket por key y endpoint (ENDPOINT_QPS / GOOGLE_BURST), con
+      fila por prioridad: lo interactivo pasa antes que los batch.
+    - Presupuesto diario en USD por key, total y por endpoint (costos de
+      SKU_COST_PER_1000). Si ninguna key tiene presupuesto se levanta
+      QuotaExceeded antes de llamar a Google.
+    - Rotación entre keys: se elige, entre las que tienen presupuesto y no
+      están en pausa, la de más tokens libres. OVER_QUERY_LIMIT / HTTP 429
+      pausa esa key para ese endpoint y el reintento sale por otra.
+    """
+
+    def __init__(self, keys: list, qps: dict = None, burst: int = GOOGLE_BURST,
+                 budgets: dict = None, total_budget: float = DAILY_BUDGET_USD, usage: QuotaUsage = None):
+        if not keys:
+            raise ValueError("GOOGLE_API_KEY no está configurada (o GOOGLE_API_KEYS)")
+        qps = ENDPOINT_QPS if qps is None else qps
+        self.keys = tuple(keys)
+        self.budgets = dict(DAILY_BUDGETS_USD if budgets is None else budgets)
+        self.total_budget = total_budget
+        self.usage = usage if usage is not None else QuotaUsage()
+        self._states = {k: _KeyState(k, qps, burst) for k in keys}
+        self._lock = threading.Lock()
+
+    def _has_budget(self, state: _KeyState, endpoint: str, cost: float, day: str):
+        limit = self.budgets.get(endpoint)
+        if limit is not None:
+            if self.usage.spent(day, state.id, endpoint) + state.reserved.get(endpoint, 0.0) + cost > limit:
+                return False
+        if self.total_budget is not None:
+            if self.usage.spent(day, state.id) + sum(state.reserved.values()) + cost > self.total_budget:
+                return False
+        return True
+
+    def _choose(self, endpoint: str):
+        """
+        Devuelve (key, 0) con el costo ya reservado, o (None, segundos) si
+        todas las keys con presupuesto están en pausa.
+        """
+        cost = request_cost(endpoint)
+        day = _today()
+        now = time.monotonic()
+        with self._lock:
+            funded = [s for s in self._states.values() if self._has_budget(s, endpoint, cost, day)]
+            if not funded:
+                raise QuotaExceeded(f"{endpoint}: presupuesto diario agotado en todas las API keys")
+            ready = [s for s in funded if s.cooldown_until.get(endpoint, 0) <= now]
+            if not ready:
+                return None, min(s.cooldown_until[endpoint] for s in funded) - now
+            state = max(ready, key=lambda s: s.limiter(endpoint).available())
+            state.reserved[endpoint] = state.reserved.get(endpoint, 0.0) + cost
+            return state, 0
+
+    def _unreserve(self, state: _KeyState, endpoint: str):
+        with self._lock:
+            state.reserved[endpoint] = max(0.0, state.reserved.get(endpoint, 0.0) - request_cost(endpoint))
+
+    def acquire(self, endpoint: str, priority: str = None):
+        """
+        Espera turno para un request y devuelve la API key a usar.
+        Cada `acquire` debe cerrarse con un `report`.
+        """
+        level = PRIORITIES[priority or current_priority()]
+        while True:
+            state, wait = self._choose(endpoint)
+            if state is None:
+                time.sleep(wait)
+                continue
+            try:
+                state.limiter(endpoint).acquire(level)
+            except BaseException:
+                self._unreserve(state, endpoint)
+                raise
+            return state.key
+
+    async def acquire_async(self, endpoint: str, priority: str = None):
+        """
+        Versión async de `acquire`.
+        """
+        level = PRIORITIES[priority or current_priority()]
+        while True:
+            state, wait = self._choose(endpoint)
+            if state is None:
+                await asyncio.sleep(wait)
+                continue
+            try:
+                await state.limiter(endpoint).acquire_async(level)
+            except BaseException:
+                self._unreserve(state, endpoint)
+                raise
+            return state.key
+
+    def report(self, key: str, endpoint: str, billable: bool, status: str = None):
+        """
+        Resultado del request hecho con `key`: suma el costo si fue
+        facturable y pausa la key si Google respondió que excede la cuota.
+        """
+        state = self._states.get(key)
+        if state is None:
+            return
+        self._unreserve(state, endpoint)
+        with self._lock:
+            if status in COOLDOWN_STATUSES:
+                strikes = state.strikes.get(endpoint, 0) + 1
+                state.strikes[endpoint] = strikes
+                pause = min(KEY_COOLDOWN_MAX, KEY_COOLDOWN * 2 ** (strikes - 1))
+                state.cooldown_until[endpoint] = time.monotonic() + pause
+            elif billable:
+                state.strikes.pop(endpoint, None)
+        if billable:
+            self.usage.add(_today(), state.id, endpoint, request_cost(endpoint))
+
+    def status(self):
+        """
+        Consumo del día por key y endpoint, con los topes configurados.
+        """
+        day = _today()
+        usage = self.usage.day(day)
+        now = time.monotonic()
+        return {
+            "day": day,
+            "budget_usd": self.total_budget,
+            "endpoint_budgets_usd": {ep: b for ep, b in self.budgets.items() if b is not None},
+            "keys": [
+                {
+                    "key_id": s.id,
+                    "spent_usd": round(self.usage.spent(day, s.id), 4),
+                    "endpoints": usage.get(s.id, {}),
+                    "cooling_down": sorted(ep for ep, t in s.cooldown_until.items() if t > now),
+                }
+                for s in self._states.values()
+            ],
+        }
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler():
+    """
+    Scheduler compartido del proceso. Se rearma si cambia el pool de keys
+    en el entorno (el consumo persistido se conserva).
+    """
+    global _scheduler
+    keys = tuple(api_keys())
+    if _scheduler is None or _scheduler.keys != keys:
+        with _scheduler_lock:
+            if _scheduler is None or _scheduler.keys != keys:
+                usage = _scheduler.usage if _scheduler is not None else QuotaUsage(QUOTA_DB or None)
+                _scheduler = QuotaScheduler(list(keys), usage=usage)
+    return _scheduler
+
+
+def quota_status():
+    return get_scheduler().status()
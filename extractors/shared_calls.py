@@ -0,0 +1,47 @@
+# extractors/shared_calls.py
+import asyncio
+from collections import OrderedDict
+
+
+class AsyncSharedCalls:
+    """
+    Deduplica llamadas iguales entre corutinas del mismo event loop (ej.
+    varios jobs de un batch): llamadas iguales en vuelo se esperan en vez
+    de repetirse y los resultados exitosos se reutilizan (LRU de
+    `max_entries`); los errores no se guardan, así el siguiente intento
+    vuelve a llamar.
+    """
+
+    def __init__(self, fn, max_entries: int = 10000):
+        self.fn = fn
+        self.max_entries = max_entries
+        self.calls = 0
+        self.shared = 0
+        self._done = OrderedDict()
+        self._inflight = {}
+
+    async def __call__(self, key, *args, **kwargs):
+        if key in self._done:
+            self._done.move_to_end(key)
+            self.shared += 1
+            return self._done[key]
+
+        task = self._inflight.get(key)
+        if task is not None:
+            self.shared += 1
+            return await asyncio.shield(task)
+
+        self.calls += 1
+        task = asyncio.ensure_future(self.fn(*args, **kwargs))
+        self._inflight[key] = task
+        task.add_done_callback(lambda t, key=key: self._settle(key, t))
+        # shield: si quien la lanzó se cancela, los demás siguen esperando
+        return await asyncio.shield(task)
+
+    def _settle(self, key, task):
+        self._inflight.pop(key, None)
+        if task.cancelled() or task.exception() is not None:
+            return
+        self._done[key] = task.result()
+        while len(self._done) > self.max_entries:
+            self._done.popitem(last=False)
@@ -0,0 +1,191 @@
+# extractors/sweep.py
+import asyncio
+import math
+import os
+
+from extractors.places_search import MAX_PAGES, PAGE_SIZE, iter_places_async
+
+# Lado (km) de cada celda inicial de la cuadrícula
+SWEEP_TILE_KM = float(os.getenv("SWEEP_TILE_KM", "20"))
+# Máximo de sub-búsquedas por barrido (cada una cuesta hasta 3 requests de Text Search)
+SWEEP_MAX_TILES = int(os.getenv("SWEEP_MAX_TILES", "100"))
+# Cuántas veces se puede partir en 4 una celda saturada
+SWEEP_MAX_DEPTH = int(os.getenv("SWEEP_MAX_DEPTH", "2"))
+# Sub-búsquedas en vuelo a la vez (el QPS global lo pone el rate limiter)
+SWEEP_CONCURRENCY = int(os.getenv("SWEEP_CONCURRENCY", "8"))
+
+# Text Search no devuelve más de esto: una celda que lo alcanza está saturada
+SATURATED_RESULTS = PAGE_SIZE * MAX_PAGES
+# Radio máximo que acepta Text Search (metros)
+MAX_RADIUS_M = 50000
+KM_PER_DEG_LAT = 111.32
+
+
+def viewport_around(lat: float, lng: float, radius_m: int):
+    """
+    Caja cuadrada de lado 2 * radio centrada en (lat, lng), para cuando
+    el geocode no trae viewport.
+    """
+    dlat = radius_m / 1000 / KM_PER_DEG_LAT
+    dlng = dlat / max(0.01, math.cos(math.radians(lat)))
+    return {
+        "northeast": {"lat": lat + dlat, "lng": lng + dlng},
+        "southwest": {"lat": lat - dlat, "lng": lng - dlng},
+    }
+
+
+def _tile(south: float, west: float, north: float, east: float, depth: int = 0):
+    lat, lng = (south + north) / 2, (west + east) / 2
+    # radio = media diagonal de la celda, para que el círculo la cubra
+    half_h = (north - south) / 2 * KM_PER_DEG_LAT
+    half_w = (east - west) / 2 * KM_PER_DEG_LAT * math.cos(math.radians(lat))
+    radius_m = min(MAX_RADIUS_M, int(math.hypot(half_h, half_w) * 1000) + 1)
+    return {"south": south, "west": west, "north": north, "east": east,
+            "lat": lat, "lng": lng, "radius_m": radius_m, "depth": depth}
+
+
+def tile_viewport(viewport: dict, tile_km: float = SWEEP_TILE_KM, max_tiles: int = SWEEP_MAX_TILES):
+    """
+    Parte el viewport en una cuadrícula de celdas de ~`tile_km` de lado
+    (más grandes si no alcanzan `max_tiles`), ordenadas de la más cercana
+    al centro a la más lejana.
+    """
+    ne, sw = viewport["northeast"], viewport["southwest"]
+    south, west, north, east = sw["lat"], sw["lng"], ne["lat"], ne["lng"]
+    if east < west:  # cruza el antimeridiano
+        east += 360
+
+    mid_lat = (south + north) / 2
+    height_km = (north - south) * KM_PER_DEG_LAT
+    width_km = (east - west) * KM_PER_DEG_LAT * math.cos(math.radians(mid_lat))
+
+    rows = max(1, math.ceil(height_km / tile_km))
+    cols = max(1, math.ceil(width_km / tile_km))
+    if rows * cols > max_tiles:
+        scale = math.sqrt(rows * cols / max(1, max_tiles))
+        rows = max(1, math.floor(rows / scale))
+        cols = max(1, math.floor(cols / scale))
+
+    dlat = (north - south) / rows
+    dlng = (east - west) / cols
+    tiles = []
+    for r in range(rows):
+        for c in range(cols):
+            t = _tile(south + r * dlat, west + c * dlng, south + (r + 1) * dlat, west + (c + 1) * dlng)
+            if t["lng"] > 180:
+                t["lng"] -= 360
+            tiles.append(t)
+
+    center_lng = (west + east) / 2
+    tiles.sort(key=lambda t: (t["lat"] - mid_lat) ** 2 + (t["lng"] - center_lng) ** 2)
+    return tiles
+
+
+def split_tile(tile: dict):
+    """
+    Las 4 sub-celdas de una celda saturada.
+    """
+    s, w, n, e = tile["south"], tile["west"], tile["north"], tile["east"]
+    lat, lng, depth = (s + n) / 2, (w + e) / 2, tile["depth"] + 1
+    return [_tile(s, w, lat, lng, depth), _tile(s, lng, lat, e, depth),
+            _tile(lat, w, n, lng, depth), _tile(lat, lng, n, e, depth)]
+
+
+async def iter_sweep_async(keyword: str, viewport: dict, max_results: int = None, refresh: bool = False,
+                           tile_km: float = SWEEP_TILE_KM, max_tiles: int = SWEEP_MAX_TILES,
+                           max_depth: int = SWEEP_MAX_DEPTH, concurrency: int = SWEEP_CONCURRENCY,
+                           stats: dict = None):
+    """
+    Barrido de una región grande: una búsqueda Text Search por celda de la
+    cuadrícula del viewport, varias a la vez, entregando cada lugar nuevo
+    (sin repetir place_id) en cuanto llega.
+
+    - Una celda con 60 resultados (el tope de Text Search) está saturada:
+      se parte en 4 y se busca cada parte, hasta `max_depth` niveles y
+      `max_tiles` búsquedas en total (la cuadrícula inicial usa como
+      máximo la mitad, el resto queda para subdividir).
+    - Los lugares de la celda central salen primero (el primero es el
+      CLIENTE en el reporte); el resto en orden de llegada.
+    - Una celda que falla no corta el barrido (se cuenta en `stats`).
+    - `stats` (dict opcional) recibe tiles / saturated / subdivided / failed / duplicates.
+    """
+    stats = {} if stats is None else stats
+    stats.update(tiles=0, saturated=0, subdivided=0, failed=0, duplicates=0)
+
+    results = asyncio.Queue()
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    tasks = set()
+
+    async def search_tile(n: int, tile: dict):
+        # cada lugar llega como (n, lugar, None); al terminar, (n, None, (celda, total, error))
+        count = 0
+        error = None
+        try:
+            async with semaphore:
+                async for place in iter_places_async(
+                    keyword, tile["lat"], tile["lng"], radius_m=tile["radius_m"],
+                    max_results=SATURATED_RESULTS, refresh=refresh
+                ):
+                    count += 1
+                    await results.put((n, place, None))
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            error = e
+        await results.put((n, None, (tile, count, error)))
+
+    def launch(tile: dict):
+        n = stats["tiles"]
+        stats["tiles"] += 1
+        task = asyncio.create_task(search_tile(n, tile))
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+
+    for tile in tile_viewport(viewport, tile_km, max(1, max_tiles // 2)):
+        launch(tile)
+
+    seen = set()
+    held = []             # lugares de otras celdas mientras la central (n=0) no entrega
+    center_ready = False
+    pending = stats["tiles"]
+    yielded = 0
+    try:
+        while pending:
+            n, place, done = await results.get()
+            out = []
+            if done is not None:
+                tile, count, error = done
+                pending -= 1
+                if error is not None:
+                    stats["failed"] += 1
+                elif count >= SATURATED_RESULTS:
+                    stats["saturated"] += 1
+                    if tile["depth"] < max_depth and stats["tiles"] + 4 <= max_tiles:
+                        stats["subdivided"] += 1
+                        for sub in split_tile(tile):
+                            launch(sub)
+                        pending += 4
+                if n == 0 and not center_ready:
+                    center_ready = True
+                    out, held = held, []
+            elif place.get("place_id") in seen:
+                stats["duplicates"] += 1
+            else:
+                seen.add(place.get("place_id"))
+                if center_ready:
+                    out = [place]
+                elif n == 0:
+                    center_ready = True
+                    out, held = [place] + held, []
+                else:
+                    held.append(place)
+
+            for p in out:
+                yield p
+                yielded += 1
+                if max_results and yielded >= max_results:
+                    return
+    finally:
+        for task in list(tasks):
+            task.cancel()
+
@@ -0,0 +1,362 @@
+# mock_google.py
+import argparse
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+import urllib.parse
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from extractors.cache import cache_key
+from extractors.fixtures import FIXTURES_DIR, FixtureStore
+
+# Mismas rutas que extractors/http_client.py (sin importar `requests`)
+ENDPOINTS = {
+    "/geocode/json": "geocode",
+    "/place/textsearch/json": "textsearch",
+    "/place/details/json": "details",
+    "/place/autocomplete/json": "autocomplete",
+}
+
+PAGE_SIZE = 20
+MAX_PAGES = 3
+REVIEWS_PER_REQUEST = 5
+# Nombres y reviews reales (versionados): outputs/raw.json lo reescribe cada corrida
+DEFAULT_SEED_RAW = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "mock_seed.json")
+
+# Sugerencias de Autocomplete cuando no hay fixture
+CITIES = [
+    "Houston, TX, USA", "Austin, TX, USA", "Dallas, TX, USA", "San Antonio, TX, USA",
+    "El Paso, TX, USA", "Los Angeles, CA, USA", "Chicago, IL, USA", "Miami, FL, USA",
+    "New York, NY, USA", "Phoenix, AZ, USA", "Ciudad de México, CDMX, México",
+    "Monterrey, N.L., México", "Guadalajara, Jal., México", "Puebla, Pue., México",
+]
+COUNTRY_SUFFIX = {"us": "USA", "mx": "México"}
+
+# Reviews de relleno si no hay semilla
+DEFAULT_REVIEWS = [
+    {"author_name": "Ana", "rating": 5, "time": 1760000000, "text": "Great brisket and friendly staff."},
+    {"author_name": "Luis", "rating": 4, "time": 1759000000, "text": "Buena carne para asar, precios justos."},
+    {"author_name": "Mark", "rating": 2, "time": 1758000000, "text": "Long line and the ribeye was dry."},
+    {"author_name": "Sofía", "rating": 5, "time": 1757000000, "text": "La arrachera y el chorizo, lo mejor."},
+    {"author_name": "Jen", "rating": 1, "time": 1756000000, "text": "Rude service, will not come back."},
+    {"author_name": "Carlos", "rating": 3, "time": 1755000000, "text": "Ok, pero caro."},
+    {"author_name": "Dave", "rating": 5, "time": 1754000000, "text": "Best fajitas and sausage in town."},
+    {"author_name": "Rosa", "rating": 4, "time": 1753000000, "text": "Carnitas muy ricas, buen servicio."},
+]
+
+
+def _h(*parts):
+    return int(hashlib.sha1("|".join(str(p) for p in parts).encode("utf-8")).hexdigest()[:12], 16)
+
+
+def _norm(text: str):
+    return " ".join((text or "").lower().split())
+
+
+class MockGoogle:
+    """
+    Respuestas de Google Maps para pruebas sin red.
+
+    - Sirve primero los fixtures grabados (ver extractors/fixtures.py) que
+      coincidan con el request; si no hay, genera datos deterministas
+      (mismo request → misma respuesta), sembrados con fixtures/mock_seed.json.
+    - Text Search pagina de a 20 con next_page_token (INVALID_REQUEST si
+      se usa antes de `token_delay` segundos, como Google).
+    - Inyección de fallas: latencia + jitter, HTTP 503 (`error_rate`) y
+      status OVER_QUERY_LIMIT (`over_query_rate`).
+    """
+
+    def __init__(self, places_per_query: int = 60, latency_ms: float = 0, jitter_ms: float = 0,
+                 error_rate: float = 0, over_query_rate: float = 0, token_delay: float = 0,
+                 fixtures_dir: str = None, seed_raw: str = DEFAULT_SEED_RAW, seed: int = 0):
+        self.places_per_query = places_per_query
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.over_query_rate = over_query_rate
+        self.token_delay = token_delay
+
+        self.fixtures = {}
+        if fixtures_dir:
+            for endpoint, params, data in FixtureStore(fixtures_dir):
+                self.fixtures[cache_key(endpoint, params)] = data
+
+        self.seed = None
+        if seed_raw and os.path.exists(seed_raw):
+            with open(seed_raw, encoding="utf-8") as f:
+                self.seed = json.load(f)
+        seed_places = (self.seed or {}).get("places", [])
+        self.review_pool = [r for p in seed_places for r in p.get("reviews", [])] or DEFAULT_REVIEWS
+        self.seed_names = [p.get("name") for p in seed_places if p.get("name")]
+
+        self.places = {}
+        self.tokens = {}
+        self.stats = Counter()
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def delay(self):
+        """
+        Segundos que debe tardar la respuesta (latencia ± jitter).
+        """
+        with self._lock:
+            jitter = self._rng.uniform(-self.jitter_ms, self.jitter_ms) if self.jitter_ms else 0
+        return max(0.0, self.latency_ms + jitter) / 1000
+
+    def handle(self, endpoint: str, params: dict):
+        """
+        Devuelve (código HTTP, cuerpo JSON) para un request.
+        """
+        with self._lock:
+            self.stats[endpoint] += 1
+            roll_error = self._rng.random()
+            roll_quota = self._rng.random()
+        if roll_error < self.error_rate:
+            self.stats["injected_http_503"] += 1
+            return 503, {"error": "mock: servicio no disponible"}
+        if roll_quota < self.over_query_rate:
+            self.stats["injected_over_query_limit"] += 1
+            return 200, {"status": "OVER_QUERY_LIMIT", "error_message": "mock: cuota excedida"}
+        if not params.get("key"):
+            return 200, {"status": "REQUEST_DENIED", "error_message": "Falta el parámetro key"}
+
+        fixture = self.fixtures.get(cache_key(endpoint, params))
+        if fixture is not None:
+            self.stats["fixtures"] += 1
+            return 200, fixture
+        return 200, getattr(self, "_" + endpoint)(params)
+
+    # ---- Geocoding
+
+    def _center(self, address: str):
+        if self.seed and _norm(self.seed.get("location_text")) == _norm(address):
+            return self.seed["center"]["lat"], self.seed["center"]["lng"], self.seed.get("formatted_location")
+        h = _h("geocode", _norm(address))
+        return 19 + (h % 3000) / 100, -123 + (h // 3000 % 4500) / 100, address.strip()
+
+    def _geocode(self, params: dict):
+        address = params.get("address") or ""
+        if not address.strip():
+            return {"status": "INVALID_REQUEST", "results": []}
+        lat, lng, formatted = self._center(address)
+        return {
+            "status": "OK",
+            "results": [{
+                "formatted_address": formatted,
+                "geometry": {
+                    "location": {"lat": lat, "lng": lng},
+                    "viewport": {
+                        "northeast": {"lat": lat + 0.25, "lng": lng + 0.3},
+                        "southwest": {"lat": lat - 0.25, "lng": lng - 0.3},
+                    }
+                }
+            }]
+        }
+
+    # ---- Text Search
+
+    def _place(self, query: str, location: str, radius: int, i: int):
+        h = _h("place", _norm(query), location, i)
+        lat, lng = (float(x) for x in location.split(",")) if location else (0.0, 0.0)
+        # hasta `radius` metros del centro (~111 km por grado)
+        spread = (radius or 30000) / 111000
+        place = {
+            "place_id": f"mock-{h:012x}",
+            "name": self.seed_names[i] if i < len(self.seed_names) else f"{query.title()} {i + 1}",
+            "formatted_address": f"{100 + i} Main St",
+            "rating": round(min(5.0, 3.3 + (h % 18) / 10), 1),
+            "user_ratings_total": h % 2500,
+            "geometry": {"location": {
+                "lat": lat + spread * ((h >> 8) % 2001 - 1000) / 1414,
+                "lng": lng + spread * ((h >> 20) % 2001 - 1000) / 1414,
+            }},
+        }
+        with self._lock:
+            self.places[place["place_id"]] = place
+        return place
+
+    def _page(self, query: str, location: str, radius: int, page: int):
+        start = page * PAGE_SIZE
+        end = min(self.places_per_query, start + PAGE_SIZE, MAX_PAGES * PAGE_SIZE)
+        data = {
+            "status": "OK" if end > start else "ZERO_RESULTS",
+            "results": [self._place(query, location, radius, i) for i in range(start, end)],
+        }
+        if end < min(self.places_per_query, MAX_PAGES * PAGE_SIZE):
+            with self._lock:
+                token = f"mock-token-{self._rng.getrandbits(64):016x}"
+                self.tokens[token] = (query, location, radius, page + 1, time.monotonic())
+            data["next_page_token"] = token
+        return data
+
+    def _textsearch(self, params: dict):
+        token = params.get("pagetoken")
+        if token:
+            with self._lock:
+                state = self.tokens.get(token)
+            if state is None or time.monotonic() - state[4] < self.token_delay:
+                return {"status": "INVALID_REQUEST", "results": []}
+            return self._page(*state[:4])
+        if not params.get("query"):
+            return {"status": "INVALID_REQUEST", "results": []}
+        return self._page(params["query"], params.get("location", ""), int(params.get("radius") or 0), 0)
+
+    # ---- Place Details
+
+    def _reviews(self, place_id: str, sort: str, language: str):
+        picked = {}
+        for k in range(REVIEWS_PER_REQUEST * 2):
+            r = self.review_pool[_h("review", place_id, sort, language, k) % len(self.review_pool)]
+            picked.setdefault(id(r), r)
+            if len(picked) == REVIEWS_PER_REQUEST:
+                break
+        reviews = list(picked.values())
+        if sort == "newest":
+            reviews.sort(key=lambda r: r.get("time") or 0, reverse=True)
+        return reviews
+
+    def _details(self, params: dict):
+        place_id = params.get("place_id") or ""
+        if not place_id:
+            return {"status": "INVALID_REQUEST"}
+        with self._lock:
+            place = self.places.get(place_id)
+        h = _h("details", place_id)
+        place = place or {
+            "name": f"Mock place {place_id[-6:]}",
+            "formatted_address": f"{h % 9000} Main St",
+            "rating": round(min(5.0, 3.3 + (h % 18) / 10), 1),
+            "user_ratings_total": h % 2500,
+        }
+        full = {
+            "name": place["name"],
+            "rating": place["rating"],
+            "user_ratings_total": place["user_ratings_total"],
+            "types": ["store", "point_of_interest", "establishment"],
+            "formatted_address": place["formatted_address"],
+            "geometry": place.get("geometry"),
+            "url": f"https://maps.google.com/?cid={h}",
+            "reviews": self._reviews(place_id, params.get("reviews_sort", "most_relevant"), params.get("language")),
+        }
+        # "geometry/location" → "geometry"
+        fields = [f.strip().split("/")[0] for f in (params.get("fields") or "").split(",") if f.strip()]
+        result = {k: v for k, v in full.items() if not fields or k in fields}
+        return {"status": "OK", "result": result}
+
+    # ---- Autocomplete
+
+    def _autocomplete(self, params: dict):
+        tokens = _norm(params.get("input", "").replace(",", " ")).split()
+        country = (params.get("components") or "").partition("country:")[2].lower()
+        candidates = list(CITIES)
+        if self.seed and self.seed.get("formatted_location") not in candidates:
+            candidates.insert(0, self.seed.get("formatted_location"))
+
+        predictions = []
+        for city in candidates:
+            if not city:
+                continue
+            if country in COUNTRY_SUFFIX and not city.endswith(COUNTRY_SUFFIX[country]):
+                continue
+            words = _norm(city.replace(",", " ")).split()
+            if tokens and all(any(w.startswith(t) for w in words) for t in tokens):
+                predictions.append({"description": city, "place_id": f"mock-city-{_h(city):012x}"})
+        predictions = predictions[:5]
+        return {"status": "OK" if predictions else "ZERO_RESULTS", "predictions": predictions}
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    # cola de listen: con la default (5) las conexiones simultáneas de más se
+    # descartan y el cliente reintenta el SYN ~1s después (latencia falsa)
+    request_queue_size = 128
+
+
+def make_server(mock: MockGoogle, host: str = "127.0.0.1", port: int = 8765, verbose: bool = False):
+    """
+    Servidor HTTP (un thread por request) que atiende las rutas de la API
+    bajo /maps/api y `GET /_stats` con los contadores del mock.
+    """
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            url = urllib.parse.urlsplit(self.path)
+            if url.path == "/_stats":
+                return self._send(200, dict(mock.stats))
+
+            endpoint = next((name for path, name in ENDPOINTS.items() if url.path.endswith(path)), None)
+            if endpoint is None:
+                return self._send(404, {"error": f"ruta desconocida: {url.path}"})
+
+            params = dict(urllib.parse.parse_qsl(url.query))
+            time.sleep(mock.delay())
+            status, body = mock.handle(endpoint, params)
+            self._send(status, body)
+
+        def _send(self, status: int, body: dict):
+            data = json.dumps(body, ensure_ascii=False).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format, *args):
+            if verbose:
+                super().log_message(format, *args)
+
+    server = _Server((host, port), Handler)
+    return server
+
+
+def serve_in_thread(mock: MockGoogle = None, host: str = "127.0.0.1", port: int = 0):
+    """
+    Arranca el mock en un thread de fondo (puerto libre si `port=0`).
+    Devuelve (server, base_url); usar `server.shutdown()` al terminar.
+    """
+    server = make_server(mock or MockGoogle(), host, port)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}/maps/api"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Servidor local que imita Google Maps (pruebas sin red)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--places", type=int, default=60, help="Resultados de Text Search por búsqueda (máx. 60)")
+    parser.add_argument("--latency-ms", type=float, default=0)
+    parser.add_argument("--jitter-ms", type=float, default=0)
+    parser.add_argument("--error-rate", type=float, default=0, help="Fracción de requests con HTTP 503")
+    parser.add_argument("--over-query-limit", type=float, default=0,
+                        help="Fracción de requests con status OVER_QUERY_LIMIT")
+    parser.add_argument("--token-delay", type=float, default=0,
+                        help="Segundos hasta que un next_page_token es válido (Google: ~2)")
+    parser.add_argument("--fixtures", nargs="?", const=FIXTURES_DIR, default=None, metavar="DIR",
+                        help=f"Servir también los fixtures grabados (default {FIXTURES_DIR})")
+    parser.add_argument("--seed-raw", default=DEFAULT_SEED_RAW, help="JSON con forma de raw.json para sembrar nombres y reviews")
+    parser.add_argument("--seed", type=int, default=0, help="Semilla de la inyección de fallas")
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+
+    mock = MockGoogle(
+        places_per_query=args.places, latency_ms=args.latency_ms, jitter_ms=args.jitter_ms,
+        error_rate=args.error_rate, over_query_rate=args.over_query_limit, token_delay=args.token_delay,
+        fixtures_dir=args.fixtures, seed_raw=args.seed_raw, seed=args.seed
+    )
+    server = make_server(mock, args.host, args.port, verbose=args.verbose)
+    print(f"Mock Google Maps en http://{args.host}:{args.port}/maps/api")
+    print(f"export GOOGLE_MAPS_BASE_URL=http://{args.host}:{args.port}/maps/api GOOGLE_API_KEY=mock")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
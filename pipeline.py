@@ -0,0 +1,296 @@
+# pipeline.py
+import asyncio
+import json
+import os
+import time
+
+from extractors.geocode import geocode_location_async
+from extractors.http_client import async_session
+from extractors.places_search import iter_places_async
+from extractors.sweep import iter_sweep_async, viewport_around
+from extractors.place_details import (
+    DETAILS_MAX_WORKERS, details_fallback, details_from_search, get_place_details_async
+)
+from extractors.metrics import collect_metrics, stage
+from analyzers.lexicon import DEFAULT_VERTICAL, available_verticals
+from analyzers.reviews_analyzer import analyze_place
+from composer.history import get_history
+from composer.ranking import DEFAULT_SCORING, parse_scoring, score_places, top_k
+from composer.report_builder import build_report
+from composer.report_diff import build_diff, reusable_details, unchanged
+from composer.report_stream import ReportStream
+from composer.review_index import get_review_index
+
+FETCH_TIERS = ("all", "full", "light")
+# En tier "full": cuántos competidores (además del cliente) reciben reviews
+REVIEWS_TOP_K = int(os.getenv("REVIEWS_TOP_K", "5"))
+
+# Tiempo máximo de un job completo (segundos); 0 = sin límite
+PIPELINE_TIMEOUT = float(os.getenv("PIPELINE_TIMEOUT", "300"))
+
+# raw.json / report.json en una sola línea (sin indentación)
+OUTPUT_COMPACT = os.getenv("OUTPUT_COMPACT", "0") == "1"
+
+
+async def run_pipeline_async(keyword: str, location_text: str, radius_m: int = 30000, top_n: int = 6,
+                             refresh: bool = False, vertical: str = DEFAULT_VERTICAL,
+                             emit=None, on_progress=None, geocode=None, get_details=None,
+                             details_concurrency: int = None, fetch_tier: str = "all",
+                             reviews_top_k: int = REVIEWS_TOP_K, review_sorts=("newest",),
+                             review_languages=(None,), previous: dict = None, scoring: str = DEFAULT_SCORING,
+                             sweep: bool = False, insight_history: bool = False):
+    """
+    Pipeline completo como corutina: geocode → Text Search → Place Details → reporte.
+    Devuelve (raw, report); raw["metrics"] trae tiempos por etapa,
+    latencias HTTP, reintentos, hits de cache y cuota usada.
+
+    - Los detalles se piden en cuanto llega cada resultado de búsqueda, con
+      máximo `details_concurrency` en vuelo por job; QPS, presupuesto y key
+      de cada request los decide el scheduler de extractors/scheduler.py.
+    - `fetch_tier` controla cuánto Place Details se pide (ver FETCH_TIERS):
+      "all" = todos con reviews; "full" = reviews solo del cliente y los
+      `reviews_top_k` competidores con mejor score (el resto con datos de
+      Text Search); "light" = sin Place Details, solo Text Search.
+    - `review_sorts` / `review_languages`: varias combinaciones (ej.
+      ("newest", "most_relevant")) amplían la muestra de reviews por lugar;
+      se piden en paralelo y se deduplican (ver get_place_details_async).
+    - `previous` (raw de una corrida anterior de la misma consulta) activa el
+      modo incremental: los lugares con igual rating y total de reseñas en
+      Text Search reutilizan sus detalles anteriores sin llamar a Place
+      Details, y el reporte suma una sección "diff" (ver composer/report_diff.py);
+      los que cambiaron se vuelven a pedir sin pasar por el cache.
+    - `scoring`: fórmula de la comparativa premium y de la selección top-K
+      del tier "full" (ej. "bayesian,distance"; ver composer/ranking.py).
+    - `sweep=True` cubre regiones grandes: en vez de una búsqueda con
+      `radius_m`, barre el viewport geocodificado con una cuadrícula de
+      búsquedas (ver extractors/sweep.py); `top_n` puede pasar de 60.
+    - `insight_history=True` suma al insight estratégico las reseñas de
+      estos lugares guardadas en el historial (ver composer/history.py).
+    - Las reseñas de cada lugar se agregan al índice invertido en cuanto
+      llegan sus detalles (ver composer/review_index.py); el reporte lo usa
+      para las quejas relacionadas con la reseña negativa urgente.
+    - `emit` activa el modo streaming (ver composer/report_stream.py).
+    - `on_progress(done, total, index, details)` se llama al terminar cada lugar.
+    - `geocode` y `get_details` (corutinas) permiten inyectar versiones
+      compartidas, ej. el batch runner deduplica geocodes y place_ids entre jobs.
+    """
+    if fetch_tier not in FETCH_TIERS:
+        raise ValueError(f"fetch_tier inválido: {fetch_tier} (usar {', '.join(FETCH_TIERS)})")
+    parse_scoring(scoring)
+    # antes de gastar cuota: un vertical sin lexicón fallaría recién en el análisis
+    if vertical not in available_verticals():
+        raise ValueError(f"No hay lexicón para el vertical: {vertical}")
+    geocode = geocode or geocode_location_async
+    if get_details is None:
+        async def get_details(place_id, refresh):
+            return await get_place_details_async(
+                place_id, refresh, review_sorts=review_sorts, languages=review_languages
+            )
+    semaphore = asyncio.Semaphore(max(1, details_concurrency or DETAILS_MAX_WORKERS))
+    reusable = reusable_details(previous)
+    review_index = get_review_index()
+    indexing = []
+    sweep_stats = {}
+    reused = []
+
+    with collect_metrics() as metrics:
+        async with async_session():
+            with stage("geocode"):
+                geo = await geocode(location_text, refresh)
+            lat = geo["lat"]
+            lng = geo["lng"]
+            formatted_location = geo.get("formatted_address") or location_text
+            center = {"lat": lat, "lng": lng}
+
+            stream = None
+            if emit:
+                stream = ReportStream(keyword, location_text, formatted_location, emit,
+                                      vertical=vertical, scoring=scoring, center=center)
+                stream.start(center=center, radius_m=radius_m, top_n=top_n)
+
+            places = []
+            results = {}
+
+            def place_done(index: int, details: dict):
+                results[index] = details
+                if review_index is not None and details.get("reviews"):
+                    # SQLite fuera del event loop; se espera antes del reporte
+                    indexing.append(asyncio.ensure_future(asyncio.to_thread(review_index.add_place, details)))
+                if stream:
+                    with stage("analysis"):
+                        stream.add_place(index, details)
+                if on_progress:
+                    on_progress(len(results), len(places), index, details)
+
+            async def fetch(index: int, place: dict, refresh: bool = refresh):
+                async with semaphore:
+                    t0 = time.perf_counter()
+                    try:
+                        details = await get_details(place["place_id"], refresh)
+                    except asyncio.CancelledError:
+                        raise
+                    except Exception as e:
+                        details = details_fallback(place, e)
+                    metrics.add_stage("details_call", time.perf_counter() - t0)
+                place_done(index, details)
+
+            def schedule(index: int, place: dict):
+                before = reusable.get(place["place_id"])
+                if before and unchanged(place, before):
+                    reused.append(place["place_id"])
+                    place_done(index, before)
+                else:
+                    # cambió en Text Search: los detalles en cache son los mismos que se descartaron
+                    tasks.append(asyncio.create_task(fetch(index, place, refresh or before is not None)))
+
+            with stage("details"):
+                tasks = []
+                search_wait = 0.0
+                if sweep:
+                    viewport = geo.get("viewport") or viewport_around(lat, lng, radius_m)
+                    found = iter_sweep_async(keyword, viewport, max_results=top_n, refresh=refresh,
+                                             stats=sweep_stats)
+                else:
+                    found = iter_places_async(keyword, lat, lng, radius_m=radius_m, max_results=top_n,
+                                              refresh=refresh)
+                try:
+                    t0 = time.perf_counter()
+                    async for place in found:
+                        search_wait += time.perf_counter() - t0
+                        if place.get("place_id"):
+                            places.append(place)
+                            index = len(places) - 1
+                            if fetch_tier == "all" or (fetch_tier == "full" and index == 0):
+                                schedule(index, place)
+                            elif fetch_tier == "light":
+                                place_done(index, details_from_search(place))
+                            if len(places) >= top_n:
+                                break
+                        t0 = time.perf_counter()
+
+                    if fetch_tier == "full":
+                        # reviews solo para el cliente (ya en vuelo) y los top-K competidores por score
+                        competitors = places[1:]
+                        best = {i + 1 for i in top_k(score_places(competitors, scoring, center), reviews_top_k)}
+                        for index in range(1, len(places)):
+                            if index in best:
+                                schedule(index, places[index])
+                            else:
+                                place_done(index, details_from_search(places[index]))
+
+                    await asyncio.gather(*tasks)
+                except BaseException:
+                    for task in tasks:
+                        task.cancel()
+                    raise
+                finally:
+                    await found.aclose()
+                metrics.add_stage("search", search_wait)
+
+        places_details = [results[i] for i in range(len(places))]
+
+        # Análisis y reporte en un thread: con muchas reseñas (--insight-history)
+        # el conteo espera a un pool de procesos, y en el event loop frenaría las
+        # requests y timeouts de los demás jobs del batch o del servicio
+        def analyze_all():
+            for p in places_details:
+                analyze_place(p, vertical)
+
+        # Análisis de reseñas (memoizado; build_report lo reutiliza)
+        with stage("analysis"):
+            await asyncio.to_thread(analyze_all)
+
+        if indexing:
+            with stage("index"):
+                await asyncio.gather(*indexing)
+
+        review_history = None
+        if insight_history and get_history():
+            with stage("history"):
+                review_history = await asyncio.to_thread(
+                    get_history().place_reviews, [p.get("place_id") for p in places_details]
+                )
+
+        def make_report():
+            if stream:
+                report = stream.finish(places_details, review_history, review_index)
+            else:
+                report = build_report(keyword, location_text, formatted_location, places_details,
+                                      vertical=vertical, scoring=scoring, center=center,
+                                      review_history=review_history, review_index=review_index)
+            if previous:
+                report["diff"] = build_diff(previous, places_details)
+                if stream:
+                    stream.emit({"event": "diff", **report["diff"]})
+            return report
+
+        # Reporte (template estable)
+        with stage("report"):
+            report = await asyncio.to_thread(make_report)
+
+    raw = {
+        "keyword": keyword,
+        "location_text": location_text,
+        "formatted_location": formatted_location,
+        "center": center,
+        "radius_m": radius_m,
+        "top_n": top_n,
+        "vertical": vertical,
+        "fetch_tier": fetch_tier,
+        "scoring": scoring,
+        "review_sorts": list(review_sorts),
+        "run_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "places": places_details,
+        "metrics": metrics.to_dict()
+    }
+    if sweep:
+        raw["sweep"] = sweep_stats
+    if previous:
+        raw["incremental"] = {"previous_run": previous.get("run_at"), "reused_details": len(reused)}
+
+    return raw, report
+
+
+async def run_pipeline_with_timeout(*args, timeout: float = None, **kwargs):
+    """
+    `run_pipeline_async` con tiempo máximo: al vencerse se cancelan todas
+    las requests en vuelo y se levanta TimeoutError.
+    """
+    timeout = PIPELINE_TIMEOUT if timeout is None else timeout
+    coro = run_pipeline_async(*args, **kwargs)
+    if not timeout:
+        return await coro
+    try:
+        return await asyncio.wait_for(coro, timeout)
+    except asyncio.TimeoutError:
+        raise TimeoutError(f"El pipeline tardó más de {timeout:g}s y se canceló")
+
+
+def run_pipeline(*args, **kwargs):
+    """
+    Wrapper sincrónico de `run_pipeline_async` (mismos argumentos + `timeout`),
+    para runner.py y Streamlit. No usar desde dentro de un event loop.
+    """
+    return asyncio.run(run_pipeline_with_timeout(*args, **kwargs))
+
+
+def save_outputs(raw: dict, report: dict, out_dir: str = "outputs", compact: bool = None):
+    """
+    Escribe raw.json y report.json en `out_dir`.
+    report.json se escribe al final y de forma atómica: si existe, el job terminó.
+    `compact=True` (o OUTPUT_COMPACT=1) escribe JSON minificado.
+    """
+    compact = OUTPUT_COMPACT if compact is None else compact
+    dump_options = {"separators": (",", ":")} if compact else {"indent": 2}
+    os.makedirs(out_dir, exist_ok=True)
+
+    paths = []
+    for name, data in (("raw.json", raw), ("report.json", report)):
+        path = os.path.join(out_dir, name)
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, **dump_options)
+        os.replace(tmp, path)
+        paths.append(path)
+
+    return paths
@@ -1,74 +1,99 @@
 # runner.py
-import json
+import argparse
 import os
+import sys
 
-from extractors.geocode import geocode_location
-from extractors.places_search import search_places
-from extractors.place_details import get_place_details
-from composer.report_builder import build_report
+from extractors.metrics import export_metrics
+from analyzers.lexicon import DEFAULT_VERTICAL, available_verticals
+from composer.history import get_history, record_run
+from composer.ranking import DEFAULT_SCORING
+from composer.report_diff import load_previous_run
+from composer.report_stream import ndjson_writer
+from pipeline import FETCH_TIERS, REVIEWS_TOP_K, run_pipeline, save_outputs
 
 
-def main():
-    # 1) Inputs (por ahora aquí mismo)
-    keyword = "meat market"
-    location_text = "Houston, TX"
-    radius_m = 30000
-    top_n = 6
-
-    # 2) Geocode
-    geo = geocode_location(location_text)
-    lat = geo["lat"]
-    lng = geo["lng"]
-    formatted_location = geo.get("formatted_address") or location_text
+def split_list(value: str):
+    return tuple(x.strip() for x in (value or "").split(",") if x.strip())
 
-    # 3) Search places
-    places = search_places(keyword, lat, lng, radius_m=radius_m)
-    places = [p for p in places if p.get("place_id")][:top_n]
 
-    # 4) Details (rating, reviews sample, etc.)
-    places_details = []
-    for p in places:
-        try:
-            details = get_place_details(p["place_id"])
-            places_details.append(details)
-        except Exception as e:
-            places_details.append({
-                "place_id": p.get("place_id"),
-                "name": p.get("name"),
-                "rating": None,
-                "reviews_count": None,
-                "address": p.get("formatted_address"),
-                "maps_url": None,
-                "reviews": [],
-                "error": str(e)
-            })
+def main():
+    # 1) Inputs
+    parser = argparse.ArgumentParser(description="Agente Google Search – un job keyword + ubicación")
+    parser.add_argument("--keyword", default="meat market")
+    parser.add_argument("--location", default="Houston, TX")
+    parser.add_argument("--radius-m", type=int, default=30000)
+    parser.add_argument("--top-n", type=int, default=6)
+    parser.add_argument("--sweep", action="store_true",
+                        help="Barrer el viewport de la ubicación con una cuadrícula de búsquedas (regiones grandes; --top-n puede pasar de 60)")
+    parser.add_argument("--vertical", choices=available_verticals(), default=DEFAULT_VERTICAL)
+    parser.add_argument("--tier", choices=FETCH_TIERS, default="all",
+                        help="all = reviews de todos; full = cliente + top-K; light = solo Text Search")
+    parser.add_argument("--reviews-top-k", type=int, default=REVIEWS_TOP_K)
+    parser.add_argument("--scoring", default=DEFAULT_SCORING,
+                        help="Fórmula de ranking: premium|bayesian + modificadores distance,recency (ej. bayesian,distance)")
+    parser.add_argument("--review-sorts", default="newest",
+                        help="Órdenes de reviews separados por coma (ej. newest,most_relevant)")
+    parser.add_argument("--review-languages", default="",
+                        help="Idiomas de reviews separados por coma (ej. en,es); vacío = default de Google")
+    parser.add_argument("--insight-history", action="store_true",
+                        help="Usar también las reseñas del historial para el insight estratégico")
+    parser.add_argument("--refresh", action="store_true", help="Ignorar el cache de respuestas")
+    parser.add_argument(
+        "--incremental", nargs="?", const=os.path.join("outputs", "raw.json"), metavar="RAW",
+        help="Reutilizar los detalles sin cambios de una corrida anterior (default outputs/raw.json) y agregar un diff"
+    )
+    parser.add_argument("--compact", action="store_true", help="Escribir raw.json / report.json minificados")
+    parser.add_argument("--timeout", type=float, default=None, help="Segundos máximos del job (cancela al vencer)")
+    parser.add_argument(
+        "--stream", nargs="?", const="-", metavar="PATH",
+        help="Emitir el reporte como NDJSON mientras se genera (a PATH o stdout con '-')"
+    )
+    args = parser.parse_args()
 
-    # 5) Raw output
-    raw = {
-        "keyword": keyword,
-        "location_text": location_text,
-        "formatted_location": formatted_location,
-        "center": {"lat": lat, "lng": lng},
-        "radius_m": radius_m,
-        "top_n": top_n,
-        "places": places_details
-    }
+    # con --stream a stdout, los mensajes van a stderr para no ensuciar el NDJSON
+    out = sys.stderr if args.stream == "-" else sys.stdout
 
-    # 6) Report output (template estable)
-    report = build_report(keyword, location_text, formatted_location, places_details)
+    previous = None
+    if args.incremental:
+        previous = load_previous_run(args.incremental, args.keyword, args.location)
+        if previous is None and get_history():
+            previous = get_history().latest_run(args.keyword, args.location)
+        if previous is None:
+            print(f"ℹ️ Sin corrida previa de esta consulta en {args.incremental}; corrida completa.", file=out)
 
-    # 7) Save outputs
-    os.makedirs("outputs", exist_ok=True)
+    emit = None
+    stream_file = None
+    if args.stream == "-":
+        emit = ndjson_writer(sys.stdout)
+    elif args.stream:
+        os.makedirs(os.path.dirname(args.stream) or ".", exist_ok=True)
+        stream_file = open(args.stream, "w", encoding="utf-8")
+        emit = ndjson_writer(stream_file)
 
-    with open("outputs/raw.json", "w", encoding="utf-8") as f:
-        json.dump(raw, f, ensure_ascii=False, indent=2)
+    try:
+        raw, report = run_pipeline(
+            args.keyword, args.location, radius_m=args.radius_m, top_n=args.top_n,
+            refresh=args.refresh, vertical=args.vertical, emit=emit, timeout=args.timeout,
+            fetch_tier=args.tier, reviews_top_k=args.reviews_top_k,
+            review_sorts=split_list(args.review_sorts) or ("newest",),
+            review_languages=split_list(args.review_languages) or (None,),
+            previous=previous, scoring=args.scoring, sweep=args.sweep,
+            insight_history=args.insight_history
+        )
+    finally:
+        if stream_file:
+            stream_file.close()
 
-    with open("outputs/report.json", "w", encoding="utf-8") as f:
-        json.dump(report, f, ensure_ascii=False, indent=2)
+    # 2) Save outputs
+    paths = save_outputs(raw, report, "outputs", compact=args.compact or None)
+    run_id = record_run(raw)
+    export_metrics(raw["metrics"], {"keyword": args.keyword, "location": args.location})
 
-    print("✅ Listo. Archivos generados:")
-    print("- outputs/raw.json")
-    print("- outputs/report.json")
+    print("✅ Listo. Archivos generados:", file=out)
+    for path in paths:
+        print(f"- {path}", file=out)
+    if run_id is not None:
+        print(f"- historial: corrida #{run_id} en {get_history().path}", file=out)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,485 @@
+# service.py
+"""
+Servicio HTTP de larga vida: geocode → búsqueda → detalles → reporte por HTTP,
+para otros agentes que consumen los reportes sin pagar arranque en frío.
+
+    python service.py --port 8080
+    curl -s localhost:8080/report -d '{"keyword": "meat market", "location": "Houston, TX"}'
+
+- `POST /report` con JSON (mismos parámetros que runner.py) devuelve
+  {"report", "coalesced"} (+ "raw" con "include_raw": true). Con
+  "stream": true responde NDJSON con los eventos de composer/report_stream.py
+  y una línea final {"event": "done"} (o {"event": "error"}).
+- Requests iguales que llegan mientras la misma consulta corre se unen a
+  esa ejecución (una sola corrida del pipeline, una sola tanda de llamadas
+  a Google); un consumidor que llega tarde al stream recibe los eventos
+  anteriores primero.
+- Un solo event loop con el cliente HTTP async abierto todo el tiempo
+  (keep-alive), más los caches del proceso: geocodes compartidos entre
+  requests y Place Details en vuelo deduplicados por place_id.
+- Con SERVICE_RESULT_TTL > 0 los resultados terminados se reusan durante
+  ese tiempo para la misma consulta (ui_app.py usa este mismo servicio con
+  su propio TTL).
+- `GET /health`: contadores (corridas, requests unidos, fallidos, en vuelo).
+  `GET /quota`: consumo del día por API key (ver extractors/scheduler.py).
+"""
+import argparse
+import asyncio
+import json
+import os
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from analyzers.lexicon import DEFAULT_VERTICAL, available_verticals
+from composer.history import record_run
+from composer.ranking import DEFAULT_SCORING, parse_scoring
+from extractors.geocode import geocode_location_async
+from extractors.http_client import GoogleAPIError, async_session
+from extractors.metrics import export_metrics
+from extractors.place_details import get_place_details_async
+from extractors.rate_limit import PRIORITIES
+from extractors.scheduler import QuotaExceeded, has_api_key, quota_status, request_priority
+from extractors.shared_calls import AsyncSharedCalls
+from extractors.ttl_cache import TTLCache
+from pipeline import FETCH_TIERS, REVIEWS_TOP_K, run_pipeline_with_timeout
+from runner import split_list
+
+SERVICE_HOST = os.getenv("SERVICE_HOST", "127.0.0.1")
+SERVICE_PORT = int(os.getenv("SERVICE_PORT", "8080"))
+# Corridas del pipeline a la vez (las demás esperan turno en el event loop)
+SERVICE_MAX_JOBS = int(os.getenv("SERVICE_MAX_JOBS", "8"))
+# Segundos que un resultado terminado se reusa para la misma consulta (0 = no se reusa)
+SERVICE_RESULT_TTL = float(os.getenv("SERVICE_RESULT_TTL", "0"))
+RESULT_CACHE_SIZE = int(os.getenv("SERVICE_RESULT_CACHE_SIZE", "64"))
+# Tope del body de POST /report (bytes)
+MAX_BODY_BYTES = 64 * 1024
+
+
+def _norm(text: str):
+    return " ".join(text.lower().split())
+
+
+def _as_list(value):
+    if isinstance(value, str):
+        return split_list(value)
+    return tuple(str(v).strip() for v in value or () if str(v).strip())
+
+
+def body_flag(body: dict, name: str, default: bool = False):
+    """
+    Booleano del body: solo true/false de JSON ("false" como texto no es False).
+    """
+    value = body.get(name)
+    if value is None:
+        return default
+    if not isinstance(value, bool):
+        raise ValueError(f"'{name}' debe ser true o false")
+    return value
+
+
+def request_params(body: dict):
+    """
+    Valida el JSON de POST /report y lo convierte en argumentos del
+    pipeline. Levanta ValueError con un mensaje para el cliente.
+    """
+    if not isinstance(body, dict):
+        raise ValueError("El body debe ser un objeto JSON")
+    keyword = body.get("keyword")
+    location = body.get("location")
+    if not isinstance(keyword, str) or not keyword.strip():
+        raise ValueError("Falta 'keyword'")
+    if not isinstance(location, str) or not location.strip():
+        raise ValueError("Falta 'location'")
+
+    try:
+        params = {
+            "keyword": keyword.strip(),
+            "location_text": location.strip(),
+            "radius_m": int(body.get("radius_m", 30000)),
+            "top_n": int(body.get("top_n", 6)),
+            "vertical": str(body.get("vertical") or DEFAULT_VERTICAL),
+            "fetch_tier": str(body.get("tier") or "all"),
+            "reviews_top_k": int(body.get("reviews_top_k", REVIEWS_TOP_K)),
+            "scoring": str(body.get("scoring") or DEFAULT_SCORING),
+            "review_sorts": _as_list(body.get("review_sorts")) or ("newest",),
+            "review_languages": _as_list(body.get("review_languages")) or (None,),
+            "sweep": body_flag(body, "sweep"),
+            "refresh": body_flag(body, "refresh"),
+            "timeout": float(body["timeout"]) if body.get("timeout") is not None else None,
+        }
+    except (TypeError, ValueError) as e:
+        raise ValueError(f"Parámetro inválido: {e}")
+
+    if params["top_n"] < 1 or params["radius_m"] < 1:
+        raise ValueError("'top_n' y 'radius_m' deben ser positivos")
+    if params["reviews_top_k"] < 0:
+        raise ValueError("'reviews_top_k' no puede ser negativo")
+    if params["fetch_tier"] not in FETCH_TIERS:
+        raise ValueError(f"tier inválido: {params['fetch_tier']} (usar {', '.join(FETCH_TIERS)})")
+    if params["vertical"] not in available_verticals():
+        raise ValueError(f"No hay lexicón para el vertical: {params['vertical']}")
+    parse_scoring(params["scoring"])
+    return params
+
+
+def coalesce_key(params: dict):
+    """
+    Llave de requests equivalentes: mismos parámetros, con keyword y
+    ubicación normalizadas ("Houston, TX" == "houston,  tx"). Una corrida
+    incremental se identifica por la corrida anterior de la que parte.
+    """
+    key = dict(params, keyword=_norm(params["keyword"]), location_text=_norm(params["location_text"]))
+    key.pop("timeout", None)
+    if key.get("previous") is not None:
+        key["previous"] = key["previous"].get("run_at")
+    return json.dumps(key, sort_keys=True, ensure_ascii=False)
+
+
+def error_status(error: Exception):
+    if isinstance(error, QuotaExceeded):
+        return 429
+    if isinstance(error, GoogleAPIError):
+        return 502
+    if isinstance(error, TimeoutError):
+        return 504
+    if isinstance(error, ValueError):
+        return 422
+    return 500
+
+
+class PipelineJob:
+    """
+    Una ejecución del pipeline, compartida por todos los requests iguales
+    que llegan mientras corre. Guarda los eventos del stream para que los
+    consumidores que se unen tarde los reciban desde el principio.
+
+    Sin bloquear (ej. desde Streamlit) se puede consultar `done`,
+    `progress` (lugares con detalles listos, total) y `events`.
+    """
+
+    def __init__(self, key: str, params: dict, priority: str):
+        self.key = key
+        self.params = params
+        self.priority = priority
+        self.events = []
+        self.progress = (0, 0)
+        self.done = False
+        self.cancelled = False
+        self.raw = None
+        self.report = None
+        self.error = None
+        self.started_at = time.time()
+        self.elapsed = None
+        # consumidores esperando el resultado (ver PipelineService.cancel)
+        self.waiters = 1
+        self.task = None
+        self._cond = threading.Condition()
+
+    def emit(self, event: dict):
+        with self._cond:
+            self.events.append(event)
+            self._cond.notify_all()
+
+    def on_progress(self, done: int, total: int, index: int, details: dict):
+        self.progress = (done, total)
+
+    def finish(self, raw: dict = None, report: dict = None, error: Exception = None):
+        with self._cond:
+            self.raw, self.report, self.error = raw, report, error
+            self.elapsed = time.time() - self.started_at
+            self.done = True
+            self._cond.notify_all()
+
+    def wait(self):
+        with self._cond:
+            self._cond.wait_for(lambda: self.done)
+
+    def iter_events(self):
+        """
+        Eventos desde el primero, bloqueando hasta que lleguen los nuevos;
+        termina cuando el job terminó y no quedan eventos por entregar.
+        """
+        sent = 0
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self.done or len(self.events) > sent)
+                batch = self.events[sent:]
+                finished = self.done
+            sent += len(batch)
+            yield from batch
+            if finished and sent >= len(self.events):
+                return
+
+
+class PipelineService:
+    """
+    Corre el pipeline en un event loop propio (thread de fondo) y une los
+    requests iguales en vuelo. Los handlers HTTP (un thread por request)
+    llaman `submit` y esperan el `PipelineJob`.
+
+    Con `result_ttl` > 0 los jobs terminados sin error quedan en un cache
+    en memoria y `submit` los devuelve sin correr el pipeline. `source` es
+    la etiqueta con la que se exportan las métricas; `history` guarda cada
+    corrida en el historial (composer/history.py).
+    """
+
+    def __init__(self, max_jobs: int = SERVICE_MAX_JOBS, result_ttl: float = SERVICE_RESULT_TTL,
+                 source: str = "service", history: bool = True):
+        self.max_jobs = max(1, max_jobs)
+        self.source = source
+        self.history = history
+        self.stats = Counter()
+        self._results = TTLCache(max_entries=RESULT_CACHE_SIZE, ttl=result_ttl) if result_ttl > 0 else None
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self._loop = asyncio.new_event_loop()
+        self._queue = None
+        self._ready = threading.Event()
+        self._thread = threading.Thread(target=lambda: self._loop.run_until_complete(self._dispatch()),
+                                        daemon=True)
+
+        # Compartidos entre requests: geocodes (casi no cambian) y Place
+        # Details en vuelo (max_entries=0: no se guarda el resultado, el
+        # cache en disco ya lo tiene con su TTL)
+        self._geocode = AsyncSharedCalls(geocode_location_async)
+        self._details = AsyncSharedCalls(self._fetch_details, max_entries=0)
+
+    def start(self):
+        self._thread.start()
+        self._ready.wait()
+        return self
+
+    def stop(self):
+        if self._queue is not None:
+            self._loop.call_soon_threadsafe(self._queue.put_nowait, None)
+        self._thread.join(timeout=10)
+
+    async def _dispatch(self):
+        # las corridas se crean dentro de async_session(): heredan el
+        # cliente HTTP keep-alive del servicio
+        self._queue = asyncio.Queue()
+        semaphore = asyncio.Semaphore(self.max_jobs)
+        tasks = set()
+        async with async_session():
+            self._ready.set()
+            while True:
+                job = await self._queue.get()
+                if job is None:
+                    break
+                if job.cancelled:
+                    job.finish(error=RuntimeError("Corrida cancelada"))
+                    continue
+                task = job.task = asyncio.create_task(self._run(job, semaphore))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            for task in list(tasks):
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _fetch_details(self, place_id, refresh, review_sorts, languages):
+        return await get_place_details_async(place_id, refresh, review_sorts=review_sorts, languages=languages)
+
+    async def _run(self, job: PipelineJob, semaphore: asyncio.Semaphore):
+        params = dict(job.params)
+        sorts, languages = params["review_sorts"], params["review_languages"]
+
+        def geocode(location_text, refresh):
+            if refresh:
+                return geocode_location_async(location_text, refresh)
+            return self._geocode(_norm(location_text), location_text, refresh)
+
+        def get_details(place_id, refresh):
+            return self._details((place_id, sorts, languages, refresh), place_id, refresh, sorts, languages)
+
+        try:
+            async with semaphore:
+                with request_priority(job.priority):
+                    raw, report = await run_pipeline_with_timeout(
+                        params.pop("keyword"), params.pop("location_text"), **params,
+                        emit=job.emit, on_progress=job.on_progress,
+                        geocode=geocode, get_details=get_details
+                    )
+            if self.history:
+                await asyncio.to_thread(record_run, raw)
+            export_metrics(raw["metrics"], {"keyword": raw["keyword"], "location": raw["location_text"],
+                                            "source": self.source})
+            job.finish(raw, report)
+            if self._results is not None:
+                self._results.set(job.key, job)
+        except asyncio.CancelledError:
+            job.finish(error=RuntimeError("Corrida cancelada" if job.cancelled else "El servicio se detuvo"))
+            raise
+        except Exception as e:
+            with self._lock:
+                self.stats["failed"] += 1
+            job.finish(error=e)
+        finally:
+            with self._lock:
+                if self._inflight.get(job.key) is job:
+                    del self._inflight[job.key]
+
+    def submit(self, params: dict, priority: str = "normal"):
+        """
+        Devuelve (job, coalesced): el job en vuelo de la misma consulta (o
+        uno ya terminado del cache de resultados), o uno nuevo que se encola
+        en el event loop. Con `refresh` no se usa el cache de resultados.
+        """
+        key = coalesce_key(params)
+        if self._results is not None and not params.get("refresh"):
+            job = self._results.get(key)
+            if job is not None:
+                with self._lock:
+                    self.stats["cached"] += 1
+                return job, True
+        with self._lock:
+            job = self._inflight.get(key)
+            if job is not None and not job.cancelled:
+                job.waiters += 1
+                self.stats["coalesced"] += 1
+                return job, True
+            job = PipelineJob(key, params, priority)
+            self._inflight[key] = job
+            self.stats["runs"] += 1
+        self._loop.call_soon_threadsafe(self._queue.put_nowait, job)
+        return job, False
+
+    def cancel(self, job: PipelineJob):
+        """
+        El consumidor ya no espera `job`. La corrida se cancela solo si
+        nadie más la espera (los requests unidos siguen recibiéndola).
+        """
+        with self._lock:
+            if job.done or job.cancelled:
+                return
+            job.waiters -= 1
+            if job.waiters > 0:
+                return
+            job.cancelled = True
+            # una consulta igual que llegue después arranca una corrida nueva
+            if self._inflight.get(job.key) is job:
+                del self._inflight[job.key]
+            self.stats["cancelled"] += 1
+        self._loop.call_soon_threadsafe(self._cancel_task, job)
+
+    def _cancel_task(self, job: PipelineJob):
+        # en el event loop: si todavía no arrancó, _dispatch lo descarta
+        if job.task is not None:
+            job.task.cancel()
+
+    def health(self):
+        with self._lock:
+            return {"status": "ok", "inflight": len(self._inflight), **self.stats,
+                    "geocode_calls": self._geocode.calls, "geocode_shared": self._geocode.shared,
+                    "details_calls": self._details.calls, "details_shared": self._details.shared}
+
+
+def make_server(service: PipelineService, host: str = SERVICE_HOST, port: int = SERVICE_PORT,
+                verbose: bool = False):
+    """
+    Servidor HTTP (un thread por request) sobre un `PipelineService` ya iniciado.
+    """
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path == "/health":
+                return self._send(200, service.health())
+            if self.path == "/quota":
+                return self._send(200, quota_status() if has_api_key() else {})
+            self._send(404, {"error": f"ruta desconocida: {self.path}"})
+
+        def do_POST(self):
+            if self.path != "/report":
+                return self._send(404, {"error": f"ruta desconocida: {self.path}"})
+            try:
+                length = int(self.headers.get("Content-Length") or 0)
+                if length > MAX_BODY_BYTES:
+                    raise ValueError("Body demasiado grande")
+                body = json.loads(self.rfile.read(length) or b"{}")
+                params = request_params(body)
+                include_raw = body_flag(body, "include_raw")
+                stream = body_flag(body, "stream")
+                priority = str(body.get("priority") or "normal")
+                if priority not in PRIORITIES:
+                    raise ValueError(f"Prioridad inválida: {priority} (usar {', '.join(PRIORITIES)})")
+            except ValueError as e:
+                return self._send(400, {"error": str(e)})
+
+            job, coalesced = service.submit(params, priority)
+            if stream:
+                return self._stream(job, coalesced, include_raw)
+
+            job.wait()
+            if job.error is not None:
+                return self._send(error_status(job.error), {"error": str(job.error), "coalesced": coalesced})
+            payload = {"coalesced": coalesced, "report": job.report}
+            if include_raw:
+                payload["raw"] = job.raw
+            self._send(200, payload)
+
+        def _stream(self, job: PipelineJob, coalesced: bool, include_raw: bool):
+            # HTTP/1.0 sin Content-Length: el stream termina al cerrar la conexión
+            self.send_response(200)
+            self.send_header("Content-Type", "application/x-ndjson; charset=utf-8")
+            self.end_headers()
+            try:
+                for event in job.iter_events():
+                    self._write_line(event)
+                if job.error is not None:
+                    self._write_line({"event": "error", "error": str(job.error),
+                                      "status": error_status(job.error)})
+                else:
+                    done = {"event": "done", "coalesced": coalesced}
+                    if include_raw:
+                        done["raw"] = job.raw
+                    self._write_line(done)
+            except (BrokenPipeError, ConnectionResetError):
+                # el cliente se fue; la corrida sigue para los demás
+                pass
+
+        def _write_line(self, event: dict):
+            self.wfile.write((json.dumps(event, ensure_ascii=False) + "\n").encode("utf-8"))
+            self.wfile.flush()
+
+        def _send(self, status: int, body: dict):
+            data = json.dumps(body, ensure_ascii=False).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format, *args):
+            if verbose:
+                super().log_message(format, *args)
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Servicio HTTP del agente (reportes con requests unidos)")
+    parser.add_argument("--host", default=SERVICE_HOST)
+    parser.add_argument("--port", type=int, default=SERVICE_PORT)
+    parser.add_argument("--jobs", type=int, default=SERVICE_MAX_JOBS, help="Corridas del pipeline a la vez")
+    parser.add_argument("--result-ttl", type=float, default=SERVICE_RESULT_TTL,
+                        help="Segundos que se reusa un resultado terminado (0 = no se reusa)")
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+
+    service = PipelineService(max_jobs=args.jobs, result_ttl=args.result_ttl).start()
+    server = make_server(service, args.host, args.port, verbose=args.verbose)
+    print(f"Servicio en http://{args.host}:{args.port} (POST /report, GET /health, GET /quota)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.stop()
+
+
+if __name__ == "__main__":
+    main()
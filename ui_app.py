@@ -2,16 +2,33 @@
 import json
 import os
 import time
-import requests
 import streamlit as st
 
-from extractors.geocode import geocode_location
-from extractors.places_search import search_places
-from extractors.place_details import get_place_details
-from composer.report_builder import build_report
+from extractors.autocomplete import location_suggestions, new_session_token
+from extractors.scheduler import has_api_key, quota_status
+from analyzers.lexicon import DEFAULT_VERTICAL, available_verticals
+from composer.report_diff import compatible_previous
+from pipeline import FETCH_TIERS, REVIEWS_TOP_K
+from service import PipelineService
+
+# Segundos que se reusa el resultado de una consulta idéntica (todas las sesiones; 0 = no se reusa)
+UI_RESULT_TTL = float(os.getenv("UI_RESULT_TTL", "900"))
+# Cada cuánto se refresca el progreso de una corrida en curso
+UI_POLL_SECONDS = float(os.getenv("UI_POLL_SECONDS", "0.5"))
 
 st.set_page_config(page_title="Agente Google Search UI", layout="wide")
 
+
+@st.cache_resource
+def get_service():
+    """
+    Un solo PipelineService por servidor de Streamlit, compartido por todas
+    las sesiones: las corridas van a su event loop de fondo (el script no
+    se bloquea), las consultas iguales en vuelo se unen y los resultados
+    se reusan durante UI_RESULT_TTL.
+    """
+    return PipelineService(result_ttl=UI_RESULT_TTL, source="ui", history=False).start()
+
 # ------------------------
 # SESSION STATE
 # ------------------------
@@ -21,48 +38,29 @@ if "report" not in st.session_state:
     st.session_state.report = None
 if "elapsed" not in st.session_state:
     st.session_state.elapsed = None
+# corrida en curso de esta sesión: (job, momento del envío, país elegido)
+if "job" not in st.session_state:
+    st.session_state.job = None
 
 # ------------------------
 # AUTOCOMPLETE (cities + regions + countries)
 # ------------------------
-def location_suggestions(text: str, country: str | None):
-    if not text or len(text) < 2:
-        return []
-
-    key = os.getenv("GOOGLE_API_KEY")
-    if not key:
-        return []
-
-    # Autocomplete general: sirve para ciudad/estado/región/país
-    url = "https://maps.googleapis.com/maps/api/place/autocomplete/json"
-    params = {
-        "input": text,
-        "types": "(regions)",   # clave: incluye estados/regiones/países y muchas ciudades también
-        "key": key
-    }
-
-    # filtro opcional por país (ej: "us" o "mx")
-    if country and country != "ALL":
-        params["components"] = f"country:{country.lower()}"
-
-    r = requests.get(url, params=params, timeout=20).json()
-    preds = r.get("predictions") or []
-
-    out = []
-    for p in preds:
-        desc = p.get("description")
-        if desc:
-            out.append(desc)
-
-    # quitar duplicados conservando orden
-    seen = set()
-    dedup = []
-    for x in out:
-        if x not in seen:
-            seen.add(x)
-            dedup.append(x)
-
-    return dedup[:15]
+if "ac_token" not in st.session_state:
+    st.session_state.ac_token = new_session_token()
+if "ac_last" not in st.session_state:
+    st.session_state.ac_last = None
+    st.session_state.ac_results = []
+
+def cached_location_suggestions(text: str, country: str):
+    """
+    Solo consulta cuando cambia lo escrito o el país: mover el slider de
+    radio (o cualquier otro widget) reusa las sugerencias de la corrida anterior.
+    """
+    current = (text, country)
+    if st.session_state.ac_last != current:
+        st.session_state.ac_results = location_suggestions(text, country, session_token=st.session_state.ac_token)
+        st.session_state.ac_last = current
+    return st.session_state.ac_results
 
 # ------------------------
 # UI
@@ -75,6 +73,13 @@ with st.sidebar:
 
     keyword = st.text_input("Keyword", value="meat market")
 
+    verticals = available_verticals()
+    vertical = st.selectbox(
+        "Vertical (lexicón de productos)",
+        verticals,
+        index=verticals.index(DEFAULT_VERTICAL) if DEFAULT_VERTICAL in verticals else 0
+    )
+
     # filtro país opcional (ALL = sin filtro)
     country = st.selectbox(
         "País (opcional)",
@@ -84,7 +89,7 @@ with st.sidebar:
 
     typed_location = st.text_input("Ubicación (escribe)", value="California")
 
-    sugs = location_suggestions(typed_location, country)
+    sugs = cached_location_suggestions(typed_location, country)
 
     chosen_location = None
     if sugs:
@@ -98,74 +103,108 @@ with st.sidebar:
     location_text = typed_location
     if chosen_location and chosen_location != "(usar lo escrito)":
         location_text = chosen_location
+        # la búsqueda terminó con una selección: la siguiente usa otro token
+        st.session_state.ac_token = new_session_token()
 
     radius_m = st.number_input("Radio (metros)", min_value=1000, max_value=100000, value=30000, step=1000)
-    top_n = st.number_input("Top N negocios", min_value=1, max_value=20, value=6, step=1)
+    sweep = st.checkbox("Barrido por cuadrícula (regiones grandes, más de 60 negocios)", value=False)
+    top_n = st.number_input("Top N negocios", min_value=1, max_value=500 if sweep else 60, value=6, step=1)
+    fetch_tier = st.selectbox(
+        "Detalle",
+        list(FETCH_TIERS),
+        index=0,
+        format_func=lambda t: {
+            "all": "all – reviews de todos",
+            "full": f"full – reviews del cliente + top {REVIEWS_TOP_K}",
+            "light": "light – solo rating (sin Place Details)",
+        }[t]
+    )
+    scoring = st.selectbox(
+        "Ranking de competidores",
+        ["premium", "bayesian", "bayesian,distance", "bayesian,distance,recency"],
+        format_func=lambda s: {
+            "premium": "premium – rating + volumen",
+            "bayesian": "bayesian – rating ajustado por # de reseñas",
+            "bayesian,distance": "bayesian + cercanía al centro",
+            "bayesian,distance,recency": "bayesian + cercanía + reseñas recientes",
+        }[s]
+    )
+    more_reviews = st.checkbox("Más reseñas por negocio (newest + most_relevant)", value=False)
+    incremental = st.checkbox("Incremental: solo re-consultar lo que cambió vs la corrida anterior", value=False)
+    refresh = st.checkbox("Ignorar caché (volver a consultar Google)", value=False)
 
     st.divider()
-    api_ok = bool(os.getenv("GOOGLE_API_KEY"))
+    api_ok = has_api_key()
     st.write("API Key:", "✅ Detectada" if api_ok else "❌ No detectada (export GOOGLE_API_KEY=...)")
+    if api_ok:
+        with st.expander("Cuota de hoy (por key)"):
+            st.json(quota_status())
 
 run = st.button("🚀 Correr agente", type="primary", use_container_width=True)
 
 # ------------------------
 # RUN AGENT
 # ------------------------
+def job_progress(job):
+    """
+    Mismas etapas que antes: geocoding 15%, búsqueda 35%, detalles 60–85%.
+    """
+    done, total = job.progress
+    if total:
+        return 60 + int(25 * (done / total)), f"Detalles: {done}/{total}"
+    if any(e["event"] == "start" for e in job.events):
+        return 35, "Buscando negocios + detalles (Text Search + Place Details)..."
+    return 15, "Geocoding ubicación..."
+
 if run:
-    if not os.getenv("GOOGLE_API_KEY"):
+    if not has_api_key():
         st.error("No hay GOOGLE_API_KEY configurada en el entorno.")
         st.stop()
 
-    t0 = time.time()
-    progress = st.progress(0, text="Iniciando...")
-
-    progress.progress(15, text="Geocoding ubicación...")
-    geo = geocode_location(location_text)
-    lat = geo["lat"]
-    lng = geo["lng"]
-    formatted_location = geo.get("formatted_address") or location_text
-
-    progress.progress(35, text="Buscando negocios (Places Text Search)...")
-    places = search_places(keyword, lat, lng, radius_m=int(radius_m))
-    places = [p for p in places if p.get("place_id")][: int(top_n)]
-
-    progress.progress(60, text="Sacando detalles + reseñas (Place Details)...")
-    places_details = []
-    for i, p in enumerate(places, start=1):
-        try:
-            details = get_place_details(p["place_id"])
-            places_details.append(details)
-        except Exception as e:
-            places_details.append({
-                "place_id": p.get("place_id"),
-                "name": p.get("name"),
-                "rating": None,
-                "reviews_count": None,
-                "address": p.get("formatted_address"),
-                "maps_url": None,
-                "reviews": [],
-                "error": str(e)
-            })
-        progress.progress(60 + int(25 * (i / max(1, len(places)))), text=f"Detalles: {i}/{len(places)}")
-
-    progress.progress(90, text="Construyendo reporte...")
-    raw = {
-        "keyword": keyword,
-        "location_text": location_text,
-        "formatted_location": formatted_location,
-        "country_filter": country,
-        "center": {"lat": lat, "lng": lng},
-        "radius_m": int(radius_m),
-        "top_n": int(top_n),
-        "places": places_details
+    # una corrida nueva reemplaza a la anterior de esta sesión
+    if st.session_state.job is not None:
+        get_service().cancel(st.session_state.job[0])
+    params = {
+        "keyword": keyword, "location_text": location_text, "radius_m": int(radius_m), "top_n": int(top_n),
+        "vertical": vertical, "fetch_tier": fetch_tier, "scoring": scoring, "sweep": sweep,
+        "review_sorts": ("newest", "most_relevant") if more_reviews else ("newest",),
+        "refresh": refresh,
+        "previous": compatible_previous(st.session_state.raw, keyword, location_text) if incremental else None,
     }
-    report = build_report(keyword, location_text, formatted_location, places_details)
-
-    st.session_state.raw = raw
-    st.session_state.report = report
-    st.session_state.elapsed = time.time() - t0
-
-    progress.progress(100, text="Listo ✅")
+    # interactivo: sus requests pasan antes que los de un batch en el mismo proceso
+    job, _ = get_service().submit(params, "interactive")
+    st.session_state.job = (job, time.time(), country)
+
+if st.session_state.job is not None:
+    job, submitted_at, job_country = st.session_state.job
+
+    if not job.done:
+        value, text = job_progress(job)
+        progress = st.progress(value, text=text)
+        if st.button("✖ Cancelar corrida"):
+            get_service().cancel(job)
+            st.session_state.job = None
+            st.rerun()
+
+        # Render progresivo: cada lugar aparece en la tabla en cuanto se analiza
+        rows = {e["index"]: e["comparison_table"] for e in list(job.events) if e["event"] == "place"}
+        if rows:
+            st.dataframe([rows[i] for i in sorted(rows)], use_container_width=True)
+
+        # el script termina enseguida; se vuelve a correr para ver el avance
+        time.sleep(UI_POLL_SECONDS)
+        st.rerun()
+
+    st.session_state.job = None
+    if job.error is not None:
+        st.error(f"La corrida falló: {job.error}")
+    else:
+        # el raw puede venir del cache compartido: se copia antes de anotarlo
+        raw = dict(job.raw, country_filter=job_country)
+        st.session_state.raw = raw
+        st.session_state.report = job.report
+        st.session_state.elapsed = time.time() - submitted_at
+        st.progress(100, text="Listo ✅")
 
 # ------------------------
 # SHOW RESULTS (no se borran al descargar)